@@ -0,0 +1,65 @@
+import time
+from threading import Lock
+
+from app.cache import LRUCache
+from app.config import settings
+
+
+# Alert-storm admission control for the Alertmanager webhook.
+#
+# A network partition can fire the same alertname on hundreds of instances at
+# once. Every alertname gets a token bucket: up to storm_burst NEW incidents at
+# once, refilled at storm_rate per second. Alerts over the limit are folded into
+# one "alert storm" incident for that alertname instead (app/ingest.py), and the
+# alertname stays folded for storm_window seconds after the last alert that went
+# over — so a storm doesn't trickle back out as single incidents while tokens refill.
+#
+# Repeats of alerts that already have an incident never reach this: only new
+# incidents cost a token. Buckets are per worker, so the limit is per worker too.
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.storm_until = 0.0   # folding everything for this alertname until then
+
+    def take(self, count: int, now: float, window: float) -> int:
+        """How many of `count` new alerts get their own incident"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        admitted = 0 if now < self.storm_until else min(count, int(self.tokens))
+        self.tokens -= admitted
+        if admitted < count:
+            self.storm_until = now + window
+        return admitted
+
+
+class StormAdmission:
+    def __init__(self, rate: float, burst: int, window: float, max_alertnames: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self._buckets = LRUCache(maxsize=max_alertnames)   # alertname → TokenBucket
+        self._lock = Lock()
+
+    def admit(self, alertname: str, count: int, now: float = None) -> int:
+        """Of `count` new alerts for alertname, how many may become incidents (the first N)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(alertname)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, now)
+                self._buckets.set(alertname, bucket)
+            return bucket.take(count, now, self.window)
+
+    def reset(self):
+        self._buckets.clear()
+
+
+# Single instance used by app/ingest.py
+storm_admission = StormAdmission(
+    rate=settings.storm_rate, burst=settings.storm_burst, window=settings.storm_window
+)
@@ -0,0 +1,149 @@
+"""
+Retention for the incidents table.
+
+Resolved incidents older than the retention window are moved, in small batches,
+from incidents into incidents_archive (partitioned by month on PostgreSQL), so
+the hot table — and every index, search and dedup lookup on it — only holds
+recent and open incidents. Rollups are untouched: they already counted these,
+and rollup.rebuild() reads incidents_archive as well as incidents. Timelines
+(incident_events) and folded storm alerts (incident_alerts) stay where they are,
+keyed by the same id, until archive-prune drops the incident for good.
+
+    python -m app.cli archive --older-than-days 90
+    python -m app.cli archive-prune --keep-months 24
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.cache import invalidate_incidents
+from app.models import Incident, IncidentAlert, IncidentArchive, IncidentEvent, IncidentStatus
+from app.rollup import as_utc
+
+# Columns copied as-is from incidents into incidents_archive
+ARCHIVED_COLUMNS = [
+    "id", "created_at", "title", "description", "severity", "status",
+    "source", "alert_name", "fingerprint", "updated_at", "resolved_at", "occurrence_count",
+]
+
+
+# ── PARTITIONS (PostgreSQL only) ─────────────────────────────────────────────
+def month_start(value: datetime) -> datetime:
+    return as_utc(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime) -> datetime:
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"incidents_archive_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_ddl(month: datetime) -> str:
+    """CREATE TABLE for the partition holding incidents created in `month`"""
+    start, end = month_start(month), next_month(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF incidents_archive "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(db: Session, first: datetime, last: datetime):
+    """Create the monthly partitions covering first..last (no-op on SQLite)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    month = month_start(first)
+    while month <= last:
+        db.execute(text(partition_ddl(month)))
+        month = next_month(month)
+    db.commit()
+
+
+# ── ARCHIVE ──────────────────────────────────────────────────────────────────
+def _archivable(cutoff: datetime, batch_size: int):
+    """Ids of the oldest resolved incidents past the cutoff, one batch at a time.
+    SKIP LOCKED: rows another request is updating right now wait for the next run."""
+    return (
+        select(Incident.id)
+        .where(Incident.status == IncidentStatus.resolved, Incident.resolved_at < cutoff)
+        .order_by(Incident.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def archive_resolved(db: Session, older_than_days: int, batch_size: int = 1000, now: datetime = None) -> int:
+    """Move resolved incidents resolved more than `older_than_days` ago into the archive.
+    Each batch is its own short transaction, so the API never waits long on it."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=older_than_days)
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    oldest, newest = db.execute(
+        select(func.min(Incident.created_at), func.max(Incident.created_at))
+        .where(Incident.status == IncidentStatus.resolved, Incident.resolved_at < cutoff)
+    ).one()
+    if oldest is None:
+        return 0
+    ensure_partitions(db, oldest, newest)
+
+    moved = 0
+    while True:
+        if postgres:
+            # Give up on a batch rather than queue behind (and block) live traffic
+            db.execute(text("SET LOCAL lock_timeout = '2s'"))
+        ids: List[int] = db.scalars(_archivable(cutoff, batch_size)).all()
+        if not ids:
+            break
+
+        db.execute(
+            insert(IncidentArchive).from_select(
+                ARCHIVED_COLUMNS + ["archived_at"],
+                select(*[Incident.__table__.c[name] for name in ARCHIVED_COLUMNS], func.now())
+                .where(Incident.id.in_(ids))
+            )
+        )
+        db.execute(delete(Incident).where(Incident.id.in_(ids)), execution_options={"synchronize_session": False})
+        db.commit()
+
+        invalidate_incidents(ids)
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    return moved
+
+
+def prune_archive(db: Session, keep_months: int, now: datetime = None) -> int:
+    """Drop archived incidents created more than `keep_months` months ago, with their timelines
+    and folded alerts. On PostgreSQL whole partitions are dropped (returns how many); elsewhere rows are deleted."""
+    month = month_start(now or datetime.now(timezone.utc))
+    for _ in range(keep_months):
+        month = month_start(month - timedelta(days=1))
+
+    if db.get_bind().dialect.name != "postgresql":
+        pruned = select(IncidentArchive.id).where(IncidentArchive.created_at < month)
+        db.execute(delete(IncidentEvent).where(IncidentEvent.incident_id.in_(pruned)))
+        db.execute(delete(IncidentAlert).where(IncidentAlert.incident_id.in_(pruned)))
+        deleted = db.execute(delete(IncidentArchive).where(IncidentArchive.created_at < month)).rowcount
+        db.commit()
+        return deleted
+
+    partitions = db.scalars(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'incidents_archive'"
+    )).all()
+    dropped = 0
+    for name in sorted(partitions):
+        if name < partition_name(month):   # yYYYYmMM names sort by month
+            db.execute(text(f"DELETE FROM incident_events WHERE incident_id IN (SELECT id FROM {name})"))
+            db.execute(text(f"DELETE FROM incident_alerts WHERE incident_id IN (SELECT id FROM {name})"))
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped += 1
+    db.commit()
+    return dropped
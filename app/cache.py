@@ -0,0 +1,265 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.metrics import incident_cache_evictions_total
+
+logger = logging.getLogger(__name__)
+
+# Small in-process LRU cache, with an optional TTL.
+# Used to remember "which open incident owns this alert fingerprint" so that
+# Alertmanager's repeat notifications don't need a DB lookup every time,
+# and as the local backend of the GET /incidents/{id} response cache.
+class LRUCache:
+    def __init__(self, maxsize: int = 10000, ttl: float = None, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl                  # seconds, None = entries never expire
+        self.on_evict = on_evict        # called for every entry dropped by size or age
+        self._data = OrderedDict()      # key → (expires_at, value)
+        self._lock = Lock()   # routes run on a threadpool, so guard the dict
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            expires_at, value = self._data[key]
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self._evicted()
+                return default
+            self._data.move_to_end(key)   # mark as most recently used
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """Store value; `ttl` overrides the cache's TTL for this entry"""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value) -> bool:
+        """set() only if the key is missing or expired. Returns whether it was stored."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] >= time.monotonic()):
+                return False
+            self._store(key, value, None)
+            return True
+
+    def _store(self, key, value, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+        self._data.move_to_end(key)
+        # Drop the least recently used entries once we're over the limit
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evicted()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evicted(self):
+        if self.on_evict:
+            self.on_evict()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ── RESPONSE CACHE BACKENDS ──────────────────────────────────────────────────
+# GET /incidents/{id} caches the already-serialized JSON bytes.
+# All backends have the same get/set/delete interface:
+#   local — LRU+TTL in this process. Each uvicorn worker has its own copy, and a
+#           write only invalidates the copy of the worker that handled it. So it
+#           is only used with a single worker (WEB_CONCURRENCY=1); with more, the
+#           response cache is off unless CACHE_BACKEND=redis.
+#   redis — one cache shared by every worker; delete() invalidates for all of them.
+#           docker-compose.yml runs it this way.
+#   none  — no caching; every GET reads the database.
+# `blocking` says whether the calls do network I/O (see run_cache_io below).
+#
+# A reader can load a row just before a write commits and store it just after
+# the write invalidated it. So delete() doesn't just drop the key, it leaves a
+# tombstone for `tombstone` seconds. set() only fills a key that is empty:
+# while the tombstone lives, that late stale body is dropped.
+TOMBSTONE = b"\0tombstone"
+
+
+class LocalCacheBackend:
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: float, tombstone: float = 5):
+        self._lru = LRUCache(maxsize=maxsize, ttl=ttl, on_evict=incident_cache_evictions_total.inc)
+        self.tombstone = tombstone
+
+    def get(self, key: str):
+        value = self._lru.get(key)
+        return None if value == TOMBSTONE else value
+
+    def set(self, key: str, value: bytes):
+        self._lru.add(key, value)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            if self.tombstone:
+                self._lru.set(key, TOMBSTONE, ttl=self.tombstone)
+            else:
+                self._lru.pop(key)
+
+    def clear(self):
+        self._lru.clear()
+
+
+class NullCacheBackend:
+    blocking = False
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value: bytes):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+class RedisCacheBackend:
+    """
+    Best effort: a Redis error is logged (once, until Redis answers again) and
+    then treated as a miss, or as a skipped set/delete. A Redis outage never fails
+    a request, and never fails a write that has already committed.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, ttl: float, tombstone: float = 5, timeout: float = 0.5,
+                 client=None, errors: tuple = None):
+        if client is None:
+            # Optional dependency — only needed when CACHE_BACKEND=redis
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+            errors = (redis.RedisError,)
+        self._redis = client
+        self._errors = errors or ()
+        self._failing = False
+        self.ttl = ttl
+        self.tombstone = tombstone
+
+    def _call(self, action: str, function, *args, **kwargs):
+        try:
+            result = function(*args, **kwargs)
+        except self._errors as error:
+            if not self._failing:
+                logger.warning("Redis cache %s failed, serving without the cache: %s", action, error)
+            self._failing = True
+            return None
+        if self._failing:
+            logger.info("Redis cache is reachable again")
+            self._failing = False
+        return result
+
+    def get(self, key: str):
+        value = self._call("get", self._redis.get, key)
+        return None if value == TOMBSTONE else value
+
+    def set(self, key: str, value: bytes):
+        self._call("set", self._redis.set, key, value, ex=max(int(self.ttl), 1), nx=True)
+
+    def delete(self, *keys: str):
+        if keys and self.tombstone:
+            self._call("delete", self._tombstone, keys)
+        elif keys:
+            self._call("delete", self._redis.delete, *keys)
+
+    def _tombstone(self, keys):
+        pipeline = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.set(key, TOMBSTONE, ex=max(int(self.tombstone), 1))
+        pipeline.execute()
+
+    def clear(self):
+        # Only our keys — never FLUSHDB, the database may be shared
+        keys = self._call("clear", lambda: list(self._redis.scan_iter(match=incident_cache_key("*")))) or []
+        for start in range(0, len(keys), 1000):
+            self._call("clear", self._redis.delete, *keys[start:start + 1000])
+
+
+def _make_incident_cache():
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.cache_redis_url, ttl=settings.incident_cache_ttl,
+            tombstone=settings.incident_cache_tombstone, timeout=settings.cache_redis_timeout
+        )
+    if settings.cache_backend == "none":
+        return NullCacheBackend()
+    if settings.web_concurrency > 1:
+        logger.warning(
+            "CACHE_BACKEND=local with %d workers would serve stale incidents after writes on another "
+            "worker; the GET /incidents/{id} cache is off. Set CACHE_BACKEND=redis to share one.",
+            settings.web_concurrency
+        )
+        return NullCacheBackend()
+    return LocalCacheBackend(
+        maxsize=settings.incident_cache_size, ttl=settings.incident_cache_ttl,
+        tombstone=settings.incident_cache_tombstone
+    )
+
+
+# Single instance used across the whole app
+incident_cache = _make_incident_cache()
+
+
+def incident_cache_key(incident_id: int) -> str:
+    return f"incident:{incident_id}"
+
+
+def invalidate_incidents(incident_ids):
+    """Drop cached GET /incidents/{id} responses — call after the write has committed"""
+    keys = [incident_cache_key(incident_id) for incident_id in incident_ids]
+    deferred = _deferred_invalidations.get()
+    if deferred is not None:
+        deferred.extend(keys)   # inside deferred_invalidations() — done when it exits
+    else:
+        incident_cache.delete(*keys)
+
+
+# ── ASYNC ROUTES ─────────────────────────────────────────────────────────────
+# With DB_ASYNC=true the sync route bodies run on the event loop (through
+# AsyncSession.run_sync), where a Redis round trip would stall every other
+# request. So the async routes call the cache through run_cache_io(), and wrap
+# each route body in deferred_invalidations(): the invalidations it makes are
+# collected and done afterwards, on the threadpool.
+_deferred_invalidations = ContextVar("deferred_invalidations", default=None)
+
+
+async def run_cache_io(function, *args):
+    """Call a cache function from async code — on the threadpool if the backend does network I/O"""
+    if incident_cache.blocking:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+@asynccontextmanager
+async def deferred_invalidations():
+    keys = []
+    token = _deferred_invalidations.set(keys)
+    try:
+        yield
+    finally:
+        # Also on errors: anything collected was invalidated after a commit
+        _deferred_invalidations.reset(token)
+        if keys:
+            await run_cache_io(incident_cache.delete, *keys)
@@ -0,0 +1,112 @@
+"""
+Operational commands.
+
+    python -m app.cli rollup-rebuild [--since 2024-01-01T00:00:00Z]
+    python -m app.cli archive [--older-than-days 90] [--batch-size 1000]
+    python -m app.cli archive-prune --keep-months 24
+    python -m app.cli import incidents.ndjson [--format csv] [--chunk-size 5000]
+    python -m app.cli seed-metrics [--timeout 30]
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from app.database import SessionLocal
+from app import archive, importer, metrics, rollup
+
+
+def rollup_rebuild(args):
+    """Backfill incident_rollups from the incidents table"""
+    with SessionLocal() as db:
+        written = rollup.rebuild(db, since=args.since)
+    print(f"Rebuilt {written} rollup row(s)")
+
+
+def archive_resolved(args):
+    """Move old resolved incidents into incidents_archive"""
+    with SessionLocal() as db:
+        moved = archive.archive_resolved(db, older_than_days=args.older_than_days, batch_size=args.batch_size)
+    print(f"Archived {moved} incident(s)")
+
+
+def archive_prune(args):
+    """Drop archived incidents past the retention period"""
+    with SessionLocal() as db:
+        removed = archive.prune_archive(db, keep_months=args.keep_months)
+    print(f"Pruned {removed} archive partition(s)/row(s)")
+
+
+def import_incidents(args):
+    """Bulk-load historical incidents from an NDJSON or CSV file ("-" = stdin)"""
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    def report(chunk):
+        # Progress on stderr, one line per chunk, with the rows that were rejected
+        print(f"chunk {chunk['chunk']} (lines {chunk['first_line']}-{chunk['last_line']}): "
+              f"{chunk['imported']} imported, {chunk['rejected']} rejected", file=sys.stderr)
+        if chunk["error"]:
+            print(f"  chunk failed: {chunk['error']}", file=sys.stderr)
+        for error in chunk["errors"]:
+            print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+
+    source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    with source, SessionLocal() as db:
+        lines = importer.text_lines(importer.file_chunks(source))
+        result = importer.import_incidents(db, lines, fmt, args.chunk_size, on_chunk=report)
+    print(f"Imported {result['imported']} incident(s), rejected {result['rejected']} "
+          f"in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+
+
+def seed_metrics(args):
+    """Seed incidents_open_total once, before uvicorn forks its workers (see Dockerfile)"""
+    from app.main import seed_open_incidents_gauge   # builds the app — only this command needs it
+
+    if not metrics.claim_open_gauge_seed():
+        print("incidents_open_total already seeded for this metrics directory")
+    elif seed_open_incidents_gauge(timeout=args.timeout):
+        print("Seeded incidents_open_total")
+    else:
+        # Don't keep the server from starting — the gauge then only counts changes
+        print(f"incidents_open_total not seeded (no answer within {args.timeout}s, or the error above)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Incident Logger maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rollup-rebuild", help="recompute hourly MTTR/volume rollups")
+    rebuild.add_argument("--since", type=datetime.fromisoformat, default=None,
+                         help="only rebuild hours from this ISO timestamp on (default: everything)")
+    rebuild.set_defaults(handler=rollup_rebuild)
+
+    move = commands.add_parser("archive", help="move old resolved incidents into incidents_archive")
+    move.add_argument("--older-than-days", type=int, default=90,
+                      help="archive incidents resolved more than this many days ago (default: 90)")
+    move.add_argument("--batch-size", type=int, default=1000,
+                      help="incidents moved per transaction (default: 1000)")
+    move.set_defaults(handler=archive_resolved)
+
+    prune = commands.add_parser("archive-prune", help="delete archived incidents past retention")
+    prune.add_argument("--keep-months", type=int, required=True,
+                       help="keep this many whole months of archive before the current one")
+    prune.set_defaults(handler=archive_prune)
+
+    load = commands.add_parser("import", help="bulk-load historical incidents from NDJSON or CSV")
+    load.add_argument("path", help='file to import, or "-" for stdin')
+    load.add_argument("--format", choices=["ndjson", "csv"], default=None,
+                      help="input format (default: csv for *.csv files, ndjson otherwise)")
+    load.add_argument("--chunk-size", type=int, default=importer.DEFAULT_CHUNK_SIZE,
+                      help=f"rows validated and loaded per transaction (default: {importer.DEFAULT_CHUNK_SIZE})")
+    load.set_defaults(handler=import_incidents)
+
+    seed = commands.add_parser("seed-metrics", help="set incidents_open_total from the database before the workers start")
+    seed.add_argument("--timeout", type=float, default=30,
+                      help="seconds to wait for the database (default: 30)")
+    seed.set_defaults(handler=seed_metrics)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
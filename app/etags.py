@@ -0,0 +1,34 @@
+import hashlib
+
+from fastapi import Response
+
+# Conditional GET for the endpoints dashboards and bots poll.
+#
+# Every response carries a strong ETag; a client that sends it back in
+# If-None-Match gets an empty 304 when nothing changed. The tags are cheap:
+#   list  — a hash of the (id, version) pairs of the page, from a narrow query
+#           on the pagination index; rows are neither loaded nor serialized
+#   by id — a hash of the cached JSON body, so a 304 on a cache hit costs no query
+
+
+def rows_etag(rows) -> str:
+    """ETag of a page of rows that have .id and .version (see Incident.version)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        digest.update(b"%d:%d," % (row.id, row.version))
+    return f'"{digest.hexdigest()}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match holds "*" or a comma-separated list of (possibly weak) tags"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import queue
+import select as select_module
+import threading
+import uuid
+from collections import deque
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app import database
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import (
+    incident_stream_subscribers,
+    incident_stream_events_total,
+    incident_stream_slow_consumers_total
+)
+from app.models import Incident
+from app.serialization import INCIDENT_COLUMNS, dumps, incident_dicts
+
+logger = logging.getLogger(__name__)
+
+
+# Change feed behind GET /incidents/stream (Server-Sent Events).
+#
+# Write paths call publish_events() inside their transaction. Subscribers only
+# ever hear about committed changes:
+#   PostgreSQL — a NOTIFY on the "incident_events" channel, delivered at commit
+#                to every worker's listener (and dropped on rollback)
+#   SQLite     — queued on the Session and handed to this worker's bus after commit
+#
+# Each worker runs ONE bus thread (the LISTEN connection on Postgres), started
+# by the first subscriber. It loads the changed incidents once per event and
+# fans the encoded SSE frame out to every subscriber of the worker:
+#   - each subscriber has a bounded queue; one that falls behind by more than
+#     event_buffer_size events is disconnected instead of buffering forever
+#   - the last event_replay_size frames are kept so a client reconnecting with
+#     Last-Event-ID misses nothing; if it's too far behind (or was on another
+#     worker) it gets a "reset" event and should reload GET /incidents
+
+CHANNEL = "incident_events"
+NOTIFY_IDS = 500   # ids per NOTIFY — keeps the payload far below Postgres' 8000-byte limit
+PENDING_KEY = "pending_incident_events"
+
+
+def publish_events(db: Session, event_type: str, incident_ids):
+    """Announce created/updated/resolved/deleted incidents — call before db.commit()"""
+    ids = list(incident_ids)
+    if not ids or not settings.incident_events:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        for start in range(0, len(ids), NOTIFY_IDS):
+            payload = json.dumps({"type": event_type, "ids": ids[start:start + NOTIFY_IDS]})
+            db.execute(select(func.pg_notify(CHANNEL, payload)))
+    else:
+        db.info.setdefault(PENDING_KEY, []).append((event_type, ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed(session):
+    for event_type, ids in session.info.pop(PENDING_KEY, []):
+        event_bus.dispatch(event_type, ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+class Subscriber:
+    def __init__(self, buffer_size: int, after: int):
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.after = after       # events up to this sequence number were sent as backlog
+        self.dropped = False     # set when the queue overflowed — the stream ends
+
+
+class IncidentEventBus:
+    def __init__(self, buffer_size: int = 256, replay_size: int = 1000):
+        self.buffer_size = buffer_size
+        self.epoch = uuid.uuid4().hex[:8]     # event ids are "<epoch>-<seq>", only valid on this bus
+        self._seq = 0
+        self._replay = deque(maxlen=replay_size)   # (seq, frame)
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()         # guards _seq, _replay, epoch and the subscriber set
+        self._inbox = queue.Queue()           # committed (event_type, ids) on SQLite
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ── event loop side ──────────────────────────────────────────────────────
+    def subscribe(self, last_event_id: str = None):
+        """Returns (subscriber, backlog frames to send first)"""
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            subscriber = Subscriber(self.buffer_size, after=self._seq)
+            backlog = self._backlog(last_event_id)
+            self._subscribers.add(subscriber)
+        incident_stream_subscribers.inc()
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.discard(subscriber)
+                incident_stream_subscribers.dec()
+
+    def _backlog(self, last_event_id):
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition("-")
+        oldest = self._replay[0][0] if self._replay else self._seq + 1
+        if epoch != self.epoch or not seq.isdigit() or not oldest - 1 <= int(seq) <= self._seq:
+            return [self._reset_frame()]
+        return [frame for number, frame in self._replay if number > int(seq)]
+
+    def _reset_frame(self) -> bytes:
+        return f"id: {self.epoch}-{self._seq}\nevent: reset\ndata: {{}}\n\n".encode()
+
+    def _fan_out(self, frames):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for number, frame in frames:
+                if number <= subscriber.after:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(frame)
+                except asyncio.QueueFull:
+                    # Slow consumer: disconnect it, it can resume with Last-Event-ID
+                    subscriber.dropped = True
+                    self.unsubscribe(subscriber)
+                    incident_stream_slow_consumers_total.inc()
+                    break
+
+    # ── bus thread side ──────────────────────────────────────────────────────
+    def start(self, timeout: float = 5):
+        """Start the bus thread once per worker; waits (briefly) until it's listening"""
+        with self._lock:
+            if self._thread is None:
+                database.init_engine()
+                listen = database.engine.dialect.name == "postgresql"
+                self._thread = threading.Thread(
+                    target=self._listen if listen else self._drain_inbox, name="incident-events", daemon=True
+                )
+                self._thread.start()
+        self._ready.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        self._inbox.put(None)
+
+    def dispatch(self, event_type: str, ids):
+        """In-process path (SQLite): committed changes from any thread"""
+        if self._thread is not None:
+            self._inbox.put((event_type, ids))
+
+    def _drain_inbox(self):
+        self._ready.set()
+        while not self._stop.is_set():
+            item = self._inbox.get()
+            if item is None:
+                continue
+            try:
+                self._deliver(*item)
+            except Exception:
+                logger.exception("Could not publish incident events")
+
+    def _listen(self):
+        """One LISTEN connection per worker, outside the pool; reconnects with backoff"""
+        delay = 1
+        while not self._stop.is_set():
+            connection = None
+            try:
+                cargs, cparams = database.engine.dialect.create_connect_args(database.engine.url)
+                connection = database.engine.dialect.connect(*cargs, **cparams)
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {CHANNEL}")
+                self._ready.set()
+                delay = 1
+                while not self._stop.is_set():
+                    if select_module.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        payload = json.loads(connection.notifies.pop(0).payload)
+                        self._deliver(payload["type"], payload["ids"])
+            except Exception:
+                logger.exception("Incident event listener failed, reconnecting in %ss", delay)
+                self._restart_epoch()   # notifications may have been missed
+                self._stop.wait(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _deliver(self, event_type: str, ids):
+        rows = {}
+        if event_type != "deleted":
+            try:
+                with SessionLocal() as db:
+                    rows = {row.id: row for row in db.execute(select(*INCIDENT_COLUMNS).where(Incident.id.in_(ids)))}
+            except Exception:
+                logger.exception("Could not load incidents for change events, sending ids only")
+        data = {incident_id: dumps({"id": incident_id}) for incident_id in ids}
+        data.update({row_id: dumps(incident) for row_id, incident in zip(rows, incident_dicts(rows.values()))})
+        self._publish([(event_type, data[incident_id]) for incident_id in ids])
+
+    def _publish(self, events):
+        """Number, encode and remember the events once, then fan out on the event loop"""
+        frames = []
+        with self._lock:
+            for event_type, data in events:
+                self._seq += 1
+                frame = f"id: {self.epoch}-{self._seq}\nevent: {event_type}\ndata: ".encode() + data + b"\n\n"
+                self._replay.append((self._seq, frame))
+                frames.append((self._seq, frame))
+            loop = self._loop
+        for event_type, _ in events:
+            incident_stream_events_total.labels(event=event_type).inc()
+        self._send(loop, frames)
+
+    def _restart_epoch(self):
+        """Tell current subscribers to reload; old Last-Event-IDs can no longer resume"""
+        with self._lock:
+            self.epoch = uuid.uuid4().hex[:8]
+            self._replay.clear()
+            self._seq += 1
+            frames = [(self._seq, self._reset_frame())]
+            loop = self._loop
+        self._send(loop, frames)
+
+    def _send(self, loop, frames):
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, frames)
+        except RuntimeError:
+            pass   # the event loop is gone (shutting down)
+
+
+# One bus per worker process
+event_bus = IncidentEventBus(buffer_size=settings.event_buffer_size, replay_size=settings.event_replay_size)
+
+
+async def sse_stream(last_event_id: str = None, bus: IncidentEventBus = None):
+    """SSE body for one client: backlog first, then live events, keepalives when idle"""
+    bus = bus or event_bus
+    await asyncio.to_thread(bus.start)
+    subscriber, backlog = bus.subscribe(last_event_id)
+    try:
+        yield b"retry: 3000\n\n"   # reconnect after 3s (with Last-Event-ID)
+        for frame in backlog:
+            yield frame
+        while not subscriber.dropped:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.event_heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if subscriber.dropped:
+                break
+            yield frame
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+def stop_event_bus():
+    event_bus.stop()
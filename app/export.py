@@ -0,0 +1,58 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.serialization import INCIDENT_COLUMNS, INCIDENT_FIELDS
+
+EXPORT_COLUMNS = INCIDENT_COLUMNS
+EXPORT_FIELDS = INCIDENT_FIELDS
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _plain(value):
+    """Enum → its value, datetime → ISO 8601, everything else unchanged"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(rows) -> str:
+    return "".join(
+        json.dumps({field: _plain(value) for field, value in zip(EXPORT_FIELDS, row)}) + "\n"
+        for row in rows
+    )
+
+
+def _csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def stream_export(db: Session, query: Select, fmt: str, batch_size: int = 1000):
+    """
+    Yield the export body one batch of rows at a time.
+
+    yield_per makes the driver fetch batch_size rows per round trip — on Postgres
+    through a server-side (named) cursor — so only one batch is ever in memory,
+    however many rows the export has. Plain column tuples, no ORM objects.
+    """
+    encode = _ndjson if fmt == "ndjson" else _csv
+    try:
+        if fmt == "csv":
+            yield ",".join(EXPORT_FIELDS) + "\r\n"
+
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield encode(rows)
+    finally:
+        db.close()
@@ -0,0 +1,361 @@
+import hashlib
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.admission import storm_admission
+from app.cache import LRUCache, invalidate_incidents
+from app.config import settings
+from app.events import publish_events
+from app.models import Incident, IncidentAlert, IncidentStatus, SeverityLevel
+from app.rollup import as_utc, record_created, record_resolved
+from app.schemas import AlertmanagerAlert
+from app.timeline import record_timeline
+from app.metrics import (
+    incidents_created_total,
+    incidents_resolved_total,
+    incidents_open_gauge,
+    incident_resolution_duration,
+    alerts_shed_total,
+    alerts_coalesced_total
+)
+
+# fingerprint → id of the OPEN incident for that alert.
+# Only a hint: every write below re-checks "status != resolved" in SQL,
+# so a stale entry (incident resolved by hand, or by another worker) is harmless.
+open_incident_ids = LRUCache(maxsize=settings.dedup_cache_size)
+
+
+def _real_time(value):
+    """Alertmanager uses 0001-01-01T00:00:00Z for 'not set'"""
+    if value is None or value.year <= 1:
+        return None
+    return as_utc(value)
+
+
+def _clip(value, column):
+    """Cut a string to the column's length — a long summary must not fail the whole batch"""
+    return value[:column.type.length] if value else value
+
+
+def _alert_to_row(alert: AlertmanagerAlert) -> dict:
+    # Map Prometheus severity label to our SeverityLevel enum
+    raw_severity = alert.labels.get("severity", "medium").lower()
+    severity = raw_severity if raw_severity in SeverityLevel.__members__ else "medium"
+
+    return {
+        "title": _clip(alert.annotations.get("summary", alert.labels.get("alertname", "Unknown Alert")), Incident.title),
+        "description": alert.annotations.get("description", ""),
+        "severity": severity,
+        "source": "alertmanager",
+        "alert_name": _clip(alert.labels.get("alertname"), Incident.alert_name),
+        "fingerprint": alert.fingerprint,
+        "status": IncidentStatus.open,
+        # Start the MTTR clock when the alert started, not when we heard about it
+        "created_at": _real_time(alert.startsAt) or datetime.now(timezone.utc),
+    }
+
+
+def _lookup_open(db: Session, fingerprints, use_cache: bool = True) -> dict:
+    """fingerprint → open incident id. Cache first, one indexed SELECT for the misses."""
+    found, misses = {}, []
+    for fingerprint in fingerprints:
+        incident_id = open_incident_ids.get(fingerprint) if use_cache else None
+        if incident_id is None:
+            misses.append(fingerprint)
+        else:
+            found[fingerprint] = incident_id
+
+    if misses:
+        rows = db.execute(
+            select(Incident.fingerprint, Incident.id).where(
+                Incident.fingerprint.in_(misses),
+                Incident.status != IncidentStatus.resolved
+            )
+        )
+        for fingerprint, incident_id in rows:
+            found[fingerprint] = incident_id
+
+    return found
+
+
+def _update_open(db: Session, fingerprints, build_statement) -> list:
+    """
+    Run an UPDATE ... RETURNING against the open incidents owning these fingerprints.
+    build_statement(found) gets {fingerprint: id} and returns the statement.
+    Ids that didn't come back were stale cache entries — re-resolve them from the DB once.
+    """
+    found = _lookup_open(db, fingerprints)
+    rows = list(db.execute(build_statement(found))) if found else []
+
+    touched = {row.id for row in rows}
+    stale = [fp for fp, incident_id in found.items() if incident_id not in touched]
+    if stale:
+        for fingerprint in stale:
+            open_incident_ids.pop(fingerprint)
+        retry = _lookup_open(db, stale, use_cache=False)
+        if retry:
+            rows += list(db.execute(build_statement(retry)))
+
+    return rows
+
+
+def _insert_new(db: Session):
+    """INSERT that skips alerts which already have an open incident (uq_incidents_open_fingerprint)"""
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    return dialect_insert(Incident).on_conflict_do_nothing(
+        index_elements=[Incident.fingerprint],
+        index_where=text("status <> 'resolved'")   # must match the partial index's WHERE
+    )
+
+
+# ── ALERT STORMS ─────────────────────────────────────────────────────────────
+# New alerts over their alertname's admission limit (app/admission.py) are folded
+# into one open "alert storm" incident per alertname: one IncidentAlert row per
+# folded alert, and occurrence_count on the storm incident counts them.
+
+def storm_fingerprint(alertname: str) -> str:
+    """Dedup key of the open storm incident for an alertname (fits fingerprint's 64 chars)"""
+    return "storm:" + hashlib.sha1(alertname.encode()).hexdigest()
+
+
+def _storm_row(alertname: str, folded: dict) -> dict:
+    severities = list(SeverityLevel.__members__)
+    return {
+        "title": _clip(f"Alert storm: {alertname}", Incident.title),
+        "description": (
+            f"More new {alertname} alerts than the admission limit allows: the extra alerts are folded into "
+            f"this incident. occurrence_count says how many, GET /incidents/<id>/alerts lists their labels."
+        ),
+        "severity": max((row["severity"] for row in folded.values()), key=severities.index),
+        "source": "alertmanager",
+        "alert_name": alertname,
+        "fingerprint": storm_fingerprint(alertname),
+        "status": IncidentStatus.open,
+        "created_at": min(row["created_at"] for row in folded.values()),
+    }
+
+
+def _fold_storms(db: Session, new: dict, admissions: dict) -> tuple[dict, Counter]:
+    """
+    Take the alerts that won't get an incident of their own out of `new` (fingerprint → row):
+    repeats of alerts already folded into an open storm incident, and new alerts over
+    their alertname's admission limit. Returns ({alertname: {fingerprint: row}}, shed per alertname).
+    `admissions` (alertname → admitted) keeps the decisions for a retry of the same payload.
+    """
+    named = [fp for fp, row in new.items() if row["alert_name"]]
+    storms, shed = defaultdict(dict), Counter()
+    if not named:
+        return storms, shed
+
+    already = set(db.scalars(
+        select(IncidentAlert.fingerprint)
+        .join(Incident, Incident.id == IncidentAlert.incident_id)
+        .where(IncidentAlert.fingerprint.in_(named), Incident.status != IncidentStatus.resolved)
+    ))
+    for fp in already:
+        row = new.pop(fp)
+        storms[row["alert_name"]][fp] = row
+
+    by_alertname = defaultdict(list)
+    for fp in named:
+        if fp in new:
+            by_alertname[new[fp]["alert_name"]].append(fp)
+    for alertname, fingerprints in by_alertname.items():
+        # Tokens are taken once per payload — a retry after IntegrityError reuses the decision
+        if alertname not in admissions:
+            admissions[alertname] = storm_admission.admit(alertname, len(fingerprints))
+        admitted = min(admissions[alertname], len(fingerprints))
+        for fp in fingerprints[admitted:]:
+            storms[alertname][fp] = new.pop(fp)
+        shed[alertname] += len(fingerprints) - admitted
+
+    return storms, shed
+
+
+def _coalesce(db: Session, storms: dict, parents: dict, labels: dict) -> Counter:
+    """Attach folded alerts to their storm incident and recount it. Returns new alerts per alertname."""
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    added = db.execute(
+        dialect_insert(IncidentAlert)
+        .on_conflict_do_nothing(index_elements=[IncidentAlert.incident_id, IncidentAlert.fingerprint])
+        .returning(IncidentAlert.incident_id),
+        [
+            {"incident_id": parents[storm_fingerprint(alertname)], "fingerprint": fp,
+             "labels": labels[fp], "created_at": row["created_at"]}
+            for alertname, folded in storms.items() for fp, row in folded.items()
+        ]
+    ).scalars().all()
+
+    # Recount instead of adding, so concurrent workers can't get the total wrong
+    db.execute(
+        update(Incident)
+        .where(Incident.id.in_([parents[storm_fingerprint(alertname)] for alertname in storms]))
+        .values(occurrence_count=(
+            select(func.count()).where(IncidentAlert.incident_id == Incident.id).scalar_subquery()
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+    names = {parents[storm_fingerprint(alertname)]: alertname for alertname in storms}
+    return Counter(names[incident_id] for incident_id in added)
+
+
+# ── INGEST ───────────────────────────────────────────────────────────────────
+def _ingest(db: Session, alerts: list[AlertmanagerAlert], admissions: dict) -> dict:
+    firing, resolved, anonymous, labels = {}, {}, [], {}
+
+    for alert in alerts:
+        if alert.status == "firing":
+            if alert.fingerprint:
+                firing[alert.fingerprint] = _alert_to_row(alert)   # last one in the payload wins
+                labels[alert.fingerprint] = alert.labels
+            else:
+                anonymous.append(_alert_to_row(alert))
+        elif alert.status == "resolved" and alert.fingerprint:
+            resolved[alert.fingerprint] = _real_time(alert.endsAt) or datetime.now(timezone.utc)
+
+    def bump(found):
+        return (
+            update(Incident)
+            .where(Incident.id.in_(found.values()), Incident.status != IncidentStatus.resolved)
+            .values(updated_at=func.now())
+            .returning(Incident.id, Incident.fingerprint)
+            .execution_options(synchronize_session=False)
+        )
+
+    # 1. Repeats of alerts we already have an open incident for → bump in place
+    repeated = _update_open(db, list(firing), bump) if firing else []
+
+    # 2. Everything else is new → one bulk INSERT ... RETURNING for the whole payload
+    seen = {row.fingerprint for row in repeated}
+    new = {fp: row for fp, row in firing.items() if fp not in seen}
+
+    # ...except alerts folded into a storm incident, which is inserted here if it's not open yet
+    storms, shed, parents = {}, Counter(), {}
+    if new and settings.storm_control:
+        storms, shed = _fold_storms(db, new, admissions)
+        if storms:
+            parents = _lookup_open(db, [storm_fingerprint(alertname) for alertname in storms], use_cache=False)
+    rows = list(new.values()) + anonymous + [
+        _storm_row(alertname, folded) for alertname, folded in storms.items()
+        if storm_fingerprint(alertname) not in parents
+    ]
+    created = []
+    if rows:
+        created = sorted(db.execute(_insert_new(db).returning(Incident.id, Incident.fingerprint), rows),
+                         key=lambda row: row.id)
+
+        # Fingerprints another worker opened since our lookup were skipped by
+        # ON CONFLICT DO NOTHING — they are repeats after all
+        inserted = {row.fingerprint for row in created}
+        lost = [row["fingerprint"] for row in rows if row["fingerprint"] and row["fingerprint"] not in inserted]
+        if lost:
+            repeated += _update_open(db, lost, bump)
+            rows = [row for row in rows if not row["fingerprint"] or row["fingerprint"] in inserted]
+
+    coalesced = Counter()
+    if storms:
+        storm_fingerprints = {storm_fingerprint(alertname) for alertname in storms}
+        parents.update({row.fingerprint: row.id for row in created if row.fingerprint in storm_fingerprints})
+        missing = storm_fingerprints - set(parents)
+        if missing:   # opened by another worker since the lookup
+            parents.update(_lookup_open(db, list(missing), use_cache=False))
+        coalesced = _coalesce(db, storms, parents, labels)
+    storm_ids = sorted(set(parents.values()))
+
+    # 3. Resolved notifications → close the matching open incidents in one UPDATE
+    closed = []
+    if resolved:
+        closed = _update_open(db, list(resolved), lambda found: (
+            update(Incident)
+            .where(Incident.id.in_(found.values()), Incident.status != IncidentStatus.resolved)
+            .values(
+                status=IncidentStatus.resolved,
+                resolved_at=case(
+                    {incident_id: resolved[fp] for fp, incident_id in found.items()},
+                    value=Incident.id,
+                    else_=func.now()
+                )
+            )
+            .returning(Incident.id, Incident.fingerprint, Incident.severity, Incident.source,
+                       Incident.created_at, Incident.resolved_at)
+            .execution_options(synchronize_session=False)
+        ))
+
+    # Hourly MTTR/volume rollups, same transaction
+    record_created(db, [(row["created_at"], row["severity"], row["source"]) for row in rows])
+    record_resolved(db, [(row.created_at, row.resolved_at, row.severity, row.source) for row in closed])
+
+    # Timeline entries — one small INSERT each, the incident rows aren't touched
+    record_timeline(db, [
+        *[(row.id, "created", {"source": "alertmanager", "fingerprint": row.fingerprint}) for row in created],
+        *[(row.id, "alert_repeated", {"fingerprint": row.fingerprint}) for row in repeated],
+        *[(parents[storm_fingerprint(alertname)], "alerts_folded", {"count": count})
+          for alertname, count in coalesced.items() if count],
+        *[(row.id, "resolved", {"source": "alertmanager", "fingerprint": row.fingerprint}) for row in closed],
+    ])
+
+    # Repeats only bump updated_at — not worth an event
+    publish_events(db, "created", [row.id for row in created])
+    created_ids = {row.id for row in created}
+    publish_events(db, "updated", [incident_id for incident_id in storm_ids if incident_id not in created_ids])
+    publish_events(db, "resolved", [row.id for row in closed])
+    db.commit()
+
+    # Only touch the cache once the transaction is durable
+    for row in list(repeated) + created:
+        if row.fingerprint:
+            open_incident_ids.set(row.fingerprint, row.id)
+    for row in closed:
+        open_incident_ids.pop(row.fingerprint)
+    invalidate_incidents([row.id for row in list(repeated) + closed] + storm_ids)
+
+    # Update Prometheus metrics once per severity, not once per alert
+    for severity, count in Counter(row["severity"] for row in rows).items():
+        incidents_created_total.labels(severity=severity, source="alertmanager").inc(count)
+        incidents_open_gauge.labels(severity=severity).inc(count)
+
+    for severity, count in Counter(row.severity.value for row in closed).items():
+        incidents_resolved_total.labels(severity=severity).inc(count)
+        incidents_open_gauge.labels(severity=severity).dec(count)
+    for row in closed:
+        duration = (as_utc(row.resolved_at) - as_utc(row.created_at)).total_seconds()
+        incident_resolution_duration.labels(severity=row.severity.value).observe(duration)
+
+    for alertname, count in shed.items():
+        if count:
+            alerts_shed_total.labels(alertname=alertname).inc(count)
+    for alertname, count in coalesced.items():
+        alerts_coalesced_total.labels(alertname=alertname).inc(count)
+
+    return {
+        "message": f"Created {len(created)} incident(s)",
+        "incident_ids": [row.id for row in created],
+        "updated_ids": [row.id for row in repeated],
+        "resolved_ids": [row.id for row in closed],
+        "storm_ids": storm_ids,   # alert-storm incidents that alerts of this payload were folded into
+    }
+
+
+def ingest_alerts(db: Session, alerts: list[AlertmanagerAlert]) -> dict:
+    """
+    Turn one Alertmanager payload into incidents, in a single transaction:
+    repeats update the open incident, new alerts are bulk-inserted,
+    resolved alerts close their incident.
+    """
+    admissions = {}   # storm admission is decided once, not again by the retry
+    try:
+        return _ingest(db, alerts, admissions)
+    except IntegrityError:
+        # Another worker opened an incident for the same fingerprint between our
+        # lookup and our INSERT. Start over without trusting the cache.
+        db.rollback()
+        for alert in alerts:
+            if alert.fingerprint:
+                open_incident_ids.pop(alert.fingerprint)
+        return _ingest(db, alerts, admissions)
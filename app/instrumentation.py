@@ -0,0 +1,100 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.metrics import (
+    db_pool_checkout_wait_seconds,
+    db_pool_connections_in_use,
+    db_pool_capacity,
+    db_queries_per_request,
+    db_query_duration_seconds
+)
+
+
+# ── POOL CHECKOUT WAIT ───────────────────────────────────────────────────────
+# SQLAlchemy has no "before checkout" event, so the wait is timed around the
+# pool's own _do_get(). The pool label comes from create_engine(pool_logging_name=...).
+
+class _TimedCheckout:
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.labels(pool=self.logging_name or "default").observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+# ── PER-REQUEST QUERY STATS ──────────────────────────────────────────────────
+# The middleware below puts a fresh list in this ContextVar for every request.
+# The cursor listeners append each statement's duration to it — the list is
+# shared with the threadpool/greenlet running the route because contextvars
+# are copied into them. The route template is only known after routing, so
+# the histograms are observed once the response is done.
+#
+# The start time lives on the statement's execution context, not the connection:
+# a failed statement never reaches after_cursor_execute, and anything it left on
+# a pooled connection would stay there for the connection's lifetime.
+
+_request_queries: ContextVar = ContextVar("request_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start
+    queries = _request_queries.get()
+    if queries is None:
+        # Outside an HTTP request (startup, background jobs)
+        db_query_duration_seconds.labels(route="background").observe(duration)
+    else:
+        queries.append(duration)
+
+
+def instrument_engine(engine, pool_label: str):
+    """Attach pool occupancy and SQL timing listeners to a (sync) Engine"""
+    pool = engine.pool
+    if hasattr(pool, "size"):
+        db_pool_capacity.labels(pool=pool_label).set(pool.size() + max(pool._max_overflow, 0))
+
+    event.listen(engine, "checkout", lambda *args: db_pool_connections_in_use.labels(pool=pool_label).inc())
+    event.listen(engine, "checkin", lambda *args: db_pool_connections_in_use.labels(pool=pool_label).dec())
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryMetricsMiddleware:
+    """Pure ASGI middleware — publishes per-route SQL count and duration histograms"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = []
+        token = _request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            route = scope.get("route")
+            # Unmatched paths (404s, scanners) all share one label to keep cardinality bounded
+            label = route.path if route is not None else "unmatched"
+            db_queries_per_request.labels(route=label).observe(len(queries))
+            for duration in queries:
+                db_query_duration_seconds.labels(route=label).observe(duration)
@@ -1,25 +1,112 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy import func, select
+
+from app.config import settings
+from app import database
+from app.database import SessionLocal, init_engine
+from app.events import stop_event_bus
+from app.instrumentation import QueryMetricsMiddleware
+from app.replicas import ReadYourWritesMiddleware
+from app.metrics import incidents_open_gauge, claim_open_gauge_seed, mark_worker_dead
+from app.prober import db_prober, stop_db_prober
+from app.models import Incident, IncidentStatus, SeverityLevel
+from app.spool import start_spool, stop_spool
+from app.routes import incidents, health, incidents_async, health_async
+
+logger = logging.getLogger(__name__)
+
+# The schema is managed by Alembic migrations (alembic upgrade head), never at
+# startup — see migrations/.
+
+
+def seed_open_incidents_gauge(timeout: float = None) -> bool:
+    """
+    Set incidents_open_total from one grouped COUNT(*) — the only time it reads the DB.
+    Must run before any request is served: from then on the gauge only moves by
+    inc()/dec(), and an incident both counted here and inc()'d would count twice.
+    Gives up after `timeout` seconds; returns whether the gauge was seeded.
+    """
+    result = {}
 
-from app.database import engine, Base
-from app.routes import incidents, health
+    def count():
+        try:
+            with SessionLocal() as db:
+                result["counts"] = dict(db.execute(
+                    select(Incident.severity, func.count())
+                    .where(Incident.status != IncidentStatus.resolved)
+                    .group_by(Incident.severity)
+                ).all())
+        except Exception:
+            logger.exception("Could not seed incidents_open_total from the database")
+
+    # In a thread only so that a database that never answers can be given up on
+    counter = threading.Thread(target=count, name="seed-open-gauge", daemon=True)
+    counter.start()
+    counter.join(timeout)
+    if "counts" not in result:   # failed, or still waiting — a late answer is ignored
+        return False
+
+    for severity in SeverityLevel:
+        incidents_open_gauge.labels(severity=severity.value).set(result["counts"].get(severity, 0))
+    return True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here waits long for the database: creating the engine opens no
+    # connection, and the gauge seed gives up after OPEN_GAUGE_SEED_TIMEOUT. A slow
+    # or unreachable DB shows up on /health/ready, not as a worker that never starts.
+    init_engine()
+    # Seeded before this worker serves anything. With several workers the Dockerfile
+    # seeds once before they fork (python -m app.cli seed-metrics) and they skip this.
+    if claim_open_gauge_seed():
+        if settings.web_concurrency > 1:
+            logger.warning("Seeding incidents_open_total from a worker — run `python -m app.cli seed-metrics` "
+                           "before starting several workers, or writes on the others during startup count twice")
+        if not seed_open_incidents_gauge(timeout=settings.open_gauge_seed_timeout):
+            logger.warning("incidents_open_total not seeded (no answer within %ss, or the error above); "
+                           "it only counts changes until the next restart", settings.open_gauge_seed_timeout)
+    db_prober.start()   # background health probes — /health/ready reads their result
+    if settings.ingest_mode == "spool":
+        start_spool(SessionLocal)   # replays anything left from before the restart
+    yield
+    stop_spool()
+    stop_event_bus()
+    stop_db_prober()
+    mark_worker_dead()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
 
-# Create all database tables on startup
-# In production you'd use Alembic migrations instead
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Incident Logger",
     description="SRE Incident Management API — part of PulseOps observability platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ── ROUTES ───────────────────────────────────────────────────────────────────
-app.include_router(health.router)
-app.include_router(incidents.router)
+# DB_ASYNC=true swaps in the async (AsyncSession + asyncpg) versions of the routes
+if settings.db_async:
+    app.include_router(health_async.router)
+    app.include_router(incidents_async.router)
+else:
+    app.include_router(health.router)
+    app.include_router(incidents.router)
+
+# Clients that just wrote read from the primary for a few seconds (see app/replicas.py)
+app.add_middleware(ReadYourWritesMiddleware)
 
 # ── PROMETHEUS ───────────────────────────────────────────────────────────────
+# Per-route SQL query count/duration histograms (pool metrics are wired in app/database.py)
+app.add_middleware(QueryMetricsMiddleware)
+
 # Automatically exposes /metrics endpoint with HTTP request metrics
 # Prometheus scrapes this endpoint every 15 seconds
 Instrumentator().instrument(app).expose(app)
@@ -1,4 +1,14 @@
-from prometheus_client import Counter, Gauge, Histogram
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+
+# ── MULTI-WORKER MODE ────────────────────────────────────────────────────────
+# uvicorn --workers N runs N processes, each with its own copy of every metric.
+# With PROMETHEUS_MULTIPROC_DIR set (see Dockerfile), prometheus_client writes
+# the values to mmap files in that directory and /metrics merges all workers.
+# Counters and histograms just add up. Gauges need a multiprocess_mode (below).
+# The directory must be emptied before the workers start.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
 
 # --- COUNTERS ---
 # Counters only go UP. Perfect for counting events over time.
@@ -26,10 +36,17 @@ alertmanager_webhooks_total = Counter(
 # --- GAUGES ---
 # Gauges go UP and DOWN. Perfect for current state.
 
+# Seeded once at startup from a single GROUP BY, before anything is served (see
+# app/main.py), then kept up to date with inc()/dec() — a scrape never queries the
+# database. With several workers one process seeds it before they fork
+# (`python -m app.cli seed-metrics` in the Dockerfile); its file stays and is summed.
+# "sum" keeps the share of workers that died, so a restarted worker
+# doesn't lose the seed or the deltas of the worker it replaced.
 incidents_open_gauge = Gauge(
     name="incidents_open_total",
     documentation="Current number of open incidents",
-    labelnames=["severity"]
+    labelnames=["severity"],
+    multiprocess_mode="sum"
 )
 
 
@@ -37,10 +54,222 @@ incidents_open_gauge = Gauge(
 # Histograms track distributions. Perfect for measuring time durations.
 # This is how you calculate MTTR (Mean Time To Resolve).
 
+# Buckets: 5min, 15min, 30min, 1hr, 2hr, 4hr, 8hr, 24hr
+# (also the histogram columns of the incident_rollups table)
+RESOLUTION_BUCKETS = [300, 900, 1800, 3600, 7200, 14400, 28800, 86400]
+
 incident_resolution_duration = Histogram(
     name="incident_resolution_duration_seconds",
     documentation="Time taken to resolve an incident in seconds",
     labelnames=["severity"],
-    # Buckets: 5min, 15min, 30min, 1hr, 2hr, 4hr, 8hr, 24hr
-    buckets=[300, 900, 1800, 3600, 7200, 14400, 28800, 86400]
-)
\ No newline at end of file
+    buckets=RESOLUTION_BUCKETS
+)
+
+# --- DATABASE POOL & QUERY METRICS ---
+# Where request latency goes when the DB is the bottleneck.
+# Published by the listeners in app/instrumentation.py.
+
+db_pool_checkout_wait_seconds = Histogram(
+    name="db_pool_checkout_wait_seconds",
+    documentation="Time spent waiting for a connection from the SQLAlchemy pool",
+    labelnames=["pool"],
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+
+db_pool_connections_in_use = Gauge(
+    name="db_pool_connections_in_use",
+    documentation="Connections currently checked out of the pool",
+    labelnames=["pool"],
+    multiprocess_mode="livesum"
+)
+
+db_pool_capacity = Gauge(
+    name="db_pool_capacity",
+    documentation="Maximum connections the pool will open (pool_size + max_overflow)",
+    labelnames=["pool"],
+    multiprocess_mode="livesum"
+)
+
+# Sampled by the background health prober (app/prober.py) every DB_HEALTH_INTERVAL
+db_pool_saturation = Gauge(
+    name="db_pool_saturation",
+    documentation="Share of the pool's capacity checked out at the last health probe (0-1)",
+    labelnames=["pool"],
+    multiprocess_mode="livemax"
+)
+
+db_read_routing_total = Counter(
+    name="db_read_routing_total",
+    documentation="Sessions handed to read-only routes, by database (primary or replicaN)",
+    labelnames=["target"]
+)
+
+db_replica_ejections_total = Counter(
+    name="db_replica_ejections_total",
+    documentation="Times a read replica failed its connection check and was taken out of rotation",
+    labelnames=["replica"]
+)
+
+db_queries_per_request = Histogram(
+    name="db_queries_per_request",
+    documentation="Number of SQL statements executed per HTTP request",
+    labelnames=["route"],
+    buckets=[0, 1, 2, 3, 5, 10, 20, 50, 100]
+)
+
+db_query_duration_seconds = Histogram(
+    name="db_query_duration_seconds",
+    documentation="Duration of individual SQL statements",
+    labelnames=["route"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5]
+)
+
+
+# --- DATABASE HEALTH PROBE (app/prober.py) ---
+# GET /health/ready answers from the prober's last result; these show the same state.
+# Staleness in PromQL: time() - db_probe_last_success_timestamp_seconds
+
+db_probe_latency_seconds = Histogram(
+    name="db_probe_latency_seconds",
+    documentation="Round trip of the health prober's SELECT 1",
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+)
+
+db_probe_up = Gauge(
+    name="db_probe_up",
+    documentation="1 if the last health probe reached the database, 0 if it failed",
+    multiprocess_mode="livemin"   # 0 as soon as any worker can't reach it
+)
+
+db_probe_last_success_timestamp_seconds = Gauge(
+    name="db_probe_last_success_timestamp_seconds",
+    documentation="Unix time of the last successful health probe",
+    multiprocess_mode="livemax"
+)
+
+db_probe_failures_total = Counter(
+    name="db_probe_failures_total",
+    documentation="Health probes that could not reach the database or timed out"
+)
+
+
+# --- RESPONSE CACHE METRICS ---
+# Hit ratio = rate(hits) / (rate(hits) + rate(misses))
+
+incident_cache_requests_total = Counter(
+    name="incident_cache_requests_total",
+    documentation="GET /incidents/{id} cache lookups",
+    labelnames=["result"]  # hit, miss, or bypass (client inside its read-your-writes window)
+)
+
+incident_cache_evictions_total = Counter(
+    name="incident_cache_evictions_total",
+    documentation="Entries dropped from the local incident cache because it was full or expired"
+)
+
+
+# --- BULK IMPORT (python -m app.cli import, POST /incidents/import) ---
+
+incidents_imported_total = Counter(
+    name="incidents_imported_total",
+    documentation="Rows of historical incident imports",
+    labelnames=["result"]  # imported or rejected
+)
+
+
+# --- ALERT-STORM ADMISSION CONTROL ---
+
+alerts_shed_total = Counter(
+    name="alerts_shed_total",
+    documentation="New alerts refused an incident of their own by the per-alertname admission limit",
+    labelnames=["alertname"]
+)
+
+alerts_coalesced_total = Counter(
+    name="alerts_coalesced_total",
+    documentation="Distinct alerts folded into an alert-storm incident",
+    labelnames=["alertname"]
+)
+
+
+# --- CONDITIONAL GET METRICS ---
+# 304 rate = rate(not_modified) / sum(rate) for a route
+
+conditional_get_requests_total = Counter(
+    name="conditional_get_requests_total",
+    documentation="Polled GETs by If-None-Match outcome",
+    labelnames=["route", "result"]  # result: not_modified (304), modified, unconditional (no header)
+)
+
+
+# --- CHANGE FEED (GET /incidents/stream) ---
+
+incident_stream_subscribers = Gauge(
+    name="incident_stream_subscribers",
+    documentation="Open Server-Sent Events connections",
+    multiprocess_mode="livesum"
+)
+
+incident_stream_events_total = Counter(
+    name="incident_stream_events_total",
+    documentation="Change events published to stream subscribers, per worker",
+    labelnames=["event"]  # created, updated, resolved or deleted
+)
+
+incident_stream_slow_consumers_total = Counter(
+    name="incident_stream_slow_consumers_total",
+    documentation="Stream clients disconnected because their event buffer filled up"
+)
+
+
+def claim_open_gauge_seed() -> bool:
+    """
+    True for exactly one process per metrics directory (always True single-process).
+    The first process to create the marker file seeds incidents_open_total
+    (normally `python -m app.cli seed-metrics`, before the workers fork);
+    the workers only add their deltas, so the sum across them stays right.
+    """
+    if not MULTIPROC_DIR:
+        return True
+    try:
+        fd = os.open(os.path.join(MULTIPROC_DIR, "incidents_open.seeded"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def mark_worker_dead():
+    """Drop this worker's live* gauge files on shutdown (no-op single-process)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# --- WRITE-BEHIND INGESTION (INGEST_MODE=spool) ---
+
+ingest_spool_depth = Gauge(
+    name="ingest_spool_depth",
+    documentation="Alertmanager payloads accepted (202) but not yet written to the database",
+    multiprocess_mode="livesum"
+)
+
+ingest_spool_lag_seconds = Gauge(
+    name="ingest_spool_lag_seconds",
+    documentation="Age of the oldest payload still waiting in the spool",
+    multiprocess_mode="livemax"
+)
+
+ingest_spool_drained_total = Counter(
+    name="ingest_spool_drained_total",
+    documentation="Spooled payloads written to the database"
+)
+
+ingest_spool_dead_lettered_total = Counter(
+    name="ingest_spool_dead_lettered_total",
+    documentation="Spooled payloads the database kept rejecting, moved to the dead-letter file"
+)
+
+ingest_spool_rejected_total = Counter(
+    name="ingest_spool_rejected_total",
+    documentation="Payloads refused with 503 because the spool was full"
+)
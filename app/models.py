@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import (
+    Column, Integer, Float, String, Text, DateTime, Enum, Index, JSON, DDL, event, literal_column, text
+)
 from sqlalchemy.sql import func
 import enum
+from datetime import datetime, timezone
 from app.database import Base
 
 
@@ -32,8 +35,206 @@ class Incident(Base):
     status = Column(Enum(IncidentStatus), default=IncidentStatus.open, nullable=False)
     source = Column(String(100), nullable=True)   # e.g. "alertmanager", "manual"
     alert_name = Column(String(255), nullable=True)   # original alert name from Prometheus
+    fingerprint = Column(String(64), nullable=True)   # Alertmanager fingerprint, used for dedup
 
-    # Timestamps — set automatically by the database
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Timestamps — set automatically on insert
+    # created_at also gets a Python-side default so every row has full microsecond
+    # precision (SQLite's CURRENT_TIMESTAMP only has seconds) — keyset pagination
+    # orders by (created_at, id) and needs those values to compare consistently.
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    resolved_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Bumped by every UPDATE (SQLAlchemy adds it to the SET clause), so
+    # (id, version) changes whenever anything in the row does — the ETags of
+    # the read endpoints are built from it (see app/etags.py)
+    version = Column(Integer, nullable=False, server_default=text("1"), onupdate=literal_column("version + 1"))
+
+    # How many alerts this incident stands for: 1, except for alert-storm
+    # incidents, which count the alerts folded into them (see IncidentAlert)
+    occurrence_count = Column(Integer, nullable=False, server_default=text("1"))
+
+    __table_args__ = (
+        # At most one OPEN incident per alert fingerprint.
+        # Partial index = only unresolved rows are indexed, so it stays tiny
+        # no matter how much history the table holds.
+        Index(
+            "uq_incidents_open_fingerprint",
+            "fingerprint",
+            unique=True,
+            postgresql_where=text("status <> 'resolved'"),
+            sqlite_where=text("status <> 'resolved'"),
+        ),
+        # Keyset pagination for GET /incidents — one index per filter shape,
+        # each ending in (created_at, id) to match the ORDER BY
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        Index("ix_incidents_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_incidents_severity_created_at_id", "severity", "created_at", "id"),
+    )
+
+
+# ── FULL-TEXT SEARCH ─────────────────────────────────────────────────────────
+# GET /incidents/search matches keywords in title, alert_name and description.
+# The search structures are database-specific, so they are created with raw DDL
+# right after the incidents table instead of being declared as columns:
+#
+#   PostgreSQL: a generated tsvector column (title/alert_name weighted above the
+#               description) with a GIN index — kept up to date by Postgres itself.
+#   SQLite:     an FTS5 table over the same columns, kept in sync by triggers —
+#               so local and test runs can search without a Postgres server.
+
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE incidents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(alert_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_incidents_search_vector ON incidents USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE incidents_fts USING fts5(
+            title, alert_name, description,
+            content='incidents', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER incidents_fts_insert AFTER INSERT ON incidents BEGIN
+            INSERT INTO incidents_fts (rowid, title, alert_name, description)
+            VALUES (new.id, new.title, new.alert_name, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER incidents_fts_delete AFTER DELETE ON incidents BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, title, alert_name, description)
+            VALUES ('delete', old.id, old.title, old.alert_name, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER incidents_fts_update AFTER UPDATE OF title, alert_name, description ON incidents BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, title, alert_name, description)
+            VALUES ('delete', old.id, old.title, old.alert_name, old.description);
+            INSERT INTO incidents_fts (rowid, title, alert_name, description)
+            VALUES (new.id, new.title, new.alert_name, new.description);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Incident.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+
+def include_in_autogenerate(obj, name, type_, reflected, compare_to) -> bool:
+    """Alembic filter: objects created outside the metadata (search structures above,
+    monthly archive partitions) — don't try to drop them"""
+    if type_ == "table" and name.startswith(("incidents_fts", "incidents_archive_y")):
+        return False
+    return name not in ("search_vector", "ix_incidents_search_vector")
+
+
+# Pre-aggregated incident volume and MTTR per hour.
+# Updated in the same transaction as every create/resolve, so dashboards can
+# answer "MTTR for critical over the last 30 days" by reading ~720 small rows
+# instead of scanning every incident.
+class IncidentRollup(Base):
+    __tablename__ = "incident_rollups"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)   # start of the UTC hour
+    severity = Column(Enum(SeverityLevel), primary_key=True)
+    source = Column(String(100), primary_key=True)               # "manual" when the incident had none
+
+    created_count = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)          # resolved during this hour
+    resolution_seconds_sum = Column(Float, nullable=False, default=0)    # MTTR = sum / resolved_count
+
+    # Resolution-time histogram, same buckets as incident_resolution_duration_seconds.
+    # Each column counts resolutions that took longer than the previous bound and
+    # at most this one (not cumulative).
+    resolved_le_300 = Column(Integer, nullable=False, default=0)
+    resolved_le_900 = Column(Integer, nullable=False, default=0)
+    resolved_le_1800 = Column(Integer, nullable=False, default=0)
+    resolved_le_3600 = Column(Integer, nullable=False, default=0)
+    resolved_le_7200 = Column(Integer, nullable=False, default=0)
+    resolved_le_14400 = Column(Integer, nullable=False, default=0)
+    resolved_le_28800 = Column(Integer, nullable=False, default=0)
+    resolved_le_86400 = Column(Integer, nullable=False, default=0)
+    resolved_le_inf = Column(Integer, nullable=False, default=0)
+
+
+# Resolved incidents older than the retention window, moved out of the hot
+# incidents table by `python -m app.cli archive` (see app/archive.py).
+# Same columns as incidents, minus the search structures and the dedup/filter
+# indexes. On PostgreSQL the table is range-partitioned by month on created_at,
+# so a query for a time window only reads that window's partitions, and old
+# months can be dropped whole. The partition key must be part of the primary key.
+class IncidentArchive(Base):
+    __tablename__ = "incidents_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)   # the id it had in incidents
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    severity = Column(Enum(SeverityLevel), nullable=False)
+    status = Column(Enum(IncidentStatus), nullable=False)
+    source = Column(String(100), nullable=True)
+    alert_name = Column(String(255), nullable=True)
+    fingerprint = Column(String(64), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    occurrence_count = Column(Integer, nullable=False, server_default=text("1"))
+    archived_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_incidents_archive_created_at_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+# The individual alerts folded into an alert-storm incident (app/admission.py):
+# when one alertname fires faster than its admission limit, the extra alerts
+# don't get an incident each — one row here each, under a single parent.
+# Repeats of a folded alert hit the primary key and are not counted twice.
+# incident_id is not a foreign key, like incident_events: the alerts stay with
+# the incident when it moves to incidents_archive (rows go with delete / archive-prune).
+class IncidentAlert(Base):
+    __tablename__ = "incident_alerts"
+
+    incident_id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), primary_key=True)
+    labels = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)   # when the alert started firing
+
+    __table_args__ = (
+        # "is this alert already folded into an open storm incident?"
+        Index("ix_incident_alerts_fingerprint", "fingerprint"),
+    )
+
+
+# Append-only history of each incident: created, updated (with the old and new
+# status/severity), resolved (with the resolution note), alert repeats and storm
+# folds — GET /incidents/{id}/timeline. Written with plain INSERTs next to every
+# change (see app/timeline.py), so the incidents row itself never grows.
+# incident_id is deliberately not a foreign key: the timeline stays readable
+# after the incident moves to incidents_archive (rows go with delete / archive-prune).
+class IncidentEvent(Base):
+    __tablename__ = "incident_events"
+
+    id = Column(Integer, primary_key=True)
+    incident_id = Column(Integer, nullable=False)
+    type = Column(String(32), nullable=False)     # created | updated | resolved | alert_repeated | alerts_folded
+    payload = Column(JSON, nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # One incident's timeline in (ts, id) order — the timeline's keyset pagination
+        Index("ix_incident_events_incident_id_ts_id", "incident_id", "ts", "id"),
+    )
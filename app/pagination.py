@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+# Keyset ("cursor") pagination.
+# Instead of OFFSET (which still reads every skipped row), the client sends back
+# the (created_at, id) of the last row it saw and we continue from there:
+#   WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC
+# With an index on (..., created_at, id) every page is a short index range scan.
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, incident_id: int) -> str:
+    return _encode([created_at.isoformat(), incident_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, incident_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Search results are ordered by relevance, so their cursor is (rank, id) instead
+
+def encode_rank_cursor(rank: float, incident_id: int) -> str:
+    return _encode([rank, incident_id])
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, incident_id = _decode(cursor)
+        return float(rank), int(incident_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,175 @@
+import logging
+import math
+import threading
+import time
+
+from app import database
+from app.config import settings
+from app.metrics import (
+    db_pool_saturation,
+    db_probe_failures_total,
+    db_probe_last_success_timestamp_seconds,
+    db_probe_latency_seconds,
+    db_probe_up
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Background database health prober behind GET /health/ready.
+#
+# Every DB_HEALTH_INTERVAL seconds one thread per worker runs SELECT 1 and
+# samples how full the connection pools are. /health/ready only reads the last
+# result, so a load balancer, Docker or CI polling it never touches the database
+# and never ties up a threadpool thread while the database is slow.
+#
+# The probe uses its own connection, outside the pool:
+#   - a probe never takes a connection a request needs, and a saturated pool
+#     (reported, not failed on) doesn't make the database look down
+#   - connect and statement timeouts (DB_HEALTH_TIMEOUT) bound every probe
+# If the prober itself gets stuck, its last result ages past
+# DB_HEALTH_STALE_SECONDS and readiness fails anyway.
+
+
+class ProbeResult:
+    def __init__(self, ok: bool, latency: float = None, error: str = None, pools: dict = None):
+        self.ok = ok
+        self.latency = latency           # seconds, successful probes only
+        self.error = error
+        self.pools = pools or {}         # pool label → {"in_use", "capacity", "saturation"}
+        self.checked_at = time.monotonic()
+
+
+class DbHealthProber:
+    def __init__(self, interval: float = 5, timeout: float = 2, engine=None):
+        self.interval = interval
+        self.timeout = timeout
+        self._engine = engine            # None = the app's engine, created on first use
+        self._connection = None          # owned by the prober thread only
+        self.result = None               # last ProbeResult; None until the first probe finishes
+        self._probed = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def engine(self):
+        return self._engine or database.init_engine()
+
+    def start(self, wait: float = 0):
+        """Start the prober thread once per worker (again after stop); optionally wait for the first result"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="db-health-prober", daemon=True)
+                self._thread.start()
+        if wait:
+            self._probed.wait(wait)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+        self._disconnect()
+
+    # ── one probe ────────────────────────────────────────────────────────────
+    def _connect(self):
+        engine = self.engine
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        if engine.dialect.name == "postgresql":
+            cparams["connect_timeout"] = max(1, math.ceil(self.timeout))
+            timeout = f"-c statement_timeout={int(self.timeout * 1000)}"
+            cparams["options"] = f"{cparams['options']} {timeout}" if cparams.get("options") else timeout
+        connection = engine.dialect.connect(*cargs, **cparams)
+        if engine.dialect.name == "postgresql":
+            connection.autocommit = True
+        return connection
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _pools(self) -> dict:
+        engines = {"sync": self.engine}
+        if self._engine is None and database.async_engine is not None:
+            engines["async"] = database.async_engine.sync_engine
+        pools = {}
+        for label, engine in engines.items():
+            pool = engine.pool
+            if hasattr(pool, "checkedout"):
+                capacity = pool.size() + max(pool._max_overflow, 0)
+                in_use = pool.checkedout()
+                pools[label] = {"in_use": in_use, "capacity": capacity, "saturation": round(in_use / capacity, 3)}
+        return pools
+
+    def probe(self) -> ProbeResult:
+        """SELECT 1 on the prober's connection, plus pool occupancy; updates the metrics"""
+        try:
+            if self._connection is None:
+                self._connection = self._connect()
+            start = time.perf_counter()
+            cursor = self._connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            latency = time.perf_counter() - start
+        except Exception as error:
+            self._disconnect()   # reconnect on the next probe
+            message = str(error).strip() or repr(error)
+            result = ProbeResult(ok=False, error=message.splitlines()[0])
+            db_probe_failures_total.inc()
+            db_probe_up.set(0)
+            if self.result is None or self.result.ok:
+                logger.warning("Database health probe failed: %s", result.error)
+        else:
+            result = ProbeResult(ok=True, latency=latency, pools=self._pools())
+            db_probe_latency_seconds.observe(latency)
+            db_probe_up.set(1)
+            db_probe_last_success_timestamp_seconds.set(time.time())
+            for label, pool in result.pools.items():
+                db_pool_saturation.labels(pool=label).set(pool["saturation"])
+
+        self.result = result
+        self._probed.set()
+        return result
+
+    # ── readiness ────────────────────────────────────────────────────────────
+    def readiness(self, stale_after: float) -> tuple[int, dict]:
+        """(HTTP status, body) for /health/ready, from the last probe only"""
+        result = self.result
+        if result is None:
+            return 503, {"status": "not ready", "database": "unknown", "error": "no health probe has finished yet"}
+
+        age = time.monotonic() - result.checked_at
+        if age > stale_after:
+            return 503, {
+                "status": "not ready", "database": "unknown",
+                "error": f"last health probe was {age:.0f}s ago", "checked_seconds_ago": round(age, 1)
+            }
+        if not result.ok:
+            return 503, {
+                "status": "not ready", "database": "disconnected",
+                "error": result.error, "checked_seconds_ago": round(age, 1)
+            }
+        return 200, {
+            "status": "ready",
+            "database": "connected",
+            "latency_ms": round(result.latency * 1000, 2),
+            "checked_seconds_ago": round(age, 1),
+            "pools": result.pools,
+        }
+
+
+# One prober per worker process, started by the lifespan (or the first readiness check)
+db_prober = DbHealthProber(interval=settings.db_health_interval, timeout=settings.db_health_timeout)
+
+
+def stop_db_prober():
+    db_prober.stop()
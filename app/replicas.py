@@ -0,0 +1,189 @@
+import itertools
+import logging
+import math
+import time
+from threading import Lock
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import (
+    POOL_OPTIONS, AsyncSessionLocal, SessionLocal, async_url, get_async_db, get_db
+)
+from app.instrumentation import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+from app.metrics import db_read_routing_total, db_replica_ejections_total
+
+logger = logging.getLogger(__name__)
+
+
+# ── READ REPLICAS ────────────────────────────────────────────────────────────
+# With DB_REPLICA_URLS set, the read-only routes (list, get, search, stats,
+# export, archive) take their session from get_read_db instead of get_db:
+#   - replicas are used round-robin, each with its own pool
+#   - a replica whose connection check fails (pool_pre_ping at checkout) is
+#     ejected for DB_REPLICA_EJECT_SECONDS and the next one is tried; with none
+#     left, the read goes to the primary — a dead replica costs no failed requests
+#   - read-your-writes: a successful write sets a short-lived cookie, and while
+#     it's valid that client's reads go to the primary, so it never reads a
+#     replica that hasn't caught up with its own write yet
+# Writes always use get_db — the primary.
+
+STICKY_COOKIE = "db_primary_until"
+
+# The read dependencies tag the session they hand out with where it reads from,
+# so routes that fill a shared cache (GET /incidents/{id}) can tell:
+#   "primary" — safe to cache
+#   "replica" — may lag the primary: serve it, but never cache it
+#   "sticky"  — primary, for a client inside its read-your-writes window: skip the cache
+READ_SOURCE = "read_source"
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str], eject_seconds: float = 30):
+        self.urls = urls
+        self.eject_seconds = eject_seconds
+        self._engines = None         # created on first use, like the primary's
+        self._async_engines = None
+        self._ejected_until = [0.0] * len(urls)
+        self._turn = itertools.count()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.urls)
+
+    def label(self, index: int) -> str:
+        return f"replica{index}"
+
+    def _create_engines(self):
+        with self._lock:
+            if self._engines is not None:
+                return
+            engines, async_engines = [], []
+            for index, url in enumerate(self.urls):
+                engine = create_engine(url, poolclass=TimedQueuePool, pool_logging_name=self.label(index), **POOL_OPTIONS)
+                instrument_engine(engine, self.label(index))
+                engines.append(engine)
+                if settings.db_async:
+                    async_engine = create_async_engine(
+                        async_url(url), poolclass=TimedAsyncQueuePool,
+                        pool_logging_name=f"{self.label(index)}-async", **POOL_OPTIONS
+                    )
+                    instrument_engine(async_engine.sync_engine, f"{self.label(index)}-async")
+                    async_engines.append(async_engine)
+            self._async_engines = async_engines
+            self._engines = engines
+
+    def candidates(self, use_async: bool = False):
+        """(index, engine) of the replicas not currently ejected, round-robin"""
+        self._create_engines()
+        engines = self._async_engines if use_async else self._engines
+        start = next(self._turn)
+        now = time.monotonic()
+        for offset in range(len(engines)):
+            index = (start + offset) % len(engines)
+            if self._ejected_until[index] <= now:
+                yield index, engines[index]
+
+    def eject(self, index: int, error: Exception):
+        self._ejected_until[index] = time.monotonic() + self.eject_seconds
+        db_replica_ejections_total.labels(replica=self.label(index)).inc()
+        logger.warning("Ejecting %s for %ss: %s", self.label(index), self.eject_seconds, error)
+
+
+# Single instance used across the whole app
+replica_set = ReplicaSet(
+    [url.strip() for url in settings.db_replica_urls.split(",") if url.strip()],
+    eject_seconds=settings.db_replica_eject_seconds
+)
+
+
+def reads_from_primary(request: Request) -> bool:
+    """True while the client is inside its read-your-writes window"""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def open_read_session(request: Request):
+    """A Session on a healthy replica — None when the read should go to the primary"""
+    if not replica_set.enabled or reads_from_primary(request):
+        return None
+    for index, replica in replica_set.candidates():
+        db = SessionLocal(bind=replica)
+        try:
+            db.connection()   # check a connection out now, so a dead replica is skipped, not failed on
+        except DBAPIError as error:
+            db.close()
+            replica_set.eject(index, error)
+            continue
+        db_read_routing_total.labels(target=replica_set.label(index)).inc()
+        db.info[READ_SOURCE] = "replica"
+        return db
+    return None
+
+
+# Dependency for read-only routes. Falls back to get_db — the primary (and
+# whatever the tests override it with). An unused primary Session never connects.
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    db = open_read_session(request)
+    if db is None:
+        db_read_routing_total.labels(target="primary").inc()
+        primary.info[READ_SOURCE] = "sticky" if reads_from_primary(request) else "primary"
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request, primary: AsyncSession = Depends(get_async_db)):
+    if replica_set.enabled and not reads_from_primary(request):
+        for index, replica in replica_set.candidates(use_async=True):
+            db = AsyncSessionLocal(bind=replica)
+            try:
+                await db.connection()
+            except DBAPIError as error:
+                await db.close()
+                replica_set.eject(index, error)
+                continue
+            db_read_routing_total.labels(target=replica_set.label(index)).inc()
+            db.info[READ_SOURCE] = "replica"
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
+
+    db_read_routing_total.labels(target="primary").inc()
+    primary.info[READ_SOURCE] = "sticky" if reads_from_primary(request) else "primary"
+    yield primary
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware — marks clients that just wrote, so their reads stick to the primary"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS") or not replica_set.enabled:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.db_read_your_writes_seconds
+                cookie = (
+                    f"{STICKY_COOKIE}={time.time() + window:.3f}; "
+                    f"Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
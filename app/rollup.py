@@ -0,0 +1,201 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, or_, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.metrics import RESOLUTION_BUCKETS
+from app.models import Incident, IncidentArchive, IncidentRollup, IncidentStatus, SeverityLevel
+
+# Columns that are added to (never overwritten) when rows are upserted
+HISTOGRAM_COLUMNS = [f"resolved_le_{le}" for le in RESOLUTION_BUCKETS] + ["resolved_le_inf"]
+COUNTER_COLUMNS = ["created_count", "resolved_count", "resolution_seconds_sum"] + HISTOGRAM_COLUMNS
+
+rollups = IncidentRollup.__table__
+
+
+def as_utc(value: datetime) -> datetime:
+    """Normalize to an aware UTC datetime (SQLite hands back naive UTC values)"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def hour_bucket(value: datetime) -> datetime:
+    return as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def _histogram_column(seconds: float) -> str:
+    for le in RESOLUTION_BUCKETS:
+        if seconds <= le:
+            return f"resolved_le_{le}"
+    return "resolved_le_inf"
+
+
+def _key(ts: datetime, severity, source):
+    return hour_bucket(ts), SeverityLevel(severity), source or "manual"
+
+
+def _add_created(deltas, created_at, severity, source, sign=1):
+    deltas[_key(created_at, severity, source)]["created_count"] += sign
+
+
+def _add_resolved(deltas, resolved_at, severity, source, seconds, sign=1):
+    row = deltas[_key(resolved_at, severity, source)]
+    row["resolved_count"] += sign
+    row["resolution_seconds_sum"] += sign * seconds
+    row[_histogram_column(seconds)] += sign
+
+
+def _add_incident(deltas, incident, sign=1):
+    """What one incident counts for as it stands — the same rule as rebuild()"""
+    if incident.created_at is None:
+        return
+    _add_created(deltas, incident.created_at, incident.severity, incident.source, sign)
+    if incident.status == IncidentStatus.resolved and incident.resolved_at is not None:
+        seconds = (as_utc(incident.resolved_at) - as_utc(incident.created_at)).total_seconds()
+        _add_resolved(deltas, incident.resolved_at, incident.severity, incident.source, seconds, sign)
+
+
+def _new_deltas():
+    return defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+
+
+def _upsert(db: Session, deltas: dict):
+    """One multi-row INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col"""
+    if not deltas:
+        return
+
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(rollups)
+    statement = statement.on_conflict_do_update(
+        index_elements=["bucket", "severity", "source"],
+        set_={column: rollups.c[column] + statement.excluded[column] for column in COUNTER_COLUMNS}
+    )
+
+    # Sorted so concurrent transactions lock the rows in the same order (no deadlocks)
+    db.execute(statement, [
+        {"bucket": bucket, "severity": severity, "source": source, **counters}
+        for (bucket, severity, source), counters in sorted(deltas.items())
+    ])
+
+
+# ── WRITE PATH ───────────────────────────────────────────────────────────────
+# Call these before db.commit() so the rollup changes in the same transaction.
+
+# What record_changed() needs to know about an incident, before and after the change
+ROLLUP_COLUMNS = [Incident.created_at, Incident.resolved_at, Incident.severity, Incident.source, Incident.status]
+
+def record_created(db: Session, incidents):
+    """incidents: iterable of (created_at, severity, source)"""
+    deltas = _new_deltas()
+    for created_at, severity, source in incidents:
+        _add_created(deltas, created_at, severity, source)
+    _upsert(db, deltas)
+
+
+def record_resolved(db: Session, incidents):
+    """incidents: iterable of (created_at, resolved_at, severity, source)"""
+    deltas = _new_deltas()
+    for created_at, resolved_at, severity, source in incidents:
+        seconds = (as_utc(resolved_at) - as_utc(created_at)).total_seconds()
+        _add_resolved(deltas, resolved_at, severity, source, seconds)
+    _upsert(db, deltas)
+
+
+def record_changed(db: Session, changes):
+    """
+    changes: iterable of (before, after) rows with the ROLLUP_COLUMNS. Takes back what
+    each incident counted for before and counts it as it is now: a severity change
+    moves it, reopening takes its resolution back, resolving it again counts once.
+    after is None for a deleted incident.
+    """
+    deltas = _new_deltas()
+    for before, after in changes:
+        _add_incident(deltas, before, sign=-1)
+        if after is not None:
+            _add_incident(deltas, after)
+    _upsert(db, {key: counters for key, counters in deltas.items() if any(counters.values())})
+
+
+# ── READ PATH ────────────────────────────────────────────────────────────────
+
+def query_stats(db: Session, start: datetime, end: datetime, severity=None, source=None) -> dict:
+    """Volume and MTTR for [start, end), one entry per hour — reads only rollup rows"""
+    statement = (
+        select(rollups.c.bucket, *(func.sum(rollups.c[column]).label(column) for column in COUNTER_COLUMNS))
+        .where(rollups.c.bucket >= hour_bucket(start), rollups.c.bucket < as_utc(end))
+        .group_by(rollups.c.bucket)
+        .order_by(rollups.c.bucket)
+    )
+    if severity:
+        statement = statement.where(rollups.c.severity == severity)
+    if source:
+        statement = statement.where(rollups.c.source == source)
+
+    series, totals = [], dict.fromkeys(COUNTER_COLUMNS, 0)
+    for row in db.execute(statement).mappings():
+        for column in COUNTER_COLUMNS:
+            totals[column] += row[column]
+        series.append({
+            "bucket": as_utc(row["bucket"]),
+            "created": row["created_count"],
+            "resolved": row["resolved_count"],
+            "mttr_seconds": row["resolution_seconds_sum"] / row["resolved_count"] if row["resolved_count"] else None,
+        })
+
+    # Cumulative histogram, Prometheus-style: resolutions that took <= le seconds
+    histogram, running = {}, 0
+    for le, column in zip([str(le) for le in RESOLUTION_BUCKETS] + ["+Inf"], HISTOGRAM_COLUMNS):
+        running += totals[column]
+        histogram[le] = running
+
+    return {
+        "start": as_utc(start),
+        "end": as_utc(end),
+        "created": totals["created_count"],
+        "resolved": totals["resolved_count"],
+        "mttr_seconds": totals["resolution_seconds_sum"] / totals["resolved_count"] if totals["resolved_count"] else None,
+        "resolution_histogram": histogram,
+        "series": series,
+    }
+
+
+# ── BACKFILL ─────────────────────────────────────────────────────────────────
+
+def rebuild(db: Session, since: datetime = None, batch_size: int = 10_000) -> int:
+    """
+    Recompute the rollups from incidents and incidents_archive — everything, or only
+    the hours from `since` onwards. Streams incidents, so memory is O(buckets) not
+    O(incidents). Returns the number of rollup rows written.
+
+    Archive-pruned incidents are gone for good, so a full rebuild empties their hours;
+    pass `since` to keep them.
+    """
+    cleanup = delete(IncidentRollup)
+    if since is not None:
+        since = hour_bucket(since)
+        cleanup = cleanup.where(IncidentRollup.bucket >= since)
+
+    queries = []
+    for table in (Incident, IncidentArchive):
+        query = select(table.created_at, table.resolved_at, table.severity, table.source, table.status)
+        if since is not None:
+            query = query.where(or_(table.created_at >= since, table.resolved_at >= since))
+        queries.append(query)
+    query = union_all(*queries)
+
+    db.execute(cleanup)
+
+    deltas = _new_deltas()
+    for created_at, resolved_at, severity, source, status in db.execute(query.execution_options(yield_per=batch_size)):
+        if created_at is not None and (since is None or as_utc(created_at) >= since):
+            _add_created(deltas, created_at, severity, source)
+        if status == IncidentStatus.resolved and resolved_at is not None and created_at is not None \
+                and (since is None or as_utc(resolved_at) >= since):
+            _add_resolved(deltas, resolved_at, severity, source, (as_utc(resolved_at) - as_utc(created_at)).total_seconds())
+
+    _upsert(db, deltas)
+    db.commit()
+    return len(deltas)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.database import get_db
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.prober import db_prober
 
 router = APIRouter(tags=["health"])
 
@@ -17,21 +17,15 @@ def health_check():
 
 
 @router.get("/health/ready")
-def readiness_check(db: Session = Depends(get_db)):
+def readiness_check():
     """
     Readiness check — verifies app AND database are both up.
     Used by: CI/CD pipeline post-deploy verification
-    Returns 200 only if PostgreSQL connection is working.
+    Answers from the background prober's last result (app/prober.py) without
+    touching the database: 200 when it reached the database recently, 503 when
+    it failed or hasn't reported for DB_HEALTH_STALE_SECONDS.
     """
-    try:
-        db.execute(text("SELECT 1"))
-        return {
-            "status": "ready",
-            "database": "connected"
-        }
-    except Exception as e:
-        return {
-            "status": "not ready",
-            "database": "disconnected",
-            "error": str(e)
-        }
\ No newline at end of file
+    # Normally started by the lifespan; only the very first call may wait for a result
+    db_prober.start(wait=settings.db_health_timeout)
+    status_code, body = db_prober.readiness(settings.db_health_stale_seconds)
+    return JSONResponse(status_code=status_code, content=body)
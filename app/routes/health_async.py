@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.prober import db_prober
+
+# Async twin of app/routes/health.py, mounted instead of it when DB_ASYNC=true
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/health")
+async def health_check():
+    """Basic liveness check. Returns 200 if app is running."""
+    return {"status": "healthy"}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness check from the background prober's last result — 200 ready, 503 not"""
+    await run_in_threadpool(db_prober.start, settings.db_health_timeout)
+    status_code, body = db_prober.readiness(settings.db_health_stale_seconds)
+    return JSONResponse(status_code=status_code, content=body)
@@ -1,15 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, select, tuple_, update
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+from app.cache import incident_cache, incident_cache_key, invalidate_incidents
+from app.config import settings
 from app.database import get_db
-from app.models import Incident, IncidentStatus, SeverityLevel
+from app.replicas import READ_SOURCE, get_read_db
+from app.etags import body_etag, etag_matches, not_modified, rows_etag
+from app.events import publish_events, sse_stream
+from app.export import EXPORT_COLUMNS, MEDIA_TYPES, stream_export
+from app.importer import DEFAULT_CHUNK_SIZE, from_async, import_incidents as run_import, text_lines
+from app.ingest import ingest_alerts
+from app.pagination import encode_cursor, decode_cursor, encode_rank_cursor, decode_rank_cursor
+from app.search import search_incidents
+from app.serialization import ARCHIVE_COLUMNS, INCIDENT_COLUMNS, FastJSONResponse, dumps, incident_dicts
+from app.rollup import ROLLUP_COLUMNS, as_utc, query_stats, record_changed, record_created, record_resolved
+from app.spool import spool_alerts
+from app.timeline import record_timeline, updated_entry
+from app.models import Incident, IncidentAlert, IncidentArchive, IncidentEvent, IncidentStatus, SeverityLevel
 from app.schemas import (
     IncidentCreate,
     IncidentUpdate,
     IncidentResponse,
+    IncidentAlertResponse,
+    IncidentEventResponse,
     IncidentResolve,
+    IncidentStats,
+    IncidentBulkCreate,
+    IncidentBulkUpdate,
+    IncidentBulkResolve,
+    BulkItemResult,
+    BulkResponse,
+    ImportResponse,
     AlertmanagerWebhook
 )
 from app.metrics import (
@@ -17,7 +44,9 @@ from app.metrics import (
     incidents_resolved_total,
     incidents_open_gauge,
     incident_resolution_duration,
-    alertmanager_webhooks_total
+    alertmanager_webhooks_total,
+    incident_cache_requests_total,
+    conditional_get_requests_total
 )
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
@@ -30,49 +59,325 @@ def create_incident(payload: IncidentCreate, db: Session = Depends(get_db)):
 
     incident = Incident(**payload.model_dump())
     db.add(incident)
+    db.flush()   # fills in created_at for the rollup
+
+    record_created(db, [(incident.created_at, incident.severity, incident.source)])
+    record_timeline(db, [(incident.id, "created", {"severity": incident.severity.value, "source": incident.source})])
+    publish_events(db, "created", [incident.id])
     db.commit()
     db.refresh(incident)
 
-    # Update Prometheus metrics
+    # Update Prometheus metrics (.value — label "high", not "SeverityLevel.high")
     incidents_created_total.labels(
-        severity=incident.severity,
+        severity=incident.severity.value,
         source=incident.source or "manual"
     ).inc()
 
-    incidents_open_gauge.labels(severity=incident.severity).inc()
+    incidents_open_gauge.labels(severity=incident.severity.value).inc()
 
     return incident
 
 
 # ── LIST ALL ─────────────────────────────────────────────────────────────────
-@router.get("/", response_model=List[IncidentResponse])
+@router.get("/", response_model=List[IncidentResponse], response_class=FastJSONResponse)
 def list_incidents(
     status: str = None,
     severity: str = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    if_none_match: str = Header(None),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List incidents, newest first. Optional filters: ?status=open&severity=critical
+    Paginated: when there are more rows, the X-Next-Cursor response header holds
+    the value to pass as ?cursor= for the next page.
+    Send the ETag back as If-None-Match to get a 304 when the page hasn't changed.
+    """
+
+    conditions = []
+    if status:
+        conditions.append(Incident.status == status)
+    if severity:
+        conditions.append(Incident.severity == severity)
+    if cursor:
+        created_at, incident_id = decode_cursor(cursor)
+        conditions.append(tuple_(Incident.created_at, Incident.id) < (created_at, incident_id))
+
+    def page(*columns):
+        # Fetch one extra row to know whether there is a next page
+        return (
+            select(*columns).where(*conditions)
+            .order_by(Incident.created_at.desc(), Incident.id.desc())
+            .limit(limit + 1)
+        )
+
+    if if_none_match:
+        # Only (id, version) of the page — enough to tell whether it changed
+        etag = rows_etag(db.execute(page(Incident.id, Incident.version)).all())
+        if etag_matches(if_none_match, etag):
+            conditional_get_requests_total.labels(route="list_incidents", result="not_modified").inc()
+            return not_modified(etag)
+        conditional_get_requests_total.labels(route="list_incidents", result="modified").inc()
+    else:
+        conditional_get_requests_total.labels(route="list_incidents", result="unconditional").inc()
+
+    # Plain column tuples, not ORM objects — see app/serialization.py
+    rows = db.execute(page(*INCIDENT_COLUMNS, Incident.version)).all()
+
+    headers = {"ETag": rows_etag(rows)}
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+
+    # Returning the response directly skips response_model validation — the rows
+    # come from our own table. response_model is kept for the OpenAPI docs.
+    return FastJSONResponse(incident_dicts(rows[:limit]), headers=headers)
+
+
+# ── SEARCH ───────────────────────────────────────────────────────────────────
+@router.get("/search", response_model=List[IncidentResponse], response_class=FastJSONResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: str = None,
+    severity: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Keyword search over title, alert name and description, most relevant first:
+    ?q=disk full&status=resolved. Paginated like GET /incidents (X-Next-Cursor).
+    """
+
+    after = decode_rank_cursor(cursor) if cursor else None
+
+    # Fetch one extra row to know whether there is a next page
+    rows = search_incidents(db, q, limit + 1, after, status, severity)
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_rank_cursor(last.rank, last.id)
+
+    return FastJSONResponse(incident_dicts(rows), headers=headers)
+
+
+# ── STATS ────────────────────────────────────────────────────────────────────
+@router.get("/stats", response_model=IncidentStats)
+def incident_stats(
+    start: datetime = None,
+    end: datetime = None,
+    severity: SeverityLevel = None,
+    source: str = None,
+    db: Session = Depends(get_read_db)
 ):
-    """List all incidents. Optional filters: ?status=open&severity=critical"""
+    """
+    Incident volume and MTTR per hour, from the incident_rollups table.
+    Defaults to the last 24 hours: ?start=2024-01-01T00:00:00Z&end=...&severity=critical
+    Cost grows with the number of hours asked for, not the number of incidents.
+    """
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    return query_stats(db, start, end, severity=severity, source=source)
 
-    query = db.query(Incident)
 
+# ── EXPORT ───────────────────────────────────────────────────────────────────
+@router.get("/export")
+def export_incidents(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: str = None,
+    severity: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream the full incident history, oldest first: ?format=ndjson|csv&status=&severity=
+    Rows are fetched and written in batches, so memory stays flat however big the table is.
+    """
+
+    query = select(*EXPORT_COLUMNS).order_by(Incident.created_at, Incident.id)
     if status:
-        query = query.filter(Incident.status == status)
+        query = query.where(Incident.status == status)
+    if severity:
+        query = query.where(Incident.severity == severity)
+
+    # get_read_db closes the session before the body is streamed; a closed Session
+    # simply reconnects on the next query, and stream_export closes it at the end.
+    return StreamingResponse(
+        stream_export(db, query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="incidents.{format}"'}
+    )
+
+
+# ── ARCHIVE ──────────────────────────────────────────────────────────────────
+@router.get("/archive", response_model=List[IncidentResponse], response_class=FastJSONResponse)
+def list_archived_incidents(
+    start: datetime = None,
+    end: datetime = None,
+    severity: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Archived (old resolved) incidents created in a time window, newest first.
+    Defaults to the last 30 days: ?start=2024-01-01T00:00:00Z&end=...&severity=critical
+    The window keeps PostgreSQL to the matching monthly partitions.
+    Paginated like GET /incidents (X-Next-Cursor).
+    """
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    query = select(*ARCHIVE_COLUMNS).where(IncidentArchive.created_at >= start, IncidentArchive.created_at < end)
     if severity:
-        query = query.filter(Incident.severity == severity)
+        query = query.where(IncidentArchive.severity == severity)
+    if cursor:
+        created_at, incident_id = decode_cursor(cursor)
+        query = query.where(tuple_(IncidentArchive.created_at, IncidentArchive.id) < (created_at, incident_id))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = db.execute(
+        query.order_by(IncidentArchive.created_at.desc(), IncidentArchive.id.desc()).limit(limit + 1)
+    ).all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
 
-    return query.order_by(Incident.created_at.desc()).all()
+    return FastJSONResponse(incident_dicts(rows), headers=headers)
+
+
+# ── CHANGE FEED ──────────────────────────────────────────────────────────────
+@router.get("/stream")
+async def stream_incident_events(last_event_id: str = Header(None)):
+    """
+    Server-Sent Events: one event per incident created, updated, resolved or
+    deleted, with the incident as JSON (just {"id": ...} for deletes).
+    Reconnecting with Last-Event-ID resumes without gaps; a "reset" event means
+    the gap couldn't be filled — reload GET /incidents.
+    """
+    return StreamingResponse(
+        sse_stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}   # no proxy buffering
+    )
 
 
 # ── GET ONE ──────────────────────────────────────────────────────────────────
 @router.get("/{incident_id}", response_model=IncidentResponse)
-def get_incident(incident_id: int, db: Session = Depends(get_db)):
-    """Get a single incident by ID"""
-
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
+def get_incident(incident_id: int, if_none_match: str = Header(None), db: Session = Depends(get_read_db)):
+    """Get a single incident by ID (served from the response cache when possible)"""
+
+    source = db.info.get(READ_SOURCE, "primary")
+    body = cached_incident(incident_id, source)
+    if body is None:
+        body = load_incident(incident_id, db)
+        cache_incident(incident_id, body, source)
+    return incident_response(body, if_none_match)
+
+
+# The steps of GET /incidents/{id}, split so the async route can run the cache
+# calls off the event loop and only the query through AsyncSession.run_sync.
+def cached_incident(incident_id: int, source: str):
+    """The cached JSON body, or None on a miss"""
+    # A client that just wrote (sticky) skips the cache
+    body = incident_cache.get(incident_cache_key(incident_id)) if source != "sticky" else None
+    if body is not None:
+        incident_cache_requests_total.labels(result="hit").inc()
+    else:
+        incident_cache_requests_total.labels(result="miss" if source != "sticky" else "bypass").inc()
+    return body
+
+
+def load_incident(incident_id: int, db: Session) -> bytes:
+    row = db.execute(select(*INCIDENT_COLUMNS).where(Incident.id == incident_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    # Cache the serialized JSON, so a hit skips both the query and serialization
+    return dumps(incident_dicts([row])[0])
+
+
+def cache_incident(incident_id: int, body: bytes, source: str):
+    # Only primary reads go into the shared cache — a lagging replica's row would be
+    # served to everyone until the TTL
+    if source == "primary":
+        incident_cache.set(incident_cache_key(incident_id), body)
+
+
+def incident_response(body: bytes, if_none_match: str = None):
+    etag = body_etag(body)
+    if if_none_match is None:
+        conditional_get_requests_total.labels(route="get_incident", result="unconditional").inc()
+    elif etag_matches(if_none_match, etag):
+        conditional_get_requests_total.labels(route="get_incident", result="not_modified").inc()
+        return not_modified(etag)
+    else:
+        conditional_get_requests_total.labels(route="get_incident", result="modified").inc()
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+# ── FOLDED ALERTS ────────────────────────────────────────────────────────────
+@router.get("/{incident_id}/alerts", response_model=List[IncidentAlertResponse])
+def list_incident_alerts(incident_id: int, limit: int = Query(1000, ge=1, le=10000), db: Session = Depends(get_read_db)):
+    """The alerts folded into an alert-storm incident (their label sets), oldest first.
+    Archived incidents keep their alerts."""
+
+    alerts = db.scalars(
+        select(IncidentAlert).where(IncidentAlert.incident_id == incident_id)
+        .order_by(IncidentAlert.created_at, IncidentAlert.fingerprint)
+        .limit(limit)
+    ).all()
+    if not alerts and db.get(Incident, incident_id) is None:
+        if db.scalar(select(IncidentArchive.id).where(IncidentArchive.id == incident_id).limit(1)) is None:
+            raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    return alerts
+
+
+# ── TIMELINE ─────────────────────────────────────────────────────────────────
+@router.get("/{incident_id}/timeline", response_model=List[IncidentEventResponse], response_class=FastJSONResponse)
+def get_incident_timeline(
+    incident_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    The incident's history, oldest first: created, updates, resolution notes, alert repeats.
+    Paginated like GET /incidents (X-Next-Cursor). Archived incidents keep their timeline.
+    """
 
-    return incident
+    query = select(IncidentEvent.id, IncidentEvent.type, IncidentEvent.payload, IncidentEvent.ts).where(
+        IncidentEvent.incident_id == incident_id
+    )
+    if cursor:
+        ts, event_id = decode_cursor(cursor)
+        query = query.where(tuple_(IncidentEvent.ts, IncidentEvent.id) > (ts, event_id))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = db.execute(query.order_by(IncidentEvent.ts, IncidentEvent.id).limit(limit + 1)).all()
+    if not rows and not cursor and db.get(Incident, incident_id) is None:
+        if db.scalar(select(IncidentArchive.id).where(IncidentArchive.id == incident_id).limit(1)) is None:
+            raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.ts, last.id)
+
+    return FastJSONResponse([row._asdict() for row in rows], headers=headers)
 
 
 # ── UPDATE ───────────────────────────────────────────────────────────────────
@@ -80,51 +385,114 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
 def update_incident(incident_id: int, payload: IncidentUpdate, db: Session = Depends(get_db)):
     """Update incident fields — title, description, severity, status"""
 
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
-
     # Only update fields that were actually sent
     update_data = payload.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(incident, field, value)
 
+    # The open gauge and the rollups only move when status or severity change — only then
+    # read the old values, locking the row so a concurrent update can't slip in between
+    before = None
+    values = dict(update_data)
+    if "status" in update_data or "severity" in update_data:
+        before = db.execute(select(*ROLLUP_COLUMNS).where(Incident.id == incident_id).with_for_update()).first()
+        if before is None:
+            raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+        values.update(_resolved_at_change(before.status, update_data, func.now()))
+
+    if update_data:
+        statement = (
+            update(Incident)
+            .where(Incident.id == incident_id)
+            .values(**values)
+            .returning(Incident)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        statement = select(Incident).where(Incident.id == incident_id)   # nothing to change
+    incident = db.scalars(statement).first()
+    if incident is None:
+        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+
+    response = IncidentResponse.model_validate(incident)
+    if before is not None:
+        record_changed(db, [(before, incident)])
+    if update_data:
+        record_timeline(db, [updated_entry(incident_id, update_data, before, incident)])
+        publish_events(db, "updated", [incident_id])
     db.commit()
-    db.refresh(incident)
-    return incident
+    invalidate_incidents([incident_id])
+
+    # Keep the open gauge in step with status/severity changes made here
+    if before is not None:
+        if before.status != IncidentStatus.resolved:
+            incidents_open_gauge.labels(severity=before.severity.value).dec()
+        if incident.status != IncidentStatus.resolved:
+            incidents_open_gauge.labels(severity=incident.severity.value).inc()
+        _observe_resolved([incident] if before.status != IncidentStatus.resolved else [])
+
+    return response
+
+
+def _resolved_at_change(old_status, change: dict, now) -> dict:
+    """resolved_at to go with a status sent to PUT / PATCH bulk: set when it becomes
+    resolved, cleared when it is reopened — so the rollups count it like /resolve does"""
+    if "status" not in change:
+        return {}
+    resolving = change["status"] == IncidentStatus.resolved
+    if resolving == (old_status == IncidentStatus.resolved):
+        return {}
+    return {"resolved_at": now if resolving else None}
+
+
+def _observe_resolved(incidents):
+    """Resolution metrics for the incidents that are resolved now (others are skipped)"""
+    for incident in incidents:
+        if incident.status == IncidentStatus.resolved and incident.resolved_at is not None:
+            duration = (as_utc(incident.resolved_at) - as_utc(incident.created_at)).total_seconds()
+            incidents_resolved_total.labels(severity=incident.severity.value).inc()
+            incident_resolution_duration.labels(severity=incident.severity.value).observe(duration)
 
 
 # ── RESOLVE ──────────────────────────────────────────────────────────────────
+def _resolve_statement(ids):
+    """UPDATE ... RETURNING that resolves whichever of `ids` are still open.
+    resolved_at is set by the database; the resolution note goes to the timeline."""
+    return (
+        update(Incident)
+        .where(Incident.id.in_(ids), Incident.status != IncidentStatus.resolved)
+        .values(status=IncidentStatus.resolved, resolved_at=func.now())
+        .returning(Incident)
+        .execution_options(synchronize_session=False)
+    )
+
+
 @router.put("/{incident_id}/resolve", response_model=IncidentResponse)
 def resolve_incident(incident_id: int, payload: IncidentResolve, db: Session = Depends(get_db)):
     """Resolve an incident and record resolution time for MTTR calculation"""
 
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
-    if not incident:
-        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
-
-    if incident.status == IncidentStatus.resolved:
+    # Check-and-set in one statement: of two responders resolving at once, exactly one gets the row
+    incident = db.scalars(_resolve_statement([incident_id])).first()
+    if incident is None:
+        # Only the losing path pays for a second lookup, to tell "gone" from "already resolved"
+        if db.get(Incident, incident_id) is None:
+            raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
         raise HTTPException(status_code=400, detail="Incident is already resolved")
 
-    # Set resolved state
-    incident.status = IncidentStatus.resolved
-    incident.resolved_at = datetime.now(timezone.utc)
-
-    if payload.resolution_note:
-        incident.description = f"{incident.description or ''}\n\nResolution: {payload.resolution_note}"
-
+    record_resolved(db, [(incident.created_at, incident.resolved_at, incident.severity, incident.source)])
+    record_timeline(db, [(incident_id, "resolved", {"resolution_note": payload.resolution_note})])
+    response = IncidentResponse.model_validate(incident)
+    publish_events(db, "resolved", [incident_id])
     db.commit()
-    db.refresh(incident)
+    invalidate_incidents([incident_id])
 
     # Calculate resolution duration in seconds for MTTR histogram
-    duration = (incident.resolved_at - incident.created_at).total_seconds()
+    duration = (as_utc(incident.resolved_at) - as_utc(incident.created_at)).total_seconds()
 
     # Update Prometheus metrics
-    incidents_resolved_total.labels(severity=incident.severity).inc()
-    incidents_open_gauge.labels(severity=incident.severity).dec()
-    incident_resolution_duration.labels(severity=incident.severity).observe(duration)
+    incidents_resolved_total.labels(severity=incident.severity.value).inc()
+    incidents_open_gauge.labels(severity=incident.severity.value).dec()
+    incident_resolution_duration.labels(severity=incident.severity.value).observe(duration)
 
-    return incident
+    return response
 
 
 # ── DELETE ───────────────────────────────────────────────────────────────────
@@ -136,8 +504,169 @@ def delete_incident(incident_id: int, db: Session = Depends(get_db)):
     if not incident:
         raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
 
+    was_open = incident.status != IncidentStatus.resolved
+    severity = incident.severity
+
+    record_changed(db, [(incident, None)])   # a rebuild wouldn't count it either
     db.delete(incident)
+    db.execute(delete(IncidentEvent).where(IncidentEvent.incident_id == incident_id))   # its timeline goes too
+    db.execute(delete(IncidentAlert).where(IncidentAlert.incident_id == incident_id))   # and its folded alerts
+    publish_events(db, "deleted", [incident_id])
     db.commit()
+    invalidate_incidents([incident_id])
+
+    if was_open:
+        incidents_open_gauge.labels(severity=severity.value).dec()
+
+
+# ── BULK ─────────────────────────────────────────────────────────────────────
+# Set-based versions of create / update / resolve: a constant number of
+# statements per call however many items it carries, all in one transaction.
+
+@router.post("/bulk", response_model=BulkResponse, status_code=status.HTTP_201_CREATED)
+def bulk_create_incidents(payload: IncidentBulkCreate, db: Session = Depends(get_db)):
+    """Create up to 1000 incidents with one INSERT ... RETURNING"""
+
+    incidents = db.scalars(
+        insert(Incident).returning(Incident, sort_by_parameter_order=True),
+        [item.model_dump() for item in payload.incidents]
+    ).all()
+
+    record_created(db, [(incident.created_at, incident.severity, incident.source) for incident in incidents])
+    record_timeline(db, [
+        (incident.id, "created", {"severity": incident.severity.value, "source": incident.source})
+        for incident in incidents
+    ])
+    results = [
+        BulkItemResult(id=incident.id, result="created", incident=IncidentResponse.model_validate(incident))
+        for incident in incidents
+    ]
+    publish_events(db, "created", [incident.id for incident in incidents])
+    db.commit()
+
+    # Update Prometheus metrics once per severity/source
+    for (severity, source), count in Counter((i.severity.value, i.source or "manual") for i in incidents).items():
+        incidents_created_total.labels(severity=severity, source=source).inc(count)
+    for severity, count in Counter(i.severity.value for i in incidents).items():
+        incidents_open_gauge.labels(severity=severity).inc(count)
+
+    return BulkResponse(results=results)
+
+
+@router.patch("/bulk", response_model=BulkResponse)
+def bulk_update_incidents(payload: IncidentBulkUpdate, db: Session = Depends(get_db)):
+    """Update up to 1000 incidents — only the fields sent for each item are changed"""
+
+    ids = [item.id for item in payload.updates]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Each incident id may appear only once")
+
+    # Lock the rows and remember their old status/severity for the open gauge and the rollups
+    before = {
+        row.id: row for row in db.execute(
+            select(Incident.id, *ROLLUP_COLUMNS).where(Incident.id.in_(ids)).with_for_update()
+        )
+    }
+
+    changes = [
+        {"id": item.id, **item.model_dump(exclude_unset=True, exclude={"id"})}
+        for item in payload.updates if item.id in before
+    ]
+    changes = [change for change in changes if len(change) > 1]
+    if changes:
+        # ORM bulk UPDATE by primary key — executemany, grouped by the set of fields sent
+        now = datetime.now(timezone.utc)
+        db.execute(update(Incident), [
+            {**change, **_resolved_at_change(before[change["id"]].status, change, now)} for change in changes
+        ])
+
+    after = {incident.id: incident for incident in db.scalars(select(Incident).where(Incident.id.in_(before)))}
+    results = [
+        BulkItemResult(id=incident_id, result="updated", incident=IncidentResponse.model_validate(after[incident_id]))
+        if incident_id in after else BulkItemResult(id=incident_id, result="not_found")
+        for incident_id in ids
+    ]
+    moved = [change["id"] for change in changes if "status" in change or "severity" in change]
+    record_changed(db, [(before[incident_id], after[incident_id]) for incident_id in moved])
+    record_timeline(db, [
+        updated_entry(change["id"], set(change) - {"id"}, before[change["id"]], after[change["id"]])
+        for change in changes
+    ])
+    publish_events(db, "updated", [change["id"] for change in changes])
+    db.commit()
+    invalidate_incidents(list(after))
+
+    # Keep the open gauge in step with status/severity changes, one call per severity
+    gauge_delta = Counter()
+    for incident_id, old in before.items():
+        new = after[incident_id]
+        if old.status != IncidentStatus.resolved:
+            gauge_delta[old.severity.value] -= 1
+        if new.status != IncidentStatus.resolved:
+            gauge_delta[new.severity.value] += 1
+    for severity, delta in gauge_delta.items():
+        if delta:
+            incidents_open_gauge.labels(severity=severity).inc(delta)
+    _observe_resolved(after[incident_id] for incident_id in moved if before[incident_id].status != IncidentStatus.resolved)
+
+    return BulkResponse(results=results)
+
+
+@router.post("/bulk/resolve", response_model=BulkResponse)
+def bulk_resolve_incidents(payload: IncidentBulkResolve, db: Session = Depends(get_db)):
+    """Resolve up to 1000 incidents with one conditional UPDATE ... RETURNING"""
+
+    resolved = {
+        incident.id: incident
+        for incident in db.scalars(_resolve_statement(payload.ids))
+    }
+
+    # Anything not updated either doesn't exist or was already resolved
+    missing = set(payload.ids) - set(resolved)
+    already = set(db.scalars(select(Incident.id).where(Incident.id.in_(missing)))) if missing else set()
+
+    record_resolved(db, [(i.created_at, i.resolved_at, i.severity, i.source) for i in resolved.values()])
+    results = [
+        BulkItemResult(id=incident_id, result="resolved", incident=IncidentResponse.model_validate(resolved[incident_id]))
+        if incident_id in resolved else
+        BulkItemResult(id=incident_id, result="already_resolved" if incident_id in already else "not_found")
+        for incident_id in payload.ids
+    ]
+    record_timeline(db, [
+        (incident_id, "resolved", {"resolution_note": payload.resolution_note}) for incident_id in resolved
+    ])
+    publish_events(db, "resolved", list(resolved))
+    db.commit()
+    invalidate_incidents(list(resolved))
+
+    # Update Prometheus metrics once per severity
+    for severity, count in Counter(i.severity.value for i in resolved.values()).items():
+        incidents_resolved_total.labels(severity=severity).inc(count)
+        incidents_open_gauge.labels(severity=severity).dec(count)
+    for incident in resolved.values():
+        duration = (as_utc(incident.resolved_at) - as_utc(incident.created_at)).total_seconds()
+        incident_resolution_duration.labels(severity=incident.severity.value).observe(duration)
+
+    return BulkResponse(results=results)
+
+
+# ── IMPORT ───────────────────────────────────────────────────────────────────
+@router.post("/import", response_model=ImportResponse)
+async def import_incidents(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk-load historical incidents from a streamed NDJSON or CSV body (see app/importer.py):
+    ?format=ndjson|csv&chunk_size=5000. Each chunk is validated and loaded in its own
+    transaction (COPY on PostgreSQL); the response reports the invalid rows per chunk.
+    """
+    # The import runs on the threadpool and pulls the body from the event loop as it
+    # goes, so neither the body nor more than one chunk of rows is ever held in memory
+    lines = text_lines(from_async(request.stream()))
+    return await run_in_threadpool(run_import, db, lines, format, chunk_size)
 
 
 # ── ALERTMANAGER WEBHOOK ──────────────────────────────────────────────────────
@@ -145,36 +674,17 @@ def delete_incident(incident_id: int, db: Session = Depends(get_db)):
 def alertmanager_webhook(payload: AlertmanagerWebhook, db: Session = Depends(get_db)):
     """
     Receives webhook from Alertmanager and auto-creates incidents.
+    Repeat notifications (same fingerprint) update the open incident,
+    resolved notifications close it.
     Add this URL to Alertmanager's receiver config:
     url: http://incident-logger:8000/incidents/webhook/alertmanager
     """
 
     alertmanager_webhooks_total.labels(status=payload.status).inc()
 
-    created = []
-
-    for alert in payload.alerts:
-        if alert.status == "firing":
-            # Map Prometheus severity label to our SeverityLevel enum
-            raw_severity = alert.labels.get("severity", "medium").lower()
-            severity = raw_severity if raw_severity in SeverityLevel.__members__ else "medium"
-
-            incident = Incident(
-                title=alert.annotations.get("summary", alert.labels.get("alertname", "Unknown Alert")),
-                description=alert.annotations.get("description", ""),
-                severity=severity,
-                source="alertmanager",
-                alert_name=alert.labels.get("alertname"),
-                status=IncidentStatus.open
-            )
-
-            db.add(incident)
-            db.commit()
-            db.refresh(incident)
-
-            incidents_created_total.labels(severity=severity, source="alertmanager").inc()
-            incidents_open_gauge.labels(severity=severity).inc()
-
-            created.append(incident.id)
+    # Write-behind mode: durably queue the payload and answer 202 right away
+    if settings.ingest_mode == "spool":
+        return spool_alerts(payload)
 
-    return {"message": f"Created {len(created)} incident(s)", "incident_ids": created}
\ No newline at end of file
+    # Dedup by fingerprint, bulk insert, auto-resolve — all in one transaction
+    return ingest_alerts(db, payload.alerts)
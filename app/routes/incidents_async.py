@@ -0,0 +1,244 @@
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List
+
+from app.cache import deferred_invalidations, run_cache_io
+from app.config import settings
+from app.database import SessionLocal, get_async_db
+from app.importer import DEFAULT_CHUNK_SIZE
+from app.replicas import READ_SOURCE, get_async_read_db, open_read_session
+from app.metrics import alertmanager_webhooks_total
+from app.models import SeverityLevel
+from app.routes import incidents
+from app.serialization import FastJSONResponse
+from app.spool import spool_alerts
+from app.schemas import (
+    IncidentCreate,
+    IncidentUpdate,
+    IncidentResponse,
+    IncidentAlertResponse,
+    IncidentEventResponse,
+    IncidentResolve,
+    IncidentStats,
+    IncidentBulkCreate,
+    IncidentBulkUpdate,
+    IncidentBulkResolve,
+    BulkResponse,
+    ImportResponse,
+    AlertmanagerWebhook
+)
+
+# Async twin of app/routes/incidents.py, mounted instead of it when DB_ASYNC=true.
+#
+# Each route awaits AsyncSession.run_sync(), which runs the sync route body with
+# a Session whose I/O goes through the async driver (asyncpg). The event loop is
+# never blocked and no threadpool thread is held while waiting on Postgres, and
+# the query logic lives in one place only. Response cache I/O (Redis) stays off
+# the loop: see the ASYNC ROUTES section of app/cache.py.
+
+router = APIRouter(prefix="/incidents", tags=["incidents"])
+
+
+async def _run(db: AsyncSession, handler, **params):
+    """Run a sync route body through run_sync — always by keyword, so the two modules can't drift"""
+    async with deferred_invalidations():
+        return await db.run_sync(lambda session: handler(db=session, **params))
+
+
+# ── CREATE ──────────────────────────────────────────────────────────────────
+@router.post("/", response_model=IncidentResponse, status_code=status.HTTP_201_CREATED)
+async def create_incident(payload: IncidentCreate, db: AsyncSession = Depends(get_async_db)):
+    """Manually create a new incident"""
+    return await _run(db, incidents.create_incident, payload=payload)
+
+
+# ── LIST ALL ─────────────────────────────────────────────────────────────────
+@router.get("/", response_model=List[IncidentResponse], response_class=FastJSONResponse)
+async def list_incidents(
+    status: str = None,
+    severity: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """List incidents, newest first. See the X-Next-Cursor header for the next page."""
+    return await _run(
+        db, incidents.list_incidents,
+        status=status, severity=severity, limit=limit, cursor=cursor, if_none_match=if_none_match
+    )
+
+
+# ── SEARCH ───────────────────────────────────────────────────────────────────
+@router.get("/search", response_model=List[IncidentResponse], response_class=FastJSONResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: str = None,
+    severity: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Keyword search over title, alert name and description, most relevant first."""
+    return await _run(
+        db, incidents.search, q=q, status=status, severity=severity, limit=limit, cursor=cursor
+    )
+
+
+# ── STATS ────────────────────────────────────────────────────────────────────
+@router.get("/stats", response_model=IncidentStats)
+async def incident_stats(
+    start: datetime = None,
+    end: datetime = None,
+    severity: SeverityLevel = None,
+    source: str = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Incident volume and MTTR per hour, from the incident_rollups table."""
+    return await _run(db, incidents.incident_stats, start=start, end=end, severity=severity, source=source)
+
+
+# ── EXPORT ───────────────────────────────────────────────────────────────────
+@router.get("/export")
+async def export_incidents(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: str = None,
+    severity: str = None
+):
+    """Stream the full incident history, oldest first: ?format=ndjson|csv&status=&severity="""
+    # A long-lived server-side cursor needs its own connection for the whole stream,
+    # so exports use a sync session iterated on the threadpool even in async mode.
+    db = await run_in_threadpool(open_read_session, request) or SessionLocal()
+    return incidents.export_incidents(format=format, status=status, severity=severity, db=db)
+
+
+# ── ARCHIVE ──────────────────────────────────────────────────────────────────
+@router.get("/archive", response_model=List[IncidentResponse], response_class=FastJSONResponse)
+async def list_archived_incidents(
+    start: datetime = None,
+    end: datetime = None,
+    severity: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Archived (old resolved) incidents created in a time window, newest first."""
+    return await _run(
+        db, incidents.list_archived_incidents,
+        start=start, end=end, severity=severity, limit=limit, cursor=cursor
+    )
+
+
+# ── CHANGE FEED ──────────────────────────────────────────────────────────────
+@router.get("/stream")
+async def stream_incident_events(last_event_id: str = Header(None)):
+    """Server-Sent Events: incidents created, updated, resolved or deleted."""
+    return await incidents.stream_incident_events(last_event_id=last_event_id)
+
+
+# ── GET ONE ──────────────────────────────────────────────────────────────────
+@router.get("/{incident_id}", response_model=IncidentResponse)
+async def get_incident(
+    incident_id: int,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a single incident by ID (served from the response cache when possible)"""
+    # The steps of the sync route, with only the query inside run_sync
+    source = db.info.get(READ_SOURCE, "primary")
+    body = await run_cache_io(incidents.cached_incident, incident_id, source)
+    if body is None:
+        body = await _run(db, incidents.load_incident, incident_id=incident_id)
+        await run_cache_io(incidents.cache_incident, incident_id, body, source)
+    return incidents.incident_response(body, if_none_match)
+
+
+# ── FOLDED ALERTS ────────────────────────────────────────────────────────────
+@router.get("/{incident_id}/alerts", response_model=List[IncidentAlertResponse])
+async def list_incident_alerts(
+    incident_id: int,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The alerts folded into an alert-storm incident (their label sets), oldest first"""
+    return await _run(db, incidents.list_incident_alerts, incident_id=incident_id, limit=limit)
+
+
+# ── TIMELINE ─────────────────────────────────────────────────────────────────
+@router.get("/{incident_id}/timeline", response_model=List[IncidentEventResponse], response_class=FastJSONResponse)
+async def get_incident_timeline(
+    incident_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The incident's history, oldest first — paginated like GET /incidents (X-Next-Cursor)"""
+    return await _run(db, incidents.get_incident_timeline, incident_id=incident_id, limit=limit, cursor=cursor)
+
+
+# ── UPDATE ───────────────────────────────────────────────────────────────────
+@router.put("/{incident_id}", response_model=IncidentResponse)
+async def update_incident(incident_id: int, payload: IncidentUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Update incident fields — title, description, severity, status"""
+    return await _run(db, incidents.update_incident, incident_id=incident_id, payload=payload)
+
+
+# ── RESOLVE ──────────────────────────────────────────────────────────────────
+@router.put("/{incident_id}/resolve", response_model=IncidentResponse)
+async def resolve_incident(incident_id: int, payload: IncidentResolve, db: AsyncSession = Depends(get_async_db)):
+    """Resolve an incident and record resolution time for MTTR calculation"""
+    return await _run(db, incidents.resolve_incident, incident_id=incident_id, payload=payload)
+
+
+# ── DELETE ───────────────────────────────────────────────────────────────────
+@router.delete("/{incident_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_incident(incident_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete an incident by ID"""
+    await _run(db, incidents.delete_incident, incident_id=incident_id)
+
+
+# ── BULK ─────────────────────────────────────────────────────────────────────
+@router.post("/bulk", response_model=BulkResponse, status_code=status.HTTP_201_CREATED)
+async def bulk_create_incidents(payload: IncidentBulkCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create up to 1000 incidents with one INSERT ... RETURNING"""
+    return await _run(db, incidents.bulk_create_incidents, payload=payload)
+
+
+@router.patch("/bulk", response_model=BulkResponse)
+async def bulk_update_incidents(payload: IncidentBulkUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Update up to 1000 incidents — only the fields sent for each item are changed"""
+    return await _run(db, incidents.bulk_update_incidents, payload=payload)
+
+
+@router.post("/bulk/resolve", response_model=BulkResponse)
+async def bulk_resolve_incidents(payload: IncidentBulkResolve, db: AsyncSession = Depends(get_async_db)):
+    """Resolve up to 1000 incidents with one conditional UPDATE ... RETURNING"""
+    return await _run(db, incidents.bulk_resolve_incidents, payload=payload)
+
+
+# ── IMPORT ───────────────────────────────────────────────────────────────────
+@router.post("/import", response_model=ImportResponse)
+async def import_incidents(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000)
+):
+    """Bulk-load historical incidents from a streamed NDJSON or CSV body: ?format=ndjson|csv&chunk_size="""
+    # COPY goes through psycopg2's copy_expert, which the async driver doesn't have,
+    # so imports use a sync session on the threadpool even in async mode (like exports)
+    with SessionLocal() as db:
+        return await incidents.import_incidents(request=request, format=format, chunk_size=chunk_size, db=db)
+
+
+# ── ALERTMANAGER WEBHOOK ──────────────────────────────────────────────────────
+@router.post("/webhook/alertmanager", status_code=status.HTTP_200_OK)
+async def alertmanager_webhook(payload: AlertmanagerWebhook, db: AsyncSession = Depends(get_async_db)):
+    """Receives webhook from Alertmanager and auto-creates incidents."""
+    if settings.ingest_mode == "spool":
+        # Appending blocks on fsync — keep that off the event loop
+        alertmanager_webhooks_total.labels(status=payload.status).inc()
+        return await run_in_threadpool(spool_alerts, payload)
+    return await _run(db, incidents.alertmanager_webhook, payload=payload)
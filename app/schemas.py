@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional
 from app.models import SeverityLevel, IncidentStatus
@@ -16,6 +16,21 @@ class IncidentCreate(BaseModel):
     alert_name: Optional[str] = Field(None, max_length=255, example="HighCPUUsage")
 
 
+class IncidentImport(IncidentCreate):
+    """One row of a bulk import — POST /incidents/import. Historical incidents bring their own timeline."""
+    status: IncidentStatus = IncidentStatus.open
+    created_at: Optional[datetime] = None    # defaults to the time of the import
+    resolved_at: Optional[datetime] = None   # required for resolved incidents, and only for them
+
+    @model_validator(mode="after")
+    def check_resolution(self):
+        if (self.status == IncidentStatus.resolved) != (self.resolved_at is not None):
+            raise ValueError("resolved_at must be set for resolved incidents, and only for them")
+        if self.resolved_at and self.created_at and self.resolved_at < self.created_at:
+            raise ValueError("resolved_at is before created_at")
+        return self
+
+
 class IncidentUpdate(BaseModel):
     """Schema for updating an incident — PUT /incidents/{id}"""
     title: Optional[str] = Field(None, min_length=3, max_length=255)
@@ -39,24 +54,133 @@ class IncidentResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime]
     resolved_at: Optional[datetime]
+    occurrence_count: int = 1   # > 1 for alert-storm incidents
 
     class Config:
         from_attributes = True   # allows SQLAlchemy model → Pydantic conversion
 
 
+class IncidentAlertResponse(BaseModel):
+    """One alert folded into an alert-storm incident — GET /incidents/{id}/alerts"""
+    fingerprint: str
+    labels: dict
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class IncidentEventResponse(BaseModel):
+    """One entry of an incident's history — GET /incidents/{id}/timeline"""
+    id: int
+    type: str        # created | updated | resolved | alert_repeated | alerts_folded
+    payload: dict    # e.g. {"severity": {"from": "high", "to": "critical"}, "fields": [...]}
+    ts: datetime
+
+
 class IncidentResolve(BaseModel):
     """Schema for resolving an incident — PUT /incidents/{id}/resolve"""
     resolution_note: Optional[str] = Field(None, example="Restarted the service, CPU back to normal")
 
 
+# --- BULK SCHEMAS ---
+# Up to 1000 items per call, each run as one set-based statement in one transaction
+
+class IncidentBulkCreate(BaseModel):
+    """POST /incidents/bulk"""
+    incidents: list[IncidentCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class IncidentBulkUpdateItem(IncidentUpdate):
+    id: int
+
+
+class IncidentBulkUpdate(BaseModel):
+    """PATCH /incidents/bulk"""
+    updates: list[IncidentBulkUpdateItem] = Field(..., min_length=1, max_length=1000)
+
+
+class IncidentBulkResolve(BaseModel):
+    """POST /incidents/bulk/resolve — one resolution note for the whole batch"""
+    ids: list[int] = Field(..., min_length=1, max_length=1000)
+    resolution_note: Optional[str] = Field(None, example="Closed after maintenance window")
+
+
+class BulkItemResult(BaseModel):
+    """Outcome for one item, in the same order as the request"""
+    id: Optional[int]
+    result: str                           # created | updated | resolved | not_found | already_resolved
+    incident: Optional[IncidentResponse] = None
+
+
+class BulkResponse(BaseModel):
+    results: list[BulkItemResult]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportChunkResult(BaseModel):
+    """Outcome of one chunk of an import (one transaction)"""
+    chunk: int
+    first_line: int
+    last_line: int
+    imported: int
+    rejected: int
+    errors: list[ImportRowError]   # the first 20 invalid rows of the chunk
+    error: Optional[str] = None    # set when the whole chunk failed to load
+
+
+class ImportResponse(BaseModel):
+    """POST /incidents/import"""
+    imported: int
+    rejected: int
+    seconds: float
+    rows_per_second: Optional[float]
+    chunks: list[ImportChunkResult]
+
+
+class StatsBucket(BaseModel):
+    """One hour of incident volume/MTTR"""
+    bucket: datetime
+    created: int
+    resolved: int
+    mttr_seconds: Optional[float]
+
+
+class IncidentStats(BaseModel):
+    """Aggregates returned by GET /incidents/stats"""
+    start: datetime
+    end: datetime
+    created: int
+    resolved: int
+    mttr_seconds: Optional[float]
+    resolution_histogram: dict[str, int]   # cumulative: resolutions that took <= N seconds
+    series: list[StatsBucket]
+
+
 # --- ALERTMANAGER WEBHOOK SCHEMA ---
 # This is what Alertmanager sends when it fires an alert
 # We parse this and auto-create an incident
 
 class AlertmanagerAlert(BaseModel):
     status: str
-    labels: dict
-    annotations: dict
+    labels: dict[str, str]
+    annotations: dict[str, str]
+    fingerprint: Optional[str] = Field(None, max_length=64)   # stable hash of the alert's labels
+    startsAt: Optional[datetime] = None
+    endsAt: Optional[datetime] = None      # "0001-01-01T00:00:00Z" while still firing
+
+    @field_validator("labels", "annotations", mode="before")
+    @classmethod
+    def values_as_strings(cls, value):
+        # Alertmanager only sends strings, but hand-written senders don't:
+        # {"severity": 2} becomes "2", nulls are dropped
+        if isinstance(value, dict):
+            return {key: v if isinstance(v, str) else str(v) for key, v in value.items() if v is not None}
+        return value
 
 
 class AlertmanagerWebhook(BaseModel):
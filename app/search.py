@@ -0,0 +1,65 @@
+import re
+
+from sqlalchemy import Select, column, func, literal_column, select, table, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import Incident
+from app.serialization import INCIDENT_COLUMNS
+
+# Full-text search over title, alert_name and description.
+# The index structures are created next to the incidents table (see SEARCH_DDL in
+# app/models.py); this module builds the matching query for the current database.
+#
+# Both variants produce (id, rank) rows where a HIGHER rank means more relevant,
+# so the route can page through them the same way on either database.
+
+incidents_fts = table("incidents_fts", column("rowid"))
+
+
+def _postgres_matches(q: str) -> Select:
+    # websearch_to_tsquery accepts what people type into search boxes:
+    # words, "quoted phrases", OR, -excluded — and never raises a syntax error
+    query = func.websearch_to_tsquery("english", q)
+    vector = literal_column("incidents.search_vector")
+    return (
+        select(Incident.id.label("id"), func.ts_rank_cd(vector, query).label("rank"))
+        .where(vector.op("@@")(query))
+    )
+
+
+def _sqlite_matches(q: str) -> Select:
+    # FTS5 has its own query language; quote every word so user input is
+    # always a plain "all of these words" search
+    match = " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+    fts = literal_column("incidents_fts")
+    return (
+        # bm25() is lower-is-better — negate it; title/alert_name count 10x/5x the description
+        select(incidents_fts.c.rowid.label("id"), (-func.bm25(fts, 10.0, 5.0, 1.0)).label("rank"))
+        .select_from(incidents_fts)
+        .where(fts.op("MATCH")(match))
+    )
+
+
+def search_incidents(db: Session, q: str, limit: int, after: tuple[float, int] = None,
+                     status: str = None, severity: str = None) -> list:
+    """
+    Up to `limit` rows of INCIDENT_COLUMNS + rank for the keywords in q, most relevant first.
+    after = (rank, id) of the last row of the previous page.
+    """
+    if not re.search(r"\w", q):
+        return []   # nothing searchable, e.g. only punctuation
+
+    build = _postgres_matches if db.get_bind().dialect.name == "postgresql" else _sqlite_matches
+    matches = build(q).subquery()
+
+    query = select(*INCIDENT_COLUMNS, matches.c.rank).join(matches, Incident.id == matches.c.id)
+    if status:
+        query = query.where(Incident.status == status)
+    if severity:
+        query = query.where(Incident.severity == severity)
+    if after:
+        query = query.where(tuple_(matches.c.rank, Incident.id) < after)
+
+    return db.execute(
+        query.order_by(matches.c.rank.desc(), Incident.id.desc()).limit(limit)
+    ).all()
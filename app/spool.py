@@ -0,0 +1,362 @@
+import contextlib
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.config import settings
+from app.ingest import ingest_alerts
+from app.metrics import (
+    ingest_spool_dead_lettered_total,
+    ingest_spool_depth,
+    ingest_spool_lag_seconds,
+    ingest_spool_rejected_total,
+    ingest_spool_drained_total
+)
+from app.schemas import AlertmanagerWebhook
+
+logger = logging.getLogger(__name__)
+
+
+# Write-behind ingestion for the Alertmanager webhook (INGEST_MODE=spool).
+#
+# The webhook only appends the payload to a local append-only file and answers
+# 202, so a slow or failing-over Postgres no longer makes Alertmanager time out
+# and retry. A background thread drains the file into the incidents table in
+# batches, through the same ingest_alerts() as the synchronous path.
+#
+# On disk, per uvicorn worker:
+#   spool-<pid>.log  one JSON line per accepted payload
+#   spool-<pid>.ack  byte offset in .log up to which payloads are in the DB
+# Each worker flock()s its own .log before it appears under that name. At
+# startup, unlocked files (left by a worker that died) are adopted — their
+# pending payloads are replayed.
+#
+# Failed drains:
+#   - the database being down (connection errors, timeouts) is retried forever
+#     with backoff — that is what the spool is for
+#   - any other error means some payload in the batch can't be written. Those
+#     payloads are retried one at a time, and one that fails SPOOL_MAX_ATTEMPTS
+#     times is moved to dead-letter.log (shared by all workers), so it can't
+#     block the queue behind it
+DEAD_LETTER_FILE = "dead-letter.log"
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors that mean the database isn't reachable right now, not that the payload is bad"""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError))
+
+
+class SpoolFull(Exception):
+    pass
+
+
+class Spool:
+    def __init__(self, directory: str, max_pending: int = 10000, batch_size: int = 500,
+                 drain_interval: float = 0.5, compact_bytes: int = 64 * 1024 * 1024, max_attempts: int = 3,
+                 session_factory=None):
+        self.directory = directory
+        self.max_pending = max_pending
+        self.batch_size = batch_size              # alerts per DB transaction
+        self.drain_interval = drain_interval
+        self.compact_bytes = compact_bytes
+        self.max_attempts = max_attempts          # non-transient failures of one payload before dead-lettering
+        self.session_factory = session_factory
+
+        self._lock = threading.Lock()             # guards the file position and _pending
+        self._sync_lock = threading.Lock()        # one fsync at a time, covering every write before it
+        self._synced_offset = 0
+        self._pending = deque()                   # (end_offset, accepted_at, payload dict)
+        self._isolate_until = 0                   # drain one payload at a time up to this offset
+        self._attempts = 0                        # failures of the payload at the head, drained alone
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"spool-{os.getpid()}")
+        self._ack_path = base + ".ack"
+        self._dead_letter_path = os.path.join(directory, DEAD_LETTER_FILE)
+        self._log_path = base + ".log"
+        self._file = self._open_log(self._log_path)
+
+        self._acked = self._read_ack(self._ack_path, self._file)
+        self._load_pending()
+        self._adopt_orphans()
+        self._publish_depth()
+
+    # ── WRITE SIDE (request path) ────────────────────────────────────────────
+
+    def append(self, payload: AlertmanagerWebhook):
+        """Durably queue one payload. Returns once it is fsynced; raises SpoolFull when bounded out."""
+        accepted_at, data = time.time(), payload.model_dump(mode="json")
+        record = json.dumps({"ts": accepted_at, "payload": data}).encode() + b"\n"
+
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise SpoolFull()
+            self._file.write(record)
+            self._file.flush()
+            end_offset = self._file.tell()
+            self._pending.append((end_offset, accepted_at, data))
+            depth = len(self._pending)
+
+        self._sync(end_offset)
+        ingest_spool_depth.set(depth)
+        self._wakeup.set()
+        return depth
+
+    def _sync(self, offset: int):
+        # Group commit: whoever gets the lock fsyncs everything written so far,
+        # the requests queued behind it find their offset already covered.
+        with self._sync_lock:
+            if self._synced_offset >= offset:
+                return
+            with self._lock:
+                target = self._file.tell()
+            os.fsync(self._file.fileno())
+            self._synced_offset = target
+
+    # ── READ SIDE (drain thread) ─────────────────────────────────────────────
+
+    def start(self):
+        self._thread = threading.Thread(target=self._drain_loop, name="spool-drain", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._file.close()
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def drain_once(self) -> int:
+        """Ingest one batch. Returns the number of payloads taken off the spool (written or dead-lettered)."""
+        with self._lock:
+            batch, alerts, fingerprints = [], [], set()
+            for entry in self._pending:
+                if batch and entry[0] <= self._isolate_until:
+                    break   # looking for the payload that failed its batch: one at a time
+                payload_alerts = entry[2]["alerts"]
+                payload_fingerprints = {alert.get("fingerprint") for alert in payload_alerts} - {None}
+                # Cut the batch before it would hold two notifications for the same alert,
+                # so "resolved then firing again" keeps its order
+                if batch and (len(alerts) + len(payload_alerts) > self.batch_size or fingerprints & payload_fingerprints):
+                    break
+                batch.append(entry)
+                alerts.extend(payload_alerts)
+                fingerprints |= payload_fingerprints
+
+        if not batch:
+            return 0
+
+        try:
+            webhook = AlertmanagerWebhook.model_validate({"receiver": "spool", "status": "firing", "alerts": alerts})
+            with self.session_factory() as db:
+                ingest_alerts(db, webhook.alerts)
+        except Exception as error:
+            if is_transient(error):
+                raise
+            if len(batch) > 1:
+                self._isolate_until = batch[-1][0]
+                raise
+            self._attempts += 1
+            if self._attempts < self.max_attempts:
+                raise
+            self._dead_letter(batch[0], error)
+        else:
+            ingest_spool_drained_total.inc(len(batch))
+        self._attempts = 0
+
+        with self._lock:
+            for _ in batch:
+                self._pending.popleft()
+            self._write_ack(batch[-1][0])
+            self._compact()
+            depth = len(self._pending)
+
+        self._publish_depth(depth)
+        return len(batch)
+
+    def _dead_letter(self, entry, error: Exception):
+        _, accepted_at, payload = entry
+        reason = f"{type(error).__name__}: {error}".splitlines()[0]
+        record = json.dumps({"ts": accepted_at, "failed_at": time.time(), "error": reason, "payload": payload})
+        with open(self._dead_letter_path, "ab") as dead_letter:
+            fcntl.flock(dead_letter, fcntl.LOCK_EX)   # every worker appends to the same file
+            dead_letter.write(record.encode() + b"\n")
+            dead_letter.flush()
+            os.fsync(dead_letter.fileno())
+        ingest_spool_dead_lettered_total.inc()
+        logger.error("Spooled payload failed %d times, moved to %s: %s", self._attempts, self._dead_letter_path, reason)
+
+    def _drain_loop(self):
+        backoff = self.drain_interval
+        while not self._stop.is_set():
+            self._publish_depth()
+            try:
+                if self.drain_once():
+                    backoff = self.drain_interval
+                    continue
+            except Exception:
+                # DB down, failover, a bad payload not yet dead-lettered, ... — try again later
+                logger.exception("Spool drain failed, retrying in %.1fs", backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            self._wakeup.wait(self.drain_interval)
+            self._wakeup.clear()
+
+    # ── BOOKKEEPING ──────────────────────────────────────────────────────────
+
+    def _publish_depth(self, depth: int = None):
+        ingest_spool_depth.set(len(self._pending) if depth is None else depth)
+        oldest = self._pending[0][1] if self._pending else None
+        ingest_spool_lag_seconds.set(time.time() - oldest if oldest else 0)
+
+    @staticmethod
+    def _read_ack(ack_path, log_file) -> int:
+        try:
+            with open(ack_path) as ack:
+                acked = int(ack.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        log_file.seek(0, os.SEEK_END)
+        # Offset past the end = we crashed between truncating the log and resetting the ack
+        return acked if acked <= log_file.tell() else 0
+
+    def _write_ack(self, offset: int):
+        self._acked = offset
+        tmp = self._ack_path + ".tmp"
+        with open(tmp, "w") as ack:
+            ack.write(str(offset))
+        os.replace(tmp, self._ack_path)   # atomic — never a half-written offset
+
+    def _compact(self):
+        # Fully drained and big → start the file over (truncate first, then reset the ack)
+        if not self._pending and self._file.tell() >= self.compact_bytes:
+            self._file.truncate(0)
+            self._file.seek(0)
+            self._synced_offset = 0
+            self._isolate_until = 0
+            self._write_ack(0)
+
+    def _records(self, log_file, start: int):
+        log_file.seek(start)
+        offset = start
+        for line in log_file:
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break   # torn write from a crash — it was never acknowledged with 202
+            record = json.loads(line)
+            yield offset, record
+
+    def _open_log(self, path: str):
+        """Open and flock our .log. A new file is locked under a temporary name first, so
+        another worker's _adopt_orphans() never sees it unlocked."""
+        while True:
+            existing = os.path.exists(path)   # left by an earlier process with our pid
+            log_file = open(path if existing else path + ".new", "a+b")
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+            if not existing:
+                log_file.truncate(0)   # a .new left by a crash never got a payload
+                os.replace(path + ".new", path)
+            if _same_file(log_file, path):
+                return log_file
+            log_file.close()   # another worker adopted (and removed) it while we waited for the lock
+
+    def _load_pending(self):
+        for end_offset, record in self._records(self._file, self._acked):
+            self._pending.append((end_offset, record["ts"], record["payload"]))
+        self._file.seek(0, os.SEEK_END)
+        self._synced_offset = self._file.tell()
+
+    def _adopt_orphans(self):
+        """Replay spools left behind by dead workers, by copying their pending payloads into ours"""
+        for path in glob.glob(os.path.join(self.directory, "spool-*.log")):
+            if path == self._log_path:
+                continue
+            try:
+                orphan = open(path, "rb")
+            except FileNotFoundError:
+                continue   # adopted by another worker since the glob
+            with orphan:
+                try:
+                    fcntl.flock(orphan, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue   # a live worker owns it
+                if not _same_file(orphan, path):
+                    continue   # adopted by another worker between our open and flock
+                ack_path = path[:-len(".log")] + ".ack"
+                records = list(self._records(orphan, self._read_ack(ack_path, orphan)))
+                for _, record in records:
+                    self._file.write(json.dumps(record).encode() + b"\n")
+                    self._file.flush()
+                    self._pending.append((self._file.tell(), record["ts"], record["payload"]))
+                os.fsync(self._file.fileno())
+                self._synced_offset = self._file.tell()
+                os.remove(path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(ack_path)
+                if records:
+                    logger.info("Adopted %d pending payload(s) from %s", len(records), path)
+
+
+def _same_file(open_file, path: str) -> bool:
+    """Is `path` still the file we have open (not removed, or replaced by a new one)?"""
+    try:
+        return os.stat(path).st_ino == os.fstat(open_file.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+# Created by the app lifespan when INGEST_MODE=spool
+active_spool: Spool = None
+
+
+def start_spool(session_factory):
+    global active_spool
+    active_spool = Spool(
+        settings.spool_dir,
+        max_pending=settings.spool_max_pending,
+        batch_size=settings.spool_batch_size,
+        max_attempts=settings.spool_max_attempts,
+        session_factory=session_factory
+    )
+    active_spool.start()
+
+
+def stop_spool():
+    global active_spool
+    if active_spool is not None:
+        active_spool.stop()
+        active_spool = None
+
+
+def spool_alerts(payload: AlertmanagerWebhook):
+    """Webhook path in spool mode: queue durably, answer 202, or push back with 503"""
+    try:
+        depth = active_spool.append(payload)
+    except SpoolFull:
+        ingest_spool_rejected_total.inc()
+        # Alertmanager retries failed notifications, so 503 is the backpressure signal
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion queue is full",
+            headers={"Retry-After": str(settings.spool_retry_after)}
+        )
+    return JSONResponse(status_code=202, content={"message": "Accepted", "queued": depth})
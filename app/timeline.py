@@ -0,0 +1,32 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import IncidentEvent
+
+
+# ── WRITE PATH ───────────────────────────────────────────────────────────────
+# Call before db.commit() so the history changes in the same transaction as
+# the incident. Each entry is one small INSERT — the incident row is never rewritten.
+
+def record_timeline(db: Session, entries):
+    """entries: iterable of (incident_id, type, payload dict) — one executemany INSERT"""
+    rows = [
+        {"incident_id": incident_id, "type": event_type, "payload": payload}
+        for incident_id, event_type, payload in entries
+    ]
+    if rows:
+        db.execute(insert(IncidentEvent), rows)
+
+
+def updated_entry(incident_id: int, fields, old, new) -> tuple:
+    """
+    The "updated" entry: which fields were sent, and how status/severity changed.
+    old/new: anything with .status and .severity (old is None when they weren't read).
+    """
+    payload = {"fields": sorted(fields)}
+    if old is not None:
+        for field in ("status", "severity"):
+            before, after = getattr(old, field), getattr(new, field)
+            if before != after:
+                payload[field] = {"from": before.value, "to": after.value}
+    return incident_id, "updated", payload
@@ -0,0 +1,105 @@
+"""
+Serialization throughput for a 10k-row incident response, old vs. new read path.
+
+  old: ORM Incident objects → pydantic IncidentResponse validation → stdlib json
+       (what FastAPI does for a response_model route returning ORM objects)
+  new: column tuples → dicts → orjson (app/serialization.py)
+
+Timed twice: serialization only (rows already in memory), and end to end
+including the SELECT that produces them.
+
+Usage:
+    python -m benchmarks.bench_serialize
+    BENCH_ROWS=50000 python -m benchmarks.bench_serialize
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.database import SessionLocal, upgrade_schema  # noqa: E402
+from app.models import Incident  # noqa: E402
+from app.schemas import IncidentResponse  # noqa: E402
+from app.serialization import INCIDENT_COLUMNS, dumps, incident_dicts  # noqa: E402
+
+ROWS = int(os.getenv("BENCH_ROWS", "10000"))
+ROUNDS = 10
+
+response_adapter = TypeAdapter(List[IncidentResponse])
+
+
+def seed(db):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.execute(insert(Incident), [
+        {
+            "title":       f"Synthetic incident {n}",
+            "description": "Something went wrong somewhere " * 4,
+            "severity":    random.choice(["low", "medium", "high", "critical"]),
+            "status":      random.choice(["open", "resolved"]),
+            "source":      "bench",
+            "alert_name":  "SyntheticAlert",
+            "created_at":  base + timedelta(minutes=n),
+            "resolved_at": base + timedelta(minutes=n + 30),
+        }
+        for n in range(ROWS)
+    ])
+    db.commit()
+
+
+def old_serialize(incidents) -> bytes:
+    validated = response_adapter.validate_python(incidents)
+    content = response_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def new_serialize(rows) -> bytes:
+    return dumps(incident_dicts(rows))
+
+
+def timed(run):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    upgrade_schema()
+    db = SessionLocal()
+    seed(db)
+
+    def old_fetch():
+        db.expunge_all()
+        return db.scalars(select(Incident).limit(ROWS)).all()
+
+    def new_fetch():
+        return db.execute(select(*INCIDENT_COLUMNS).limit(ROWS)).all()
+
+    incidents, rows = old_fetch(), new_fetch()
+    results = {
+        "serialize only": (timed(lambda: old_serialize(incidents)), timed(lambda: new_serialize(rows))),
+        "query + serialize": (timed(lambda: old_serialize(old_fetch())), timed(lambda: new_serialize(new_fetch()))),
+    }
+
+    print(f"{ROWS} rows per response")
+    print(f"{'stage':>18} {'old ms':>10} {'new ms':>10} {'old rows/s':>12} {'new rows/s':>12} {'speedup':>8}")
+    for stage, (old, new) in results.items():
+        print(f"{stage:>18} {old * 1000:>10.1f} {new * 1000:>10.1f} "
+              f"{ROWS / old:>12,.0f} {ROWS / new:>12,.0f} {old / new:>7.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config import settings
+from app.database import Base
+from app.models import include_in_autogenerate  # noqa: F401 — also registers every table on Base
+
+# Alembic environment — run by `alembic upgrade head` and friends.
+# The URL comes from DATABASE_URL like the app's, unless the caller set
+# sqlalchemy.url on the Config (the tests do, to migrate a scratch database).
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    return config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+def configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_in_autogenerate,
+        # SQLite can't ALTER most things — let Alembic rebuild the table instead
+        render_as_batch=database_url().startswith("sqlite"),
+        **kwargs
+    )
+
+
+def run_migrations_offline():
+    """`alembic upgrade head --sql`: print the SQL instead of running it"""
+    configure(url=database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
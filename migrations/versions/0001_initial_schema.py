@@ -0,0 +1,72 @@
+"""initial schema
+
+The schema of the first release, which created it with Base.metadata.create_all():
+the incidents table, with the columns and index that release had. Everything
+added after it (fingerprint dedup, keyset indexes, rollups, full-text search)
+comes in the revisions that follow, so a database created by that release
+upgrades like any other:
+    alembic upgrade head
+
+Such a database already has the incidents table: this revision then leaves it
+alone (`alembic stamp 0001 && alembic upgrade head` does the same). The later
+revisions each check what is already there, so databases created by
+create_all() at any point before migrations existed upgrade too.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 23:27:38.143669
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+INCIDENT_STATUSES = ('open', 'investigating', 'resolved')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not op.get_context().as_sql and sa.inspect(bind).has_table('incidents'):
+        return   # created by create_all() before migrations existed — adopt it as is
+
+    # Postgres enum types, created once up front (a no-op on SQLite). The later
+    # tables reuse them.
+    sa.Enum(*SEVERITY_LEVELS, name='severitylevel').create(bind, checkfirst=True)
+    sa.Enum(*INCIDENT_STATUSES, name='incidentstatus').create(bind, checkfirst=True)
+    severity = postgresql.ENUM(*SEVERITY_LEVELS, name='severitylevel', create_type=False)
+    status = postgresql.ENUM(*INCIDENT_STATUSES, name='incidentstatus', create_type=False)
+
+    op.create_table('incidents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('severity', severity, nullable=False),
+    sa.Column('status', status, nullable=False),
+    sa.Column('source', sa.String(length=100), nullable=True),
+    sa.Column('alert_name', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_incidents_id', 'incidents', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.drop_table('incidents')
+
+    sa.Enum(name='incidentstatus').drop(bind, checkfirst=True)
+    sa.Enum(name='severitylevel').drop(bind, checkfirst=True)
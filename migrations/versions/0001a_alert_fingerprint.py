@@ -0,0 +1,45 @@
+"""alert fingerprint dedup
+
+incidents.fingerprint holds the Alertmanager fingerprint of the alert that
+opened the incident. A partial unique index allows at most one open incident
+per fingerprint, and only indexes unresolved rows.
+
+Databases created by create_all() after this change already have both;
+they are skipped.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 09:12:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns, indexes = set(), set()
+    if not op.get_context().as_sql:   # `upgrade --sql` has no database to look at
+        inspector = sa.inspect(op.get_bind())
+        columns = {column['name'] for column in inspector.get_columns('incidents')}
+        indexes = {index['name'] for index in inspector.get_indexes('incidents')}
+
+    if 'fingerprint' not in columns:
+        op.add_column('incidents', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    if 'uq_incidents_open_fingerprint' not in indexes:
+        op.create_index('uq_incidents_open_fingerprint', 'incidents', ['fingerprint'], unique=True,
+                        postgresql_where=sa.text("status <> 'resolved'"), sqlite_where=sa.text("status <> 'resolved'"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_incidents_open_fingerprint', table_name='incidents')
+    with op.batch_alter_table('incidents') as batch_op:
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,42 @@
+"""keyset pagination indexes
+
+GET /incidents pages by (created_at, id). There is one index per filter shape,
+each ending in (created_at, id) to match the ORDER BY.
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-17 09:13:02.907115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001b'
+down_revision: Union[str, None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    'ix_incidents_created_at_id': ['created_at', 'id'],
+    'ix_incidents_status_created_at_id': ['status', 'created_at', 'id'],
+    'ix_incidents_severity_created_at_id': ['severity', 'created_at', 'id'],
+}
+
+
+def upgrade() -> None:
+    existing = set()
+    if not op.get_context().as_sql:   # `upgrade --sql` has no database to look at
+        existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('incidents')}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'incidents', columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name='incidents')
@@ -0,0 +1,58 @@
+"""hourly incident rollups
+
+incident_rollups holds pre-aggregated incident volume and MTTR per hour,
+severity and source, for GET /incidents/stats.
+
+The table starts empty. If the database already has incidents, backfill it once:
+    python -m app.cli rollup-rebuild
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-17 09:13:27.331940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001c'
+down_revision: Union[str, None] = '0001b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('incident_rollups'):
+        return
+
+    # The enum type already exists (0001) — reuse it
+    severity = postgresql.ENUM(*SEVERITY_LEVELS, name='severitylevel', create_type=False)
+    op.create_table('incident_rollups',
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('severity', severity, nullable=False),
+    sa.Column('source', sa.String(length=100), nullable=False),
+    sa.Column('created_count', sa.Integer(), nullable=False),
+    sa.Column('resolved_count', sa.Integer(), nullable=False),
+    sa.Column('resolution_seconds_sum', sa.Float(), nullable=False),
+    sa.Column('resolved_le_300', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_900', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_1800', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_3600', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_7200', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_14400', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_28800', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_86400', sa.Integer(), nullable=False),
+    sa.Column('resolved_le_inf', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'severity', 'source')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('incident_rollups')
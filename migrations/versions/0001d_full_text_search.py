@@ -0,0 +1,94 @@
+"""full-text search
+
+The structures behind GET /incidents/search, created with raw DDL because they
+are database-specific:
+  PostgreSQL: a generated tsvector column with a GIN index (Postgres fills it
+              in for existing rows)
+  SQLite:     an FTS5 table kept in sync by triggers, built from existing rows here
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-17 09:13:51.602877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001d'
+down_revision: Union[str, None] = '0001c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copied from SEARCH_DDL in app/models.py as of this revision — migrations must
+# not change when the models do
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE incidents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(alert_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX ix_incidents_search_vector ON incidents USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE incidents_fts USING fts5(
+            title, alert_name, description,
+            content='incidents', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER incidents_fts_insert AFTER INSERT ON incidents BEGIN
+            INSERT INTO incidents_fts (rowid, title, alert_name, description)
+            VALUES (new.id, new.title, new.alert_name, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER incidents_fts_delete AFTER DELETE ON incidents BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, title, alert_name, description)
+            VALUES ('delete', old.id, old.title, old.alert_name, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER incidents_fts_update AFTER UPDATE OF title, alert_name, description ON incidents BEGIN
+            INSERT INTO incidents_fts (incidents_fts, rowid, title, alert_name, description)
+            VALUES ('delete', old.id, old.title, old.alert_name, old.description);
+            INSERT INTO incidents_fts (rowid, title, alert_name, description)
+            VALUES (new.id, new.title, new.alert_name, new.description);
+        END
+        """,
+        # Index the rows that were there before the table existed
+        "INSERT INTO incidents_fts (incidents_fts) VALUES ('rebuild')",
+    ],
+}
+
+
+def _already_searchable(inspector, dialect: str) -> bool:
+    if dialect == "postgresql":
+        return 'search_vector' in {column['name'] for column in inspector.get_columns('incidents')}
+    return inspector.has_table('incidents_fts')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not op.get_context().as_sql and _already_searchable(sa.inspect(bind), bind.dialect.name):
+        return
+    for statement in SEARCH_DDL.get(bind.dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TABLE incidents DROP COLUMN search_vector")   # drops its index too
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("incidents_fts_insert", "incidents_fts_delete", "incidents_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS incidents_fts")
@@ -0,0 +1,57 @@
+"""incidents archive
+
+incidents_archive holds resolved incidents moved out of the hot table by
+`python -m app.cli archive`. On PostgreSQL it's range-partitioned by month on
+created_at; the monthly partitions themselves are created on demand by the
+archive job (app/archive.py), not here.
+
+Revision ID: 0002
+Revises: 0001d
+Create Date: 2026-10-16 23:58:12.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+INCIDENT_STATUSES = ('open', 'investigating', 'resolved')
+
+
+def upgrade() -> None:
+    # The enum types already exist (0001) — reuse them
+    severity = postgresql.ENUM(*SEVERITY_LEVELS, name='severitylevel', create_type=False)
+    status = postgresql.ENUM(*INCIDENT_STATUSES, name='incidentstatus', create_type=False)
+
+    op.create_table('incidents_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('severity', severity, nullable=False),
+    sa.Column('status', status, nullable=False),
+    sa.Column('source', sa.String(length=100), nullable=True),
+    sa.Column('alert_name', sa.String(length=255), nullable=True),
+    sa.Column('fingerprint', sa.String(length=64), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_incidents_archive_created_at_id', 'incidents_archive', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_incidents_archive_created_at_id', table_name='incidents_archive')
+    op.drop_table('incidents_archive')   # on Postgres this drops the monthly partitions too
@@ -0,0 +1,31 @@
+"""incident row version
+
+incidents.version counts the updates of each row; the ETags of
+GET /incidents and GET /incidents/{id} are derived from it.
+Existing rows start at 1.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:41:05.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('incidents', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('incidents') as batch_op:
+        batch_op.drop_column('version')
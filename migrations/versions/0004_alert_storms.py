@@ -0,0 +1,46 @@
+"""alert storms
+
+incidents.occurrence_count (and its copy in incidents_archive) and the
+incident_alerts table, which holds the alerts folded into an alert-storm
+incident by the webhook's admission control (app/admission.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 01:32:47.550921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('incidents', sa.Column('occurrence_count', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('incidents_archive', sa.Column('occurrence_count', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+    op.create_table('incident_alerts',
+    sa.Column('incident_id', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('labels', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('incident_id', 'fingerprint')
+    )
+    op.create_index('ix_incident_alerts_fingerprint', 'incident_alerts', ['fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_incident_alerts_fingerprint', table_name='incident_alerts')
+    op.drop_table('incident_alerts')
+    with op.batch_alter_table('incidents_archive') as batch_op:
+        batch_op.drop_column('occurrence_count')
+    with op.batch_alter_table('incidents') as batch_op:
+        batch_op.drop_column('occurrence_count')
@@ -0,0 +1,39 @@
+"""incident timeline
+
+incident_events: the append-only history behind GET /incidents/{id}/timeline.
+Resolution notes go here instead of being appended to incidents.description.
+Existing notes stay in the descriptions they were already written to.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 02:41:09.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('incident_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('incident_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=32), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_incident_events_incident_id_ts_id', 'incident_events', ['incident_id', 'ts', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_incident_events_incident_id_ts_id', table_name='incident_events')
+    op.drop_table('incident_events')
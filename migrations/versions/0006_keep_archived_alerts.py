@@ -0,0 +1,60 @@
+"""keep archived alerts
+
+incident_alerts.incident_id is no longer a foreign key to incidents. Its
+ON DELETE CASCADE dropped a storm incident's folded alerts when the incident
+was archived (and SQLite, which doesn't enforce it, left orphans behind on
+delete). The alerts now stay with archived incidents, like incident_events;
+delete and archive-prune remove them explicitly.
+
+Alerts of incidents already archived on PostgreSQL are gone and can't be
+recovered. Orphans of deleted incidents are removed here.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 11:05:27.403716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite's foreign key has no name; batch mode needs one to drop it
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+SQLITE_FK = "fk_incident_alerts_incident_id_incidents"
+POSTGRES_FK = "incident_alerts_incident_id_fkey"   # PostgreSQL's default name
+
+
+def upgrade() -> None:
+    sqlite = op.get_context().dialect.name == 'sqlite'
+    has_fk = True
+    if not op.get_context().as_sql:   # `upgrade --sql` has no database to look at
+        has_fk = bool(sa.inspect(op.get_bind()).get_foreign_keys('incident_alerts'))
+
+    if has_fk and sqlite:
+        with op.batch_alter_table('incident_alerts', naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.drop_constraint(SQLITE_FK, type_='foreignkey')
+    elif has_fk:
+        op.drop_constraint(POSTGRES_FK, 'incident_alerts', type_='foreignkey')
+
+    op.execute(
+        "DELETE FROM incident_alerts WHERE incident_id NOT IN (SELECT id FROM incidents) "
+        "AND incident_id NOT IN (SELECT id FROM incidents_archive)"
+    )
+
+
+def downgrade() -> None:
+    # The foreign key can't hold the alerts of archived incidents — they are dropped
+    op.execute("DELETE FROM incident_alerts WHERE incident_id NOT IN (SELECT id FROM incidents)")
+    if op.get_context().dialect.name == 'sqlite':
+        with op.batch_alter_table('incident_alerts', naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.create_foreign_key(SQLITE_FK, 'incidents', ['incident_id'], ['id'], ondelete='CASCADE')
+    else:
+        op.create_foreign_key(POSTGRES_FK, 'incident_alerts', 'incidents', ['incident_id'], ['id'], ondelete='CASCADE')
@@ -0,0 +1,161 @@
+import fnmatch
+import time
+
+from app.cache import LRUCache
+
+
+# ── LRU CACHE TESTS ───────────────────────────────────────────────────────────
+def test_lru_evicts_least_recently_used():
+    """Should drop the least recently used entry once full"""
+    evicted = []
+    cache = LRUCache(maxsize=2, on_evict=lambda: evicted.append(1))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(evicted) == 1
+
+
+def test_lru_ttl_expires_entries():
+    """Entries older than the TTL should read as missing"""
+    cache = LRUCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+# ── RESPONSE CACHE BACKEND TESTS ──────────────────────────────────────────────
+class FakeRedis:
+    """The few redis.Redis calls the backend makes, on a dict — one instance = one shared server"""
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    def get(self, key):
+        self._check()
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at < time.monotonic():
+            self.data.pop(key)
+            return None
+        return value
+
+    def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and self.get(key) is not None:
+            return None
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        self._check()
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def pipeline(self, transaction=True):
+        server, calls = self, []
+
+        class Pipeline:
+            def set(self, *args, **kwargs):
+                calls.append((args, kwargs))
+
+            def execute(self):
+                return [server.set(*args, **kwargs) for args, kwargs in calls]
+
+        return Pipeline()
+
+
+def _redis_backend(server, **options):
+    from app.cache import RedisCacheBackend
+    return RedisCacheBackend("redis://fake", ttl=30, client=server, errors=(ConnectionError,), **options)
+
+
+def test_redis_backend_invalidates_across_workers():
+    """A write on one worker must invalidate what another worker cached"""
+    server = FakeRedis()
+    worker_a, worker_b = _redis_backend(server), _redis_backend(server)
+
+    worker_a.set("incident:1", b'{"title": "before"}')
+    assert worker_b.get("incident:1") == b'{"title": "before"}'
+
+    worker_b.delete("incident:1", "incident:2")   # worker B handled the update
+    assert worker_a.get("incident:1") is None
+
+
+def test_redis_backend_ttl_is_whole_seconds():
+    """Redis EX takes whole seconds; a sub-second TTL must still expire"""
+    server = FakeRedis()
+    backend = _redis_backend(server)
+    backend.ttl = 0.2
+    backend.set("incident:1", b"{}")
+    assert server.data["incident:1"][1] is not None
+
+
+def test_stale_fill_after_invalidation_is_dropped():
+    """A body read before a write, stored after its invalidation, must not be cached"""
+    from app.cache import LocalCacheBackend
+
+    for backend in (LocalCacheBackend(maxsize=10, ttl=30), _redis_backend(FakeRedis())):
+        backend.set("incident:1", b'{"title": "before"}')
+        backend.delete("incident:1")                        # the write commits
+        backend.set("incident:1", b'{"title": "before"}')   # a slow reader that loaded the old row
+        assert backend.get("incident:1") is None
+
+    # Without a tombstone it is a plain delete: the next fill is cached
+    backend = LocalCacheBackend(maxsize=10, ttl=30, tombstone=0)
+    backend.delete("incident:1")
+    backend.set("incident:1", b'{"title": "after"}')
+    assert backend.get("incident:1") == b'{"title": "after"}'
+
+
+def test_redis_outage_is_a_miss():
+    """Errors from Redis never reach the caller"""
+    server = FakeRedis()
+    backend = _redis_backend(server)
+    backend.set("incident:1", b"{}")
+    server.down = True
+    assert backend.get("incident:1") is None
+    backend.set("incident:2", b"{}")
+    backend.delete("incident:1")
+    backend.clear()
+    server.down = False
+    assert backend.get("incident:1") == b"{}"   # the failed delete was skipped, not retried
+
+
+def test_redis_clear_only_touches_incident_keys():
+    server = FakeRedis()
+    server.set("someone-else", b"keep")
+    backend = _redis_backend(server)
+    backend.set("incident:1", b"{}")
+    backend.clear()
+    assert list(server.data) == ["someone-else"]
+
+
+def test_local_cache_is_off_with_several_workers(monkeypatch):
+    """A per-worker cache can't be invalidated across workers, so it isn't used with more than one"""
+    from app import cache
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "cache_backend", "local")
+    monkeypatch.setattr(settings, "web_concurrency", 1)
+    assert isinstance(cache._make_incident_cache(), cache.LocalCacheBackend)
+
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    backend = cache._make_incident_cache()
+    assert isinstance(backend, cache.NullCacheBackend)
+    backend.set("incident:1", b"{}")
+    assert backend.get("incident:1") is None
@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.database import Base, get_db
+from app.instrumentation import instrument_engine
 
 # ── TEST DATABASE SETUP ───────────────────────────────────────────────────────
 # Uses a separate test database — never touches production data
@@ -17,6 +18,7 @@ TEST_DATABASE_URL = os.getenv(
 )
 
 engine = create_engine(TEST_DATABASE_URL)
+instrument_engine(engine, "test")
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -52,6 +54,13 @@ def sample_incident():
     return response.json()
 
 
+@pytest.fixture(autouse=True)
+def reset_storm_admission():
+    """Every test starts with full admission buckets (tests reuse alertnames a lot)"""
+    from app.admission import storm_admission
+    storm_admission.reset()
+
+
 # ── HEALTH CHECK TESTS ────────────────────────────────────────────────────────
 def test_health_check():
     """App should return healthy"""
@@ -67,6 +76,142 @@ def test_readiness_check():
     assert response.json()["database"] == "connected"
 
 
+def test_readiness_answers_from_the_last_probe(monkeypatch):
+    """/health/ready reports the background prober's state: 503 when the DB is down or the result is stale"""
+    from app import prober
+    from app.routes import health
+
+    down = prober.DbHealthProber(timeout=1, engine=create_engine("sqlite:////nonexistent-dir/down.db"))
+    monkeypatch.setattr(health, "db_prober", down)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["database"] == "disconnected"
+    down.stop()
+
+    up = prober.DbHealthProber(engine=engine)
+    monkeypatch.setattr(health, "db_prober", up)
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["latency_ms"] >= 0
+    assert response.json()["pools"]["sync"]["capacity"] > 0
+
+    # A prober that stopped reporting counts as not ready
+    up.result.checked_at -= 60
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["database"] == "unknown"
+    up.stop()
+
+    metrics = client.get("/metrics").text
+    assert "db_probe_latency_seconds_count" in metrics
+    assert "db_probe_failures_total" in metrics
+
+
+# ── METRICS TESTS ─────────────────────────────────────────────────────────────
+def test_query_metrics_per_route(sample_incident):
+    """Per-route SQL metrics and pool metrics should show up on /metrics"""
+    from app.database import init_engine
+    init_engine()   # the app's own engine is created lazily, on first use
+    client.get(f"/incidents/{sample_incident['id']}")
+
+    body = client.get("/metrics").text
+    assert 'db_query_duration_seconds_count{route="/incidents/{incident_id}"}' in body
+    assert 'db_queries_per_request_bucket{le="1.0",route="/incidents/{incident_id}"}' in body
+    assert 'db_pool_connections_in_use{pool="test"}' in body
+    assert 'db_pool_capacity{pool="sync"}' in body
+
+
+def test_failed_statements_leave_nothing_on_the_connection():
+    """Query timing must not pile up state on a pooled connection when statements fail"""
+    import copy
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        info = copy.deepcopy(dict(connection.info))
+        for _ in range(3):
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM no_such_table"))
+            connection.rollback()
+        connection.execute(text("SELECT 1"))
+        assert dict(connection.info) == info
+
+
+def test_open_gauge_seeded_from_db():
+    """Startup seeding should set the open gauge from a grouped COUNT(*)"""
+    from app.main import seed_open_incidents_gauge
+    from app.metrics import incidents_open_gauge
+    from app.models import Incident
+
+    client.post("/incidents/", json={"title": "Gauge seed incident", "severity": "critical"})
+    seed_open_incidents_gauge()
+
+    db = TestingSessionLocal()
+    expected = db.query(Incident).filter(Incident.severity == "critical", Incident.status != "resolved").count()
+    db.close()
+    assert incidents_open_gauge.labels(severity="critical")._value.get() == expected
+
+
+def test_open_gauge_seed_claimed_once(tmp_path, monkeypatch):
+    """In multiprocess mode only the first worker may seed the open gauge"""
+    from app import metrics
+
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    assert metrics.claim_open_gauge_seed() is True
+    assert metrics.claim_open_gauge_seed() is False
+
+
+def test_open_gauge_seed_gives_up_on_a_silent_database(monkeypatch):
+    """A COUNT(*) that doesn't answer in time is abandoned — its late result never lands"""
+    import threading
+    import time
+    from app import main
+    from app.metrics import incidents_open_gauge
+    from app.models import SeverityLevel
+
+    answer = threading.Event()
+
+    class SilentSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, statement):
+            answer.wait(5)
+            return type("Rows", (), {"all": lambda self: [(SeverityLevel.critical, 999)]})()
+
+    monkeypatch.setattr(main, "SessionLocal", SilentSession)
+    before = incidents_open_gauge.labels(severity="critical")._value.get()
+
+    assert main.seed_open_incidents_gauge(timeout=0.1) is False
+    answer.set()
+    time.sleep(0.1)
+    assert incidents_open_gauge.labels(severity="critical")._value.get() == before
+
+
+def test_cli_seed_metrics_seeds_once_before_the_workers(tmp_path, monkeypatch, capsys):
+    """`python -m app.cli seed-metrics` claims the seed, so the forked workers skip it"""
+    from app import cli, main, metrics
+    from app.metrics import incidents_open_gauge
+    from app.models import Incident
+
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    client.post("/incidents/", json={"title": "Seeded before fork", "severity": "low"})
+
+    cli.main(["seed-metrics"])
+    db = TestingSessionLocal()
+    expected = db.query(Incident).filter(Incident.severity == "low", Incident.status != "resolved").count()
+    db.close()
+    assert incidents_open_gauge.labels(severity="low")._value.get() == expected
+
+    cli.main(["seed-metrics"])
+    assert "already seeded" in capsys.readouterr().out
+    assert metrics.claim_open_gauge_seed() is False   # what each worker's lifespan checks
+
+
 # ── CREATE INCIDENT TESTS ─────────────────────────────────────────────────────
 def test_create_incident():
     """Should create a new incident and return 201"""
@@ -117,6 +262,370 @@ def test_list_incidents_filter_by_status(sample_incident):
         assert incident["status"] == "open"
 
 
+def test_list_incidents_matches_response_model(sample_incident):
+    """The orjson fast path must produce exactly what IncidentResponse would"""
+    from app.models import Incident
+    from app.schemas import IncidentResponse
+
+    client.put(f"/incidents/{sample_incident['id']}/resolve", json={})
+    listed = {incident["id"]: incident for incident in client.get("/incidents/").json()}
+
+    with TestingSessionLocal() as db:
+        incident = db.get(Incident, sample_incident["id"])
+        expected = IncidentResponse.model_validate(incident).model_dump(mode="json")
+
+    assert listed[sample_incident["id"]] == expected
+    assert client.get(f"/incidents/{sample_incident['id']}").json() == expected
+
+
+def test_list_incidents_pagination():
+    """Should page through incidents newest-first using the X-Next-Cursor header"""
+    for i in range(3):
+        client.post("/incidents/", json={"title": f"Paged incident {i}", "severity": "low"})
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 1, "severity": "low"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/incidents/", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        seen.append(response.json()[0]["id"])
+        cursor = response.headers.get("X-Next-Cursor")
+
+    # Newest first, no duplicates across pages
+    assert seen == sorted(seen, reverse=True)
+    assert len(set(seen)) == 3
+
+
+def test_list_incidents_etag():
+    """Polling with If-None-Match gets a 304 until something on the page changes"""
+    params = {"severity": "critical", "limit": 5}
+    incident_id = client.post("/incidents/", json={"title": "ETag incident", "severity": "critical"}).json()["id"]
+
+    first = client.get("/incidents/", params=params)
+    etag = first.headers["etag"]
+    again = client.get("/incidents/", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert client.get("/incidents/", params=params, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    # Any write to a row on the page changes the tag — including bulk updates
+    client.patch("/incidents/bulk", json={"updates": [{"id": incident_id, "description": "changed"}]})
+    changed = client.get("/incidents/", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()[0]["description"] == "changed"
+
+    body = client.get("/metrics").text
+    assert 'conditional_get_requests_total{result="not_modified",route="list_incidents"}' in body
+    assert 'conditional_get_requests_total{result="modified",route="list_incidents"}' in body
+
+
+def test_list_incidents_invalid_cursor():
+    """Should return 400 for a cursor we didn't issue"""
+    response = client.get("/incidents/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+# ── SEARCH TESTS ──────────────────────────────────────────────────────────────
+def test_search_ranks_and_filters():
+    """Keyword search should rank title matches first and respect filters"""
+    title_hit = client.post("/incidents/", json={"title": "Kafka consumer lag on orders", "severity": "high"}).json()
+    body_hit = client.post("/incidents/", json={
+        "title": "Checkout latency", "description": "Root cause was kafka consumers rebalancing", "severity": "low"
+    }).json()
+    client.post("/incidents/", json={"title": "Unrelated disk alert"})
+
+    response = client.get("/incidents/search", params={"q": "kafka consumer"})
+    assert response.status_code == 200
+    ids = [incident["id"] for incident in response.json()]
+    assert ids[:2] == [title_hit["id"], body_hit["id"]]   # "consumers" matches too — stemming
+
+    response = client.get("/incidents/search", params={"q": "kafka", "severity": "low"})
+    assert [incident["id"] for incident in response.json()] == [body_hit["id"]]
+
+
+def test_search_follows_updates_and_pages():
+    """Edited incidents are found by their new text; cursors page through results"""
+    created = [client.post("/incidents/", json={"title": f"Zookeeper quorum lost {i}"}).json() for i in range(3)]
+    client.put(f"/incidents/{created[0]['id']}", json={"title": "Renamed entirely"})
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "zookeeper", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/incidents/search", params=params)
+        seen += [incident["id"] for incident in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(incident["id"] for incident in created[1:])
+
+
+def test_search_odd_input():
+    """Punctuation-only or query-syntax input must not error"""
+    assert client.get("/incidents/search", params={"q": "!!!"}).json() == []
+    assert client.get("/incidents/search", params={"q": 'AND "( NEAR'}).status_code == 200
+    assert client.get("/incidents/search", params={"q": ""}).status_code == 422
+
+
+# ── STATS TESTS ───────────────────────────────────────────────────────────────
+def test_incident_stats_from_rollups():
+    """Webhook create + resolve should show up in the hourly rollup stats"""
+    window = {"start": "2023-03-01T00:00:00Z", "end": "2023-03-02T00:00:00Z"}
+    client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "firing", "alerts": [
+        _alert("fp-stats", startsAt="2023-03-01T10:05:00Z")
+    ]})
+    client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "resolved", "alerts": [
+        _alert("fp-stats", status="resolved", endsAt="2023-03-01T10:25:00Z")
+    ]})
+
+    response = client.get("/incidents/stats", params=window)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["created"]      == 1
+    assert stats["resolved"]     == 1
+    assert stats["mttr_seconds"] == 1200
+    assert stats["resolution_histogram"]["900"]  == 0
+    assert stats["resolution_histogram"]["1800"] == 1
+    assert len(stats["series"]) == 1
+
+    # A backfill from the incidents table must give the same answer
+    from app.rollup import rebuild
+    from datetime import datetime, timezone
+    db = TestingSessionLocal()
+    rebuild(db, since=datetime(2023, 3, 1, tzinfo=timezone.utc))
+    db.close()
+    assert client.get("/incidents/stats", params=window).json() == stats
+
+
+def test_rollups_follow_status_and_severity_changes():
+    """PUT and PATCH bulk keep the rollups equal to a rebuild: severity moves, reopen, re-resolve"""
+    from datetime import datetime, timezone
+    from app.rollup import hour_bucket, rebuild
+
+    source = {"source": "rollup-drift"}
+    first = client.post("/incidents/", json={"title": "Drifting incident", "severity": "low", **source}).json()["id"]
+    second = client.post("/incidents/", json={"title": "Drifting bulk incident", "severity": "low", **source}).json()["id"]
+
+    client.put(f"/incidents/{first}", json={"severity": "critical"})
+    client.put(f"/incidents/{first}", json={"status": "resolved"})
+    client.put(f"/incidents/{first}", json={"status": "open"})
+    client.put(f"/incidents/{first}/resolve", json={"resolution_note": "for real this time"})
+    client.patch("/incidents/bulk", json={"updates": [{"id": second, "severity": "high", "status": "resolved"}]})
+    assert client.get(f"/incidents/{second}").json()["resolved_at"] is not None
+
+    def stats(severity):
+        # Totals only: a moved-out hour may keep a row of zeros that a rebuild doesn't write
+        body = client.get("/incidents/stats", params={**source, "severity": severity}).json()
+        return {key: body[key] for key in ("created", "resolved", "mttr_seconds", "resolution_histogram")}
+
+    assert (stats("low")["created"], stats("low")["resolved"]) == (0, 0)
+    assert (stats("critical")["created"], stats("critical")["resolved"]) == (1, 1)
+    assert (stats("high")["created"], stats("high")["resolved"]) == (1, 1)
+
+    third = client.post("/incidents/", json={"title": "Deleted drifting incident", "severity": "high", **source})
+    client.delete(f"/incidents/{third.json()['id']}")
+    assert stats("high")["created"] == 1
+
+    expected = {severity: stats(severity) for severity in ("low", "high", "critical")}
+    db = TestingSessionLocal()
+    rebuild(db, since=hour_bucket(datetime.now(timezone.utc)))
+    db.close()
+    assert {severity: stats(severity) for severity in expected} == expected
+
+
+def test_incident_stats_counts_manual_incidents():
+    """Manually created incidents should be counted in the default (last 24h) window"""
+    before = client.get("/incidents/stats", params={"severity": "low"}).json()["created"]
+    client.post("/incidents/", json={"title": "Stats incident", "severity": "low"})
+    after = client.get("/incidents/stats", params={"severity": "low"}).json()["created"]
+    assert after == before + 1
+
+
+# ── EXPORT TESTS ──────────────────────────────────────────────────────────────
+def test_export_ndjson(sample_incident):
+    """Should stream one JSON object per line with the same fields as the API"""
+    import json
+
+    response = client.get("/incidents/export?format=ndjson&severity=high")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sample_incident["id"] in [row["id"] for row in rows]
+    assert all(row["severity"] == "high" for row in rows)
+    assert set(rows[0]) == set(sample_incident)
+
+
+def test_export_csv(sample_incident):
+    """Should stream CSV with a header row"""
+    response = client.get("/incidents/export?format=csv")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,title,description,severity,status")
+    assert any(line.startswith(f"{sample_incident['id']},Test Incident,") for line in lines[1:])
+
+
+def test_export_memory_stays_flat():
+    """Peak memory of an export must not grow with the number of rows exported"""
+    import asyncio
+    import tracemalloc
+    from sqlalchemy import insert
+    from app.models import Incident
+    from app.routes.incidents import export_incidents
+
+    def seed(count):
+        db = TestingSessionLocal()
+        db.execute(insert(Incident), [
+            {"title": f"Export row {n}", "description": "x" * 200, "severity": "low", "status": "resolved"}
+            for n in range(count)
+        ])
+        db.commit()
+        db.close()
+
+    def peak_export_memory():
+        response = export_incidents(format="ndjson", status="resolved", severity="low", db=TestingSessionLocal())
+
+        async def consume():
+            lines = 0
+            async for chunk in response.body_iterator:
+                lines += chunk.count("\n")
+            return lines
+
+        tracemalloc.start()
+        exported = asyncio.run(consume())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return exported, peak
+
+    seed(5_000)
+    small_rows, small_peak = peak_export_memory()
+    seed(20_000)
+    large_rows, large_peak = peak_export_memory()
+
+    assert large_rows >= small_rows + 20_000
+    # 5x the rows, (roughly) the same peak — one batch in memory at a time
+    assert large_peak < small_peak * 1.5
+
+
+# ── ARCHIVE TESTS ─────────────────────────────────────────────────────────────
+def test_archive_moves_old_resolved_incidents():
+    """Old resolved incidents leave the hot table in batches and show up in /incidents/archive"""
+    from datetime import datetime, timezone
+    from app.archive import archive_resolved
+
+    alerts = [
+        _alert(f"fp-archive-{n}", startsAt=f"2021-06-0{n + 1}T10:00:00Z",
+               annotations={"summary": f"Quasar relay outage {n}"})
+        for n in range(5)
+    ]
+    ids = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": alerts
+    }).json()["incident_ids"]
+    client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "resolved", "alerts": [
+        {**alert, "status": "resolved", "endsAt": "2021-06-10T00:00:00Z"} for alert in alerts[:4]
+    ]})
+    assert client.get(f"/incidents/{ids[0]}").status_code == 200   # warm the cache
+
+    db = TestingSessionLocal()
+    moved = archive_resolved(db, older_than_days=30, batch_size=3, now=datetime(2021, 8, 1, tzinfo=timezone.utc))
+    db.close()
+    assert moved == 4
+
+    # Gone from the hot path (cache included), still open one untouched
+    assert client.get(f"/incidents/{ids[0]}").status_code == 404
+    assert client.get(f"/incidents/{ids[4]}").json()["status"] == "open"
+    assert [row["id"] for row in client.get("/incidents/search", params={"q": "quasar"}).json()] == [ids[4]]
+
+    window = {"start": "2021-06-01T00:00:00Z", "end": "2021-07-01T00:00:00Z", "limit": 3}
+    first = client.get("/incidents/archive", params=window)
+    assert first.status_code == 200
+    rest = client.get("/incidents/archive", params={**window, "cursor": first.headers["x-next-cursor"]})
+    archived = first.json() + rest.json()
+    assert [row["id"] for row in archived] == list(reversed(ids[:4]))
+    assert all(row["status"] == "resolved" for row in archived)
+    assert set(archived[0]) == set(client.get(f"/incidents/{ids[4]}").json())
+
+
+def test_rollup_rebuild_keeps_archived_history():
+    """Archiving then rebuilding the rollups must not lose the archived incidents' stats"""
+    from datetime import datetime, timezone
+    from app.archive import archive_resolved
+    from app.rollup import rebuild
+
+    window = {"start": "2019-02-01T00:00:00Z", "end": "2019-02-02T00:00:00Z"}
+    alert = _alert("fp-archive-rollup", startsAt="2019-02-01T10:00:00Z")
+    client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "firing", "alerts": [alert]})
+    client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "resolved", "alerts": [
+        {**alert, "status": "resolved", "endsAt": "2019-02-01T10:10:00Z"}
+    ]})
+    stats = client.get("/incidents/stats", params=window).json()
+    assert (stats["created"], stats["resolved"]) == (1, 1)
+
+    db = TestingSessionLocal()
+    assert archive_resolved(db, older_than_days=30, now=datetime(2019, 4, 1, tzinfo=timezone.utc)) >= 1
+    rebuild(db, since=datetime(2019, 2, 1, tzinfo=timezone.utc))
+    db.close()
+    assert client.get("/incidents/stats", params=window).json() == stats
+
+
+def test_archived_storm_incident_keeps_its_alerts(monkeypatch):
+    """Folded alerts follow a storm incident into the archive, and go when it is pruned"""
+    from datetime import datetime, timezone
+    from sqlalchemy import update
+    from app.admission import storm_admission
+    from app.archive import archive_resolved, prune_archive
+    from app.models import Incident, IncidentAlert
+    monkeypatch.setattr(storm_admission, "burst", 1)
+    monkeypatch.setattr(storm_admission, "rate", 0)
+
+    alerts = [
+        {"status": "firing", "fingerprint": f"fp-fan-{n}",
+         "labels": {"alertname": "FanFailure", "instance": f"rack-{n}"}, "annotations": {"summary": "Fan failed"}}
+        for n in range(4)
+    ]
+    storm_id = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": alerts
+    }).json()["storm_ids"][0]
+    client.put(f"/incidents/{storm_id}/resolve", json={"resolution_note": "fans replaced"})
+
+    db = TestingSessionLocal()
+    old = datetime(1999, 6, 1, tzinfo=timezone.utc)
+    db.execute(update(Incident).where(Incident.id == storm_id).values(created_at=old, resolved_at=old))
+    db.commit()
+    assert archive_resolved(db, older_than_days=30, now=datetime(2000, 1, 1, tzinfo=timezone.utc)) == 1
+
+    assert client.get(f"/incidents/{storm_id}").status_code == 404
+    folded = client.get(f"/incidents/{storm_id}/alerts")
+    assert folded.status_code == 200
+    assert sorted(alert["labels"]["instance"] for alert in folded.json()) == ["rack-1", "rack-2", "rack-3"]
+
+    prune_archive(db, keep_months=1, now=datetime(2000, 1, 1, tzinfo=timezone.utc))
+    assert db.query(IncidentAlert).filter(IncidentAlert.incident_id == storm_id).count() == 0
+    db.close()
+    assert client.get(f"/incidents/{storm_id}/alerts").status_code == 404
+
+
+def test_archive_window_validation():
+    response = client.get("/incidents/archive", params={"start": "2021-07-01T00:00:00Z", "end": "2021-06-01T00:00:00Z"})
+    assert response.status_code == 400
+
+
+def test_archive_partition_ddl():
+    """Monthly partition bounds, including the year rollover"""
+    from datetime import datetime, timezone
+    from app.archive import partition_ddl
+
+    ddl = partition_ddl(datetime(2024, 12, 15, 8, 30, tzinfo=timezone.utc))
+    assert "incidents_archive_y2024m12 PARTITION OF incidents_archive" in ddl
+    assert "FROM ('2024-12-01T00:00:00+00:00') TO ('2025-01-01T00:00:00+00:00')" in ddl
+
+
 # ── GET INCIDENT TESTS ────────────────────────────────────────────────────────
 def test_get_incident(sample_incident):
     """Should return a single incident by ID"""
@@ -132,6 +641,60 @@ def test_get_incident_not_found():
     assert response.status_code == 404
 
 
+def test_get_incident_cache_invalidated_on_write(sample_incident):
+    """Cached GET responses must reflect updates, resolves and deletes"""
+    incident_id = sample_incident["id"]
+
+    assert client.get(f"/incidents/{incident_id}").json()["title"] == "Test Incident"   # miss → cached
+    assert client.get(f"/incidents/{incident_id}").json()["title"] == "Test Incident"   # hit
+
+    client.put(f"/incidents/{incident_id}", json={"title": "Renamed incident"})
+    assert client.get(f"/incidents/{incident_id}").json()["title"] == "Renamed incident"
+
+    client.put(f"/incidents/{incident_id}/resolve", json={})
+    assert client.get(f"/incidents/{incident_id}").json()["status"] == "resolved"
+
+    client.delete(f"/incidents/{incident_id}")
+    assert client.get(f"/incidents/{incident_id}").status_code == 404
+
+    body = client.get("/metrics").text
+    assert 'incident_cache_requests_total{result="hit"}' in body
+
+
+def test_redis_outage_never_fails_requests(sample_incident, monkeypatch):
+    """With the shared cache down, reads and (already committed) writes still succeed"""
+    from app import cache
+    from app.routes import incidents as incident_routes
+
+    class DownRedis:
+        def __getattr__(self, name):
+            def call(*args, **kwargs):
+                raise ConnectionError("Connection refused")
+            return call
+
+    backend = cache.RedisCacheBackend("redis://down", ttl=30, client=DownRedis(), errors=(ConnectionError,))
+    monkeypatch.setattr(cache, "incident_cache", backend)
+    monkeypatch.setattr(incident_routes, "incident_cache", backend)
+
+    incident_id = sample_incident["id"]
+    assert client.get(f"/incidents/{incident_id}").status_code == 200
+    assert client.put(f"/incidents/{incident_id}", json={"title": "Saved without Redis"}).status_code == 200
+    assert client.get(f"/incidents/{incident_id}").json()["title"] == "Saved without Redis"
+
+
+def test_get_incident_etag(sample_incident):
+    """Single incidents answer If-None-Match too, from the response cache"""
+    incident_id = sample_incident["id"]
+    etag = client.get(f"/incidents/{incident_id}").headers["etag"]
+    assert client.get(f"/incidents/{incident_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/incidents/{incident_id}", headers={"If-None-Match": "*"}).status_code == 304
+
+    client.put(f"/incidents/{incident_id}", json={"title": "Renamed for ETag"})
+    response = client.get(f"/incidents/{incident_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
 # ── RESOLVE INCIDENT TESTS ────────────────────────────────────────────────────
 def test_resolve_incident(sample_incident):
     """Should resolve an incident and set resolved_at timestamp"""
@@ -157,6 +720,305 @@ def test_resolve_already_resolved(sample_incident):
     assert response.status_code == 400
 
 
+def test_resolve_not_found():
+    """Should return 404 when resolving an incident that doesn't exist"""
+    response = client.put("/incidents/99999/resolve", json={})
+    assert response.status_code == 404
+
+
+def test_concurrent_resolve_has_one_winner(sample_incident):
+    """Responders racing to resolve the same incident — exactly one succeeds"""
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+
+    incident_id = sample_incident["id"]
+    racers = 8
+    barrier = Barrier(racers)
+
+    def resolve(n):
+        racer = TestClient(app)
+        barrier.wait()
+        return racer.put(f"/incidents/{incident_id}/resolve", json={"resolution_note": f"racer {n}"})
+
+    with ThreadPoolExecutor(racers) as pool:
+        responses = list(pool.map(resolve, range(racers)))
+
+    assert sorted(r.status_code for r in responses) == [200] + [400] * (racers - 1)
+    timeline = client.get(f"/incidents/{incident_id}/timeline").json()
+    assert [event["type"] for event in timeline] == ["created", "resolved"]
+
+
+# ── TIMELINE TESTS ────────────────────────────────────────────────────────────
+def test_timeline_records_changes_without_rewriting_the_incident(sample_incident):
+    """Updates and the resolution note are timeline entries; the description stays as written"""
+    incident_id = sample_incident["id"]
+    client.put(f"/incidents/{incident_id}", json={"status": "investigating", "title": "Renamed incident"})
+    client.put(f"/incidents/{incident_id}", json={"severity": "critical"})
+    resolved = client.put(f"/incidents/{incident_id}/resolve", json={"resolution_note": "Rolled back the deploy"})
+    assert resolved.json()["description"] == sample_incident["description"]
+
+    timeline = client.get(f"/incidents/{incident_id}/timeline").json()
+    assert [event["type"] for event in timeline] == ["created", "updated", "updated", "resolved"]
+    assert timeline[0]["payload"] == {"severity": "high", "source": "manual"}
+    assert timeline[1]["payload"] == {
+        "fields": ["status", "title"], "status": {"from": "open", "to": "investigating"}
+    }
+    assert timeline[2]["payload"] == {"fields": ["severity"], "severity": {"from": "high", "to": "critical"}}
+    assert timeline[3]["payload"] == {"resolution_note": "Rolled back the deploy"}
+
+    # Paginated oldest first, like the other lists (X-Next-Cursor)
+    first = client.get(f"/incidents/{incident_id}/timeline?limit=3")
+    assert [event["id"] for event in first.json()] == [event["id"] for event in timeline[:3]]
+    rest = client.get(f"/incidents/{incident_id}/timeline?limit=3&cursor={first.headers['x-next-cursor']}")
+    assert [event["id"] for event in rest.json()] == [timeline[3]["id"]]
+    assert "x-next-cursor" not in rest.headers
+
+    assert client.get("/incidents/99999/timeline").status_code == 404
+
+    # Deleting the incident removes its timeline too
+    client.delete(f"/incidents/{incident_id}")
+    assert client.get(f"/incidents/{incident_id}/timeline").status_code == 404
+
+
+# ── BULK TESTS ────────────────────────────────────────────────────────────────
+def test_bulk_create_update_resolve():
+    """Bulk routes should return one result per item, in request order"""
+    response = client.post("/incidents/bulk", json={"incidents": [
+        {"title": f"Bulk incident {i}", "severity": "low"} for i in range(3)
+    ]})
+    assert response.status_code == 201
+    results = response.json()["results"]
+    assert [r["result"] for r in results] == ["created"] * 3
+    ids = [r["id"] for r in results]
+    assert [r["incident"]["title"] for r in results] == [f"Bulk incident {i}" for i in range(3)]
+
+    response = client.patch("/incidents/bulk", json={"updates": [
+        {"id": ids[0], "severity": "critical"},
+        {"id": ids[1], "title": "Renamed in bulk"},
+        {"id": 99999, "title": "Nobody home"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["result"] for r in results] == ["updated", "updated", "not_found"]
+    assert results[0]["incident"]["severity"] == "critical"
+    assert results[1]["incident"]["title"] == "Renamed in bulk"
+    assert client.get(f"/incidents/{ids[1]}").json()["title"] == "Renamed in bulk"
+
+    client.put(f"/incidents/{ids[2]}/resolve", json={})
+    response = client.post("/incidents/bulk/resolve", json={
+        "ids": [ids[0], ids[1], ids[2], 99999],
+        "resolution_note": "Mass cleanup"
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["result"] for r in results] == ["resolved", "resolved", "already_resolved", "not_found"]
+    assert results[0]["incident"]["resolved_at"] is not None
+    assert results[0]["incident"]["description"] is None   # the note goes to the timeline
+    timeline = client.get(f"/incidents/{ids[0]}/timeline").json()
+    assert [event["type"] for event in timeline] == ["created", "updated", "resolved"]
+    assert timeline[1]["payload"] == {"fields": ["severity"], "severity": {"from": "low", "to": "critical"}}
+    assert timeline[2]["payload"] == {"resolution_note": "Mass cleanup"}
+    assert client.get(f"/incidents/{ids[0]}").json()["status"] == "resolved"
+
+
+def test_bulk_update_rejects_duplicate_ids(sample_incident):
+    """The same id twice in one bulk update is ambiguous"""
+    incident_id = sample_incident["id"]
+    response = client.patch("/incidents/bulk", json={"updates": [
+        {"id": incident_id, "title": "One"},
+        {"id": incident_id, "title": "Two"},
+    ]})
+    assert response.status_code == 400
+
+
+def test_bulk_create_limit():
+    """More than 1000 items in one request is rejected"""
+    response = client.post("/incidents/bulk", json={"incidents": [{"title": "x"}] * 1001})
+    assert response.status_code == 422
+
+
+# ── READ REPLICA TESTS ────────────────────────────────────────────────────────
+def test_reads_use_replicas_with_read_your_writes(tmp_path, monkeypatch):
+    """Reads go to a healthy replica, a dead one is ejected, and a client that just wrote reads the primary"""
+    from app import replicas
+    from app.database import upgrade_schema
+
+    # An empty "replica" (it never receives the writes) and one that can't connect
+    replica_url = f"sqlite:///{tmp_path}/replica.db"
+    upgrade_schema(replica_url)
+    monkeypatch.setattr(replicas, "replica_set", replicas.ReplicaSet(
+        [replica_url, "sqlite:////nonexistent-dir/down.db"], eject_seconds=60
+    ))
+
+    writer = TestClient(app)
+    created = writer.post("/incidents/", json={"title": "Replica lag", "severity": "low"})
+    assert created.status_code == 201
+    assert replicas.STICKY_COOKIE in created.cookies
+
+    # The writer is sticky to the primary, so it sees its own incident
+    ids = [incident["id"] for incident in writer.get("/incidents/?limit=1000").json()]
+    assert created.json()["id"] in ids
+
+    # Anyone else reads the (empty) replica — the dead one never fails a request
+    reader = TestClient(app)
+    for _ in range(3):
+        response = reader.get("/incidents/")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    metrics = client.get("/metrics").text
+    assert 'db_replica_ejections_total{replica="replica1"}' in metrics
+    assert 'db_read_routing_total{target="replica0"}' in metrics
+
+
+def test_stale_replica_reads_are_never_cached(tmp_path, monkeypatch):
+    """A lagging replica's row is served to its reader only — the writer and the cache never see it"""
+    from sqlalchemy import insert
+    from app import replicas
+    from app.cache import incident_cache, incident_cache_key
+    from app.database import upgrade_schema
+    from app.models import Incident
+
+    writer = TestClient(app)
+    created = writer.post("/incidents/", json={"title": "Before the edit", "severity": "low"}).json()
+    key = incident_cache_key(created["id"])
+
+    # A replica that has the incident, but not the edit below
+    replica_url = f"sqlite:///{tmp_path}/stale.db"
+    upgrade_schema(replica_url)
+    replica = create_engine(replica_url)
+    with replica.begin() as connection:
+        connection.execute(insert(Incident.__table__).values(
+            id=created["id"], title="Before the edit", severity="low", status="open"
+        ))
+    replica.dispose()
+    monkeypatch.setattr(replicas, "replica_set", replicas.ReplicaSet([replica_url], eject_seconds=60))
+
+    updated = writer.put(f"/incidents/{created['id']}", json={"title": "After the edit"})
+    assert updated.status_code == 200
+
+    # Another client reads the stale replica; that read must not fill the shared cache
+    reader = TestClient(app)
+    assert reader.get(f"/incidents/{created['id']}").json()["title"] == "Before the edit"
+    assert incident_cache.get(key) is None
+
+    # The writer is sticky to the primary and skips the cache: it sees its own edit
+    assert writer.get(f"/incidents/{created['id']}").json()["title"] == "After the edit"
+    assert incident_cache.get(key) is None
+
+    # Once replicas are gone (and the edit's tombstone has expired), primary reads fill the cache again
+    monkeypatch.setattr(replicas, "replica_set", replicas.ReplicaSet([], eject_seconds=60))
+    incident_cache.clear()
+    assert reader.get(f"/incidents/{created['id']}").json()["title"] == "After the edit"
+    assert incident_cache.get(key) is not None
+
+
+# ── CHANGE FEED TESTS ─────────────────────────────────────────────────────────
+def _sse(frame: bytes) -> dict:
+    import json
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().splitlines())
+    return {**fields, "data": json.loads(fields["data"])}
+
+
+def test_stream_publishes_committed_changes():
+    """Creates, resolves and deletes reach a subscriber as SSE events, in order"""
+    import asyncio
+    from app.events import sse_stream
+
+    async def scenario():
+        stream = sse_stream()
+        assert await stream.__anext__() == b"retry: 3000\n\n"   # subscribed
+
+        created = (await asyncio.to_thread(client.post, "/incidents/", json={"title": "Streamed incident"})).json()
+        await asyncio.to_thread(client.put, f"/incidents/{created['id']}/resolve", json={})
+        await asyncio.to_thread(client.delete, f"/incidents/{created['id']}")
+
+        events = [_sse(await asyncio.wait_for(stream.__anext__(), 10)) for _ in range(3)]
+        await stream.aclose()
+        return created, events
+
+    created, events = asyncio.run(scenario())
+    assert [event["event"] for event in events] == ["created", "resolved", "deleted"]
+    assert events[0]["data"]["title"] == "Streamed incident"
+    assert events[1]["data"]["status"] == "resolved"
+    assert events[2]["data"] == {"id": created["id"]}
+
+
+def test_stream_replay_and_slow_consumers():
+    """Last-Event-ID resumes from the replay ring; a full buffer disconnects the client"""
+    import asyncio
+    from app.events import IncidentEventBus
+
+    async def scenario():
+        bus = IncidentEventBus(buffer_size=2, replay_size=3)
+        slow, _ = bus.subscribe()
+        bus._publish([("updated", b'{"id": %d}' % n) for n in range(1, 6)])
+        await asyncio.sleep(0.05)   # let the fan-out run on this loop
+
+        assert slow.dropped and slow.queue.qsize() == 2
+        assert not bus._subscribers
+
+        _, resumed = bus.subscribe(f"{bus.epoch}-3")
+        _, too_old = bus.subscribe(f"{bus.epoch}-1")
+        _, unknown = bus.subscribe("other-5")
+        return resumed, too_old, unknown
+
+    resumed, too_old, unknown = asyncio.run(scenario())
+    assert [_sse(frame)["data"]["id"] for frame in resumed] == [4, 5]
+    assert _sse(too_old[0])["event"] == "reset"
+    assert _sse(unknown[0])["event"] == "reset"
+
+
+# ── IMPORT TESTS ──────────────────────────────────────────────────────────────
+def test_import_ndjson_reports_bad_rows_per_chunk():
+    """Valid rows load chunk by chunk; invalid ones are skipped and reported with their line"""
+    import json
+    rows = [
+        {"title": "Imported outage", "severity": "critical", "status": "resolved",
+         "created_at": "2021-03-01T10:00:00Z", "resolved_at": "2021-03-01T11:30:00Z", "source": "oldtool"},
+        {"title": "x"},                                         # too short
+        {"title": "Imported open one", "created_at": "2021-03-02T08:00:00Z"},
+        "not an object",
+        {"title": "Resolved without a time", "status": "resolved"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n\n{broken json\n"
+
+    response = client.post("/incidents/import?chunk_size=2", content=body.encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["rejected"]) == (2, 4)
+    assert [(c["first_line"], c["last_line"], c["imported"]) for c in result["chunks"]] == [(1, 2, 1), (3, 4, 1), (5, 7, 0)]
+    errors = [error for chunk in result["chunks"] for error in chunk["errors"]]
+    assert [error["line"] for error in errors] == [2, 4, 5, 7]
+    assert "title" in errors[0]["error"] and "invalid JSON" in errors[3]["error"]
+
+    # History keeps its own timestamps, and lands in the rollups
+    imported = client.get("/incidents/search?q=Imported").json()
+    outage = next(incident for incident in imported if incident["title"] == "Imported outage")
+    assert outage["created_at"].startswith("2021-03-01T10:00:00")
+    stats = client.get("/incidents/stats?start=2021-03-01T00:00:00Z&end=2021-03-03T00:00:00Z").json()
+    assert stats["created"] == 2 and stats["resolved"] == 1 and stats["mttr_seconds"] == 5400
+
+
+def test_import_csv():
+    """CSV with a header row; empty cells take the schema defaults"""
+    body = (
+        "title,description,severity,status,created_at,resolved_at\r\n"
+        'CSV incident one,"multi\nline, quoted",high,open,2021-04-01T00:00:00Z,\r\n'
+        "CSV incident two,,,resolved,2021-04-01T00:00:00Z,2021-04-01T00:10:00Z\r\n"
+        "CSV incident three,,bogus,open,,\r\n"
+    )
+    response = client.post("/incidents/import?format=csv", content=body.encode())
+    result = response.json()
+    assert (result["imported"], result["rejected"]) == (2, 1)
+    assert result["chunks"][0]["errors"][0]["line"] == 5   # line 5: the quoted field spans lines 2-3
+    assert result["rows_per_second"] > 0
+
+    found = client.get("/incidents/search?q=quoted").json()
+    assert [incident["description"] for incident in found] == ["multi\nline, quoted"]
+
+
 # ── ALERTMANAGER WEBHOOK TESTS ────────────────────────────────────────────────
 def test_alertmanager_webhook():
     """Should auto-create incident from Alertmanager webhook payload"""
@@ -179,4 +1041,469 @@ def test_alertmanager_webhook():
     }
     response = client.post("/incidents/webhook/alertmanager", json=payload)
     assert response.status_code == 200
-    assert response.json()["incident_ids"] != []
\ No newline at end of file
+    assert response.json()["incident_ids"] != []
+
+def test_alertmanager_webhook_batch():
+    """Should insert every firing alert in one payload and return all new ids"""
+    payload = {
+        "receiver": "incident-logger",
+        "status":   "firing",
+        "alerts": [
+            {
+                "status": "firing",
+                "labels": {"alertname": f"DiskFull{i}", "severity": "high"},
+                "annotations": {"summary": f"Disk {i} above 95%"}
+            }
+            for i in range(5)
+        ] + [
+            {
+                "status": "resolved",
+                "labels": {"alertname": "DiskFullOld"},
+                "annotations": {}
+            }
+        ]
+    }
+    response = client.post("/incidents/webhook/alertmanager", json=payload)
+    assert response.status_code == 200
+    ids = response.json()["incident_ids"]
+    assert len(ids) == 5
+    assert len(set(ids)) == 5
+
+    # ids come back in payload order
+    for i, incident_id in enumerate(ids):
+        incident = client.get(f"/incidents/{incident_id}").json()
+        assert incident["alert_name"] == f"DiskFull{i}"
+        assert incident["severity"]   == "high"
+
+
+def _alert(fingerprint, status="firing", **extra):
+    return {
+        "status":      status,
+        "fingerprint": fingerprint,
+        "labels":      {"alertname": "InstanceDown", "severity": "critical"},
+        "annotations": {"summary": "Instance down"},
+        **extra
+    }
+
+
+def test_alertmanager_oversized_and_non_string_fields():
+    """A 300-char summary is truncated and a numeric severity label doesn't fail the payload"""
+    alert = {**_alert("fp-oversized"), "labels": {"alertname": "DiskFull", "severity": 2},
+             "annotations": {"summary": "x" * 300}}
+    response = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": [alert]
+    })
+    assert response.status_code == 200
+    incident = client.get(f"/incidents/{response.json()['incident_ids'][0]}").json()
+    assert incident["title"] == "x" * 255
+    assert incident["severity"] == "medium"
+
+    too_long = {**_alert("f" * 65)}
+    response = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": [too_long]
+    })
+    assert response.status_code == 422
+
+
+def test_alertmanager_repeat_updates_existing_incident():
+    """Re-sent firing alerts should update the open incident, not create a new one"""
+    payload = {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-repeat")]}
+
+    first = client.post("/incidents/webhook/alertmanager", json=payload).json()
+    assert len(first["incident_ids"]) == 1
+    incident_id = first["incident_ids"][0]
+    assert client.get(f"/incidents/{incident_id}").json()["updated_at"] is None   # now cached
+
+    second = client.post("/incidents/webhook/alertmanager", json=payload).json()
+    assert second["incident_ids"] == []
+    assert second["updated_ids"]  == [incident_id]
+
+    # The in-place update invalidated the cached response
+    assert client.get(f"/incidents/{incident_id}").json()["updated_at"] is not None
+
+    timeline = client.get(f"/incidents/{incident_id}/timeline").json()
+    assert [event["type"] for event in timeline] == ["created", "alert_repeated"]
+
+
+def test_alertmanager_lost_insert_race_counts_as_repeat(monkeypatch):
+    """If another worker opens the incident between our lookup and our INSERT, update it instead"""
+    from app import ingest
+
+    payload = {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-race")]}
+    incident_id = client.post("/incidents/webhook/alertmanager", json=payload).json()["incident_ids"][0]
+
+    # The first lookup misses, as if it ran just before the other worker committed
+    real_lookup, calls = ingest._lookup_open, []
+    def stale_lookup(db, fingerprints, use_cache=True):
+        calls.append(fingerprints)
+        return {} if len(calls) == 1 else real_lookup(db, fingerprints, use_cache)
+    monkeypatch.setattr(ingest, "_lookup_open", stale_lookup)
+
+    response = client.post("/incidents/webhook/alertmanager", json=payload).json()
+    assert response["incident_ids"] == []
+    assert response["updated_ids"] == [incident_id]
+
+
+def test_alertmanager_storm_folds_alerts_over_the_limit(monkeypatch):
+    """Past the per-alertname burst, new alerts become occurrences of one storm incident"""
+    from app.admission import storm_admission
+    monkeypatch.setattr(storm_admission, "burst", 3)
+    monkeypatch.setattr(storm_admission, "rate", 0)
+
+    def alerts(start, stop):
+        return [
+            {"status": "firing", "fingerprint": f"fp-storm-{n}",
+             "labels": {"alertname": "LinkDown", "severity": "high" if n == 7 else "warning", "instance": f"node-{n}"},
+             "annotations": {"summary": "Link down"}}
+            for n in range(start, stop)
+        ]
+
+    first = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": alerts(0, 10)
+    }).json()
+    assert len(first["incident_ids"]) == 4   # 3 admitted + the storm incident
+    assert len(first["storm_ids"]) == 1
+    storm_id = first["storm_ids"][0]
+    assert storm_id == first["incident_ids"][-1]
+
+    # Later alerts (and repeats of folded ones) join the same storm incident
+    second = client.post("/incidents/webhook/alertmanager", json={
+        "receiver": "incident-logger", "status": "firing", "alerts": alerts(5, 12)
+    }).json()
+    assert second["incident_ids"] == []
+    assert second["storm_ids"] == [storm_id]
+
+    storm = client.get(f"/incidents/{storm_id}").json()
+    assert storm["title"] == "Alert storm: LinkDown"
+    assert storm["severity"] == "high"
+    assert storm["occurrence_count"] == 9   # fp-storm-3 .. fp-storm-11, each counted once
+
+    folded = client.get(f"/incidents/{storm_id}/alerts").json()
+    assert sorted(alert["labels"]["instance"] for alert in folded) == sorted(f"node-{n}" for n in range(3, 12))
+
+    body = client.get("/metrics").text
+    assert 'alerts_shed_total{alertname="LinkDown"} 9.0' in body
+    assert 'alerts_coalesced_total{alertname="LinkDown"} 9.0' in body
+
+    # Deleting the incident deletes its folded alerts
+    from app.models import IncidentAlert
+    assert client.delete(f"/incidents/{storm_id}").status_code == 204
+    db = TestingSessionLocal()
+    assert db.query(IncidentAlert).filter(IncidentAlert.incident_id == storm_id).count() == 0
+    db.close()
+
+
+def test_alertmanager_retry_does_not_charge_admission_twice(monkeypatch):
+    """The IntegrityError retry reuses the first attempt's admission decision"""
+    from sqlalchemy.exc import IntegrityError
+    from app import ingest
+    from app.admission import storm_admission
+    monkeypatch.setattr(storm_admission, "burst", 3)
+    monkeypatch.setattr(storm_admission, "rate", 0)
+
+    real_insert_new, calls = ingest._insert_new, []
+
+    def insert_new(db):
+        calls.append(1)
+        if len(calls) == 1:   # a concurrent worker won the race on the first attempt
+            raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+        return real_insert_new(db)
+
+    monkeypatch.setattr(ingest, "_insert_new", insert_new)
+    response = client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "firing", "alerts": [
+        {**_alert(f"fp-retry-admit-{n}"), "labels": {"alertname": "RetryAdmit"}} for n in range(2)
+    ]}).json()
+    assert len(calls) == 2
+    assert len(response["incident_ids"]) == 2   # not folded into a storm by the retry
+    assert response["storm_ids"] == []
+
+    # 3 - 2 tokens left: the retry didn't take two more
+    assert storm_admission.admit("RetryAdmit", 5) == 1
+
+
+def test_alertmanager_storm_control_disabled(monkeypatch):
+    from app.admission import storm_admission
+    from app.config import settings
+    monkeypatch.setattr(storm_admission, "burst", 1)
+    monkeypatch.setattr(settings, "storm_control", False)
+
+    response = client.post("/incidents/webhook/alertmanager", json={"receiver": "incident-logger", "status": "firing", "alerts": [
+        _alert(f"fp-nostorm-{n}") for n in range(3)
+    ]}).json()
+    assert len(response["incident_ids"]) == 3
+    assert response["storm_ids"] == []
+
+
+def test_alertmanager_resolved_closes_incident():
+    """A resolved notification should close the incident opened for that fingerprint"""
+    firing = {"receiver": "incident-logger", "status": "firing", "alerts": [
+        _alert("fp-resolve", startsAt="2024-01-01T10:00:00Z")
+    ]}
+    incident_id = client.post("/incidents/webhook/alertmanager", json=firing).json()["incident_ids"][0]
+
+    resolved = {"receiver": "incident-logger", "status": "resolved", "alerts": [
+        _alert("fp-resolve", status="resolved", endsAt="2024-01-01T10:30:00Z")
+    ]}
+    response = client.post("/incidents/webhook/alertmanager", json=resolved)
+    assert response.json()["resolved_ids"] == [incident_id]
+
+    incident = client.get(f"/incidents/{incident_id}").json()
+    assert incident["status"] == "resolved"
+    assert incident["resolved_at"].startswith("2024-01-01T10:30:00")
+
+    # The next firing for the same fingerprint is a brand-new incident
+    again = client.post("/incidents/webhook/alertmanager", json=firing).json()
+    assert again["incident_ids"] != [incident_id]
+    assert len(again["incident_ids"]) == 1
+
+
+def test_alertmanager_repeat_after_manual_resolve():
+    """A stale cache entry must not attach alerts to a manually resolved incident"""
+    payload = {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-manual")]}
+    incident_id = client.post("/incidents/webhook/alertmanager", json=payload).json()["incident_ids"][0]
+
+    client.put(f"/incidents/{incident_id}/resolve", json={})
+
+    again = client.post("/incidents/webhook/alertmanager", json=payload).json()
+    assert again["updated_ids"] == []
+    assert len(again["incident_ids"]) == 1
+    assert again["incident_ids"][0] != incident_id
+
+
+# ── ASYNC MODE TESTS ──────────────────────────────────────────────────────────
+def _async_app():
+    """The DB_ASYNC=true routers, on the test database"""
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.database import async_url, get_async_db
+    from app.routes import incidents_async, health_async
+
+    async_engine = create_async_engine(async_url(TEST_DATABASE_URL), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(health_async.router)
+    async_app.include_router(incidents_async.router)
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    return async_app
+
+
+def test_async_routes_roundtrip():
+    """The DB_ASYNC=true routes should behave exactly like the sync ones"""
+    with TestClient(_async_app()) as async_client:
+        assert async_client.get("/health/ready").json()["database"] == "connected"
+
+        created = async_client.post("/incidents/", json={"title": "Async incident", "severity": "high"})
+        assert created.status_code == 201
+        incident_id = created.json()["id"]
+
+        assert async_client.get(f"/incidents/{incident_id}").json()["title"] == "Async incident"
+
+        resolved = async_client.put(f"/incidents/{incident_id}/resolve", json={"resolution_note": "done"})
+        assert resolved.json()["status"] == "resolved"
+
+        assert async_client.delete(f"/incidents/{incident_id}").status_code == 204
+        assert async_client.get(f"/incidents/{incident_id}").status_code == 404
+
+
+def test_async_routes_keep_redis_off_the_event_loop(monkeypatch):
+    """With DB_ASYNC=true, every Redis call of the response cache runs on the threadpool"""
+    import asyncio
+    from app import cache
+    from app.routes import incidents as incident_routes
+
+    class LoopCheckingRedis:
+        """In-memory stand-in that records each call, and whether it ran on the event loop"""
+        def __init__(self):
+            self.data = {}
+            self.calls = []
+            self.on_loop = []
+
+        def _record(self, name):
+            self.calls.append(name)
+            try:
+                asyncio.get_running_loop()
+                self.on_loop.append(name)
+            except RuntimeError:
+                pass
+
+        def get(self, key):
+            self._record("get")
+            return self.data.get(key)
+
+        def set(self, key, value, ex=None, nx=False):
+            self._record("set")
+            if not (nx and key in self.data):
+                self.data[key] = value
+
+        def pipeline(self, transaction=True):
+            return self
+
+        def execute(self):
+            pass
+
+    redis = LoopCheckingRedis()
+    backend = cache.RedisCacheBackend("redis://fake", ttl=30, tombstone=0.001, client=redis, errors=(ConnectionError,))
+    monkeypatch.setattr(cache, "incident_cache", backend)
+    monkeypatch.setattr(incident_routes, "incident_cache", backend)
+
+    with TestClient(_async_app()) as async_client:
+        incident_id = async_client.post("/incidents/", json={"title": "Cached async incident"}).json()["id"]
+        assert async_client.get(f"/incidents/{incident_id}").status_code == 200   # miss, then fill
+        assert async_client.get(f"/incidents/{incident_id}").status_code == 200   # hit
+        async_client.put(f"/incidents/{incident_id}", json={"title": "Renamed async incident"})
+        async_client.post("/incidents/bulk/resolve", json={"ids": [incident_id]})
+        redis.data.clear()   # the tombstones, so the next read fills again
+        assert async_client.get(f"/incidents/{incident_id}").json()["title"] == "Renamed async incident"
+
+    assert redis.calls.count("set") >= 4   # two fills and two tombstones at least
+    assert redis.on_loop == []
+
+
+# ── WRITE-BEHIND SPOOL TESTS ──────────────────────────────────────────────────
+def test_spool_accepts_then_drains(tmp_path, monkeypatch):
+    """INGEST_MODE=spool should answer 202 and write the incident on drain"""
+    from app import spool
+    from app.config import settings
+    from app.models import Incident
+
+    monkeypatch.setattr(settings, "ingest_mode", "spool")
+    monkeypatch.setattr(spool, "active_spool", spool.Spool(str(tmp_path), session_factory=TestingSessionLocal))
+
+    payload = {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-spool")]}
+    response = client.post("/incidents/webhook/alertmanager", json=payload)
+    assert response.status_code == 202
+    assert spool.active_spool.depth() == 1
+
+    assert spool.active_spool.drain_once() == 1
+    assert spool.active_spool.depth() == 0
+
+    db = TestingSessionLocal()
+    assert db.query(Incident).filter(Incident.fingerprint == "fp-spool").count() == 1
+    db.close()
+    spool.active_spool.stop()
+
+
+def test_spool_dead_letters_a_poisoned_payload(tmp_path, monkeypatch):
+    """A payload the DB keeps rejecting is moved aside; the ones around it still drain"""
+    import json
+    from app import spool
+    from app.models import Incident
+    from app.schemas import AlertmanagerWebhook
+
+    real_ingest = spool.ingest_alerts
+
+    def ingest(db, alerts):
+        if any(alert.fingerprint == "fp-poison" for alert in alerts):
+            raise ValueError("cannot store this alert")
+        return real_ingest(db, alerts)
+
+    monkeypatch.setattr(spool, "ingest_alerts", ingest)
+    queue = spool.Spool(str(tmp_path), max_attempts=2, session_factory=TestingSessionLocal)
+    for fingerprint in ("fp-before-poison", "fp-poison", "fp-after-poison"):
+        queue.append(AlertmanagerWebhook.model_validate(
+            {"receiver": "incident-logger", "status": "firing", "alerts": [_alert(fingerprint)]}
+        ))
+
+    with pytest.raises(ValueError):
+        queue.drain_once()               # the whole batch fails...
+    assert queue.drain_once() == 1       # ...so it is retried one payload at a time
+    with pytest.raises(ValueError):
+        queue.drain_once()               # first failure of the poisoned payload
+    assert queue.drain_once() == 1       # second failure: dead-lettered
+    assert queue.drain_once() == 1
+    assert queue.depth() == 0
+    queue.stop()
+
+    dead = [json.loads(line) for line in (tmp_path / spool.DEAD_LETTER_FILE).read_text().splitlines()]
+    assert [record["payload"]["alerts"][0]["fingerprint"] for record in dead] == ["fp-poison"]
+    assert dead[0]["error"] == "ValueError: cannot store this alert"
+
+    db = TestingSessionLocal()
+    assert db.query(Incident).filter(Incident.fingerprint.in_(["fp-before-poison", "fp-after-poison"])).count() == 2
+    db.close()
+    assert "ingest_spool_dead_lettered_total 1.0" in client.get("/metrics").text
+
+
+def test_spool_retries_database_outages_forever(tmp_path, monkeypatch):
+    """Connection errors are never a reason to dead-letter"""
+    from sqlalchemy.exc import OperationalError
+    from app import spool
+    from app.schemas import AlertmanagerWebhook
+
+    def ingest(db, alerts):
+        raise OperationalError("SELECT 1", {}, Exception("could not connect to server"))
+
+    monkeypatch.setattr(spool, "ingest_alerts", ingest)
+    queue = spool.Spool(str(tmp_path), max_attempts=2, session_factory=TestingSessionLocal)
+    queue.append(AlertmanagerWebhook.model_validate(
+        {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-outage")]}
+    ))
+    for _ in range(5):
+        with pytest.raises(OperationalError):
+            queue.drain_once()
+    assert queue.depth() == 1
+    assert not (tmp_path / spool.DEAD_LETTER_FILE).exists()
+    queue.stop()
+
+
+def test_spool_adoption_tolerates_vanished_files(tmp_path, monkeypatch):
+    """A spool file another worker adopted between our glob and open is skipped, not fatal"""
+    import glob
+    from app.spool import Spool
+
+    real_glob = glob.glob
+    monkeypatch.setattr(glob, "glob", lambda pattern: real_glob(pattern) + [str(tmp_path / "spool-999999.log")])
+    queue = Spool(str(tmp_path))
+    assert queue.depth() == 0
+    assert not list(tmp_path.glob("*.new"))   # our own log was renamed into place, already locked
+    queue.stop()
+
+
+def test_spool_full_returns_503(tmp_path, monkeypatch):
+    """A full spool should push back with 503 + Retry-After"""
+    from app import spool
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ingest_mode", "spool")
+    monkeypatch.setattr(spool, "active_spool", spool.Spool(str(tmp_path), max_pending=1))
+
+    payload = {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-full")]}
+    assert client.post("/incidents/webhook/alertmanager", json=payload).status_code == 202
+    response = client.post("/incidents/webhook/alertmanager", json=payload)
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    spool.active_spool.stop()
+
+
+def test_spool_replays_after_restart(tmp_path):
+    """Undrained payloads must survive a restart, including spools of dead workers"""
+    import os
+    from app.schemas import AlertmanagerWebhook
+    from app.spool import Spool
+
+    payload = AlertmanagerWebhook.model_validate(
+        {"receiver": "incident-logger", "status": "firing", "alerts": [_alert("fp-replay")]}
+    )
+    crashed = Spool(str(tmp_path))
+    crashed.append(payload)
+    crashed.append(payload)
+    crashed.stop()   # no drain — like a crash after answering 202
+
+    # Same worker comes back
+    restarted = Spool(str(tmp_path))
+    assert restarted.depth() == 2
+    restarted.stop()
+
+    # A different worker finds the spool of a dead one and adopts it
+    os.rename(tmp_path / f"spool-{os.getpid()}.log", tmp_path / "spool-1.log")
+    adopter = Spool(str(tmp_path))
+    assert adopter.depth() == 2
+    assert not (tmp_path / "spool-1.log").exists()
+    adopter.stop()